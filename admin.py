@@ -0,0 +1,87 @@
+# admin.py
+import os
+import hmac
+import time
+import streamlit as st
+from utils.session_metrics import read_snapshot, sample
+from utils.measurement_hints import LLM, get_hint_stats
+from utils.canvas import canvas_stats
+
+
+def admin_enabled(params):
+    """Solo con ?admin=<token> y EKG_ADMIN_TOKEN definido en el servidor."""
+    token = os.environ.get("EKG_ADMIN_TOKEN")
+    given = params.get("admin")
+    if not token or not isinstance(given, str):
+        return False
+    # Comparación en tiempo constante: no filtra cuántos caracteres coinciden
+    return hmac.compare_digest(given.encode(), token.encode())
+
+
+def _mb(n):
+    return f"{(n or 0) / 1024 / 1024:.2f} MB"
+
+
+def _hint_section():
+    """Intentos fallidos del módulo visual: pista local vs llamada al LLM."""
+    st.markdown("## 💡 Pistas de medición")
+    totals = get_hint_stats().totals()
+    if not totals:
+        st.info("Aún no hay intentos fallidos registrados.")
+        return
+    llm = totals.get(LLM, 0)
+    local = sum(n for path, n in totals.items() if path != LLM)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Pistas locales", local)
+    col2.metric("Llamadas al LLM", llm)
+    col3.metric("Llamadas evitadas", f"{local / (local + llm):.0%}")
+    st.table({"camino": list(totals), "intentos": list(totals.values())})
+
+
+def _canvas_section():
+    """Tráfico del canvas del módulo visual desde que arrancó el proceso."""
+    st.markdown("## 🖊️ Canvas de marcas")
+    stats = canvas_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Renders", stats["renders"])
+    col2.metric("Bytes por render", round(stats["args_bytes"] / stats["renders"]) if stats["renders"] else 0)
+    col3.metric("Iframes montados", stats["mounts"])
+    st.caption(f"{stats['values']} envíos de marcas, "
+               f"{round(stats['value_bytes'] / stats['values']) if stats['values'] else 0} bytes en promedio")
+
+
+def admin_screen():
+    """
+    Página de administración: memoria por sesión y RSS del proceso
+    """
+    _hint_section()
+    _canvas_section()
+
+    st.markdown("## 🛠️ Memoria por sesión")
+
+    snapshot = read_snapshot()
+    if st.button("📸 Tomar muestra ahora"):
+        snapshot = sample()
+
+    if not snapshot:
+        st.info("Aún no hay muestras. Revisa EKG_SESSION_METRICS_S o toma una muestra ahora.")
+        return
+
+    st.caption(f"Muestra de {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot['ts']))} "
+               f"({snapshot['sample_ms']} ms)")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("RSS del proceso", _mb(snapshot["rss_bytes"]))
+    col2.metric("Sesiones", snapshot["sessions"])
+    col3.metric("session_state", _mb(snapshot["state_bytes"]))
+    col4.metric("Media en memoria", _mb(snapshot["media_bytes"]))
+
+    st.markdown("### Sesiones más pesadas")
+    for row in snapshot["by_session"]:
+        label = (f"{row['session'][:8]} · estado {_mb(row['state_bytes'])} · "
+                 f"media {_mb(row['media_bytes'])} · {row['keys']} claves")
+        with st.expander(label):
+            st.table({
+                "clave": [k for k, _ in row["top_keys"]],
+                "KB": [round(n / 1024, 1) for _, n in row["top_keys"]],
+            })
@@ -1,12 +1,18 @@
 import os
 import streamlit as st
-import json
+import uuid
 from utils.styles import load_css
-from modules import visual, multiple, open_q
 from login import login_screen
 from welcome import welcome_screen  # NUEVA IMPORTACIÓN
-from utils.gsheets import append_user_result
-from PIL import Image
+from utils.static_assets import show_image
+from utils.bank_reloader import LiveQuestionBank, pin_session_bank
+from utils.progress import ProgressTracker
+from utils.session_metrics import SessionMetricsSampler
+from admin import admin_enabled, admin_screen
+
+# Los módulos de ejercicios (y con ellos openai, google.generativeai y PIL) y
+# utils.gsheets se importan recién cuando se usan, para que login y bienvenida
+# arranquen con el mínimo de dependencias.
 
 
 params = st.query_params
@@ -21,15 +27,32 @@ st.set_page_config(
 st.markdown(load_css(), unsafe_allow_html=True)
 
 
+# ----------------------------------------------------
+# MÉTRICAS DE MEMORIA POR SESIÓN + PÁGINA DE ADMINISTRACIÓN
+# ----------------------------------------------------
+# Un solo muestreador por proceso (utils/session_metrics.py); la página se
+# abre con ?admin=<EKG_ADMIN_TOKEN>.
+@st.cache_resource
+def start_session_metrics():
+    return SessionMetricsSampler().start()
+
+start_session_metrics()
+
+if admin_enabled(params):
+    admin_screen()
+    st.stop()
+
+
 # ----------------------------------------------------
 # CARGA DE BASE DE DATOS
 # ----------------------------------------------------
-@st.cache_data
+# Un solo banco por proceso (validado e indexado), compartido por todas las
+# sesiones: cache_resource no copia el objeto en cada rerun como cache_data.
+# Se recarga solo cuando cambian data/db.json o sus imágenes (utils/bank_reloader.py).
+# EKG_QUESTION_DB puede apuntar a un almacén SQLite (utils/question_store.py).
+@st.cache_resource
 def load_data():
-    with open('data/db.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-data_db = load_data()
+    return LiveQuestionBank(os.environ.get("EKG_QUESTION_DB", "data/db.json")).start()
 
 
 # ----------------------------------------------------
@@ -56,11 +79,8 @@ if "selected_module" not in st.session_state:
 
 # Estado para progreso
 if "progress" not in st.session_state:
-    st.session_state["progress"] = {
-        "attempts": [],  # registros de intento
-        "by_topic": {},  # desempeño por tema
-        "completed": False
-    }
+    # intentos, desempeño por tema y contadores (utils/progress.py)
+    st.session_state["progress"] = ProgressTracker()
 
 
 # ----------------------------------------------------
@@ -68,8 +88,7 @@ if "progress" not in st.session_state:
 # ----------------------------------------------------
 
 with st.sidebar:
-    logo = Image.open("assets/logo/logo.png")
-    st.image(logo, use_container_width=True)
+    show_image("assets/logo/logo.png")
 
     # Información del usuario
     user = st.session_state["user_data"]
@@ -122,11 +141,11 @@ with st.sidebar:
     
     # Estadísticas rápidas
     st.markdown("#### 📊 Tu Progreso")
-    attempts = st.session_state["progress"]["attempts"]
-    if len(attempts) > 0:
-        correct = len([a for a in attempts if "correct" in a["result"]])
-        total = len(attempts)
-        pct = round((correct / total) * 100)
+    progress = st.session_state["progress"]
+    if progress.total > 0:
+        correct = progress.correct
+        total = progress.total
+        pct = progress.percent
         
         st.metric("Respuestas correctas", f"{correct}/{total}", f"{pct}%")
     else:
@@ -163,21 +182,28 @@ if not st.session_state["welcome_completed"]:
 # ----------------------------------------------------
 # ENRUTAMIENTO PRINCIPAL
 # ----------------------------------------------------
+# La sesión conserva su versión del banco hasta que cambia de módulo o de pregunta
+nav = (mode,) + tuple(st.session_state.get(k) for k in ("visual_idx", "mc_idx", "open_idx"))
+data_db = pin_session_bank(load_data(), st.session_state, nav)
+
 if "📏 Medición" in mode:
     # modulo de visualizaciones y mediciones, banner introductorio
+    from modules import visual
     visual.render(data_db, api_key)
 
 elif "✅ Selección" in mode:
+    from modules import multiple
     multiple.render(data_db["multiple_choice"])
 
 elif "🩺 Diagnóstico" in mode:
+    from modules import open_q
     open_q.render_open_all(data_db["open"], api_key)
     
 
 # ----------------------------------------------------
 # RESUMEN FINAL + GUARDADO EN GOOGLE SHEETS
 # ----------------------------------------------------
-if st.session_state["progress"]["completed"]:
+if st.session_state["progress"].completed:
     
     if "summary_shown" not in st.session_state:
         st.session_state["summary_shown"] = False
@@ -206,12 +232,12 @@ if st.session_state["progress"]["completed"]:
     st.markdown("## 📊 Resumen de tu Desempeño")
 
     user = st.session_state["user_data"]
-    attempts = st.session_state["progress"]["attempts"]
-    by_topic = st.session_state["progress"]["by_topic"]
+    progress = st.session_state["progress"]
+    by_topic = progress.by_topic
 
-    total = len(attempts)
-    correct = len([a for a in attempts if "correct" in a["result"]])
-    score = round((correct / total) * 100) if total > 0 else 0
+    total = progress.total
+    correct = progress.correct
+    score = progress.percent
 
     # Métricas principales en columnas
     col1, col2, col3 = st.columns(3)
@@ -230,8 +256,13 @@ if st.session_state["progress"]["completed"]:
 
     # GUARDAR EN GOOGLE SHEETS
     if not st.session_state["sheets_saved"]:
+        # Clave de idempotencia estable para esta sesión: reenviar no duplica la fila
+        if "sheets_result_key" not in st.session_state:
+            st.session_state["sheets_result_key"] = uuid.uuid4().hex
         try:
-            append_user_result(
+            from utils.gsheets import append_user_result
+            queued = append_user_result(
+                key=st.session_state["sheets_result_key"],
                 sheet_name="Registro_EKG",
                 user_data={
                     "name": user["name"],
@@ -249,12 +280,14 @@ if st.session_state["progress"]["completed"]:
                     "num_questions": total
                 }
             )
-            st.session_state["sheets_saved"] = True
-            st.success("✅ Registro guardado en Google Sheets correctamente")
+            # Si no se pudo encolar, append_user_result ya mostró el error
+            if queued:
+                st.session_state["sheets_saved"] = True
+                st.success("✅ Resultado en cola: se enviará a Google Sheets en segundo plano")
         except Exception as e:
-            st.error(f"❌ Error guardando en Sheets: {e}")
+            st.error(f"❌ Error encolando el resultado para Sheets: {e}")
     else:
-        st.success("✅ Registro guardado en Google Sheets correctamente")
+        st.success("✅ Resultado en cola: se enviará a Google Sheets en segundo plano")
 
     st.markdown("---")
 
@@ -0,0 +1,46 @@
+"""
+Tiempo de la anotación automática en lote (utils/auto_annotate.py).
+
+  - analyze_image() por imagen de los ejercicios visuales (mediana), con la
+    calibración de la cuadrícula incluida,
+  - propose_all() completo con el pool de procesos,
+  - cuántos ejercicios salen con propuesta de correct_ms y zonas.
+
+Uso:
+    python benchmarks/bench_auto_annotate.py [procesos]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from utils.image_cache import IMAGES_DIR  # noqa: E402
+from utils.question_bank import QuestionBank  # noqa: E402
+from utils.grid_calibration import DB_PATH  # noqa: E402
+from utils.auto_annotate import analyze_image, propose_all  # noqa: E402
+
+
+def main(workers=None):
+    workers = int(workers) if workers else os.cpu_count()
+    images = sorted({q["image"] for q in QuestionBank.from_file(DB_PATH)["visual"] if q.get("image")})
+
+    times = []
+    for name in images:
+        t0 = time.perf_counter()
+        analyze_image(os.path.join(IMAGES_DIR, name))
+        times.append(time.perf_counter() - t0)
+    print(f"{len(images)} imágenes: {np.median(times) * 1000:.0f} ms por imagen (mediana), "
+          f"{sum(times):.2f} s en secuencia")
+
+    t0 = time.perf_counter()
+    proposals = propose_all(workers=workers)
+    elapsed = time.perf_counter() - t0
+    measured = sum("correct_ms" in p.get("proposed", {}) for p in proposals)
+    print(f"propose_all() con {workers} proceso(s): {elapsed:.2f} s, "
+          f"{measured}/{len(proposals)} ejercicios con propuesta")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,107 @@
+"""
+Benchmark del costo por rerun de obtener el banco de preguntas.
+
+Antes: load_data() con @st.cache_data, que en cada llamada deserializa (pickle)
+una copia nueva de todo db.json. Después: @st.cache_resource devolviendo el
+LiveQuestionBank compartido + pin_session_bank(), que solo resuelve la versión
+fijada por la sesión.
+
+También mide cuánto tarda en publicarse una versión nueva tras editar el JSON
+(observador de watchdog + debounce).
+
+Uso:
+    python benchmarks/bench_bank_reload.py [n_sintético] [repeticiones]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+import warnings
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+warnings.filterwarnings("ignore")
+
+import streamlit as st  # noqa: E402
+from utils.bank_reloader import LiveQuestionBank, pin_session_bank  # noqa: E402
+from bench_question_bank import synthetic_bank  # noqa: E402
+
+# Fuera de `streamlit run` Streamlit avisa en cada llamada cacheada
+logging.disable(logging.WARNING)
+
+
+def per_call_us(fn, reps):
+    fn()  # primera llamada: llena el caché
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e6
+
+
+def measure(path, reps):
+    @st.cache_data
+    def load_data_before(p):
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @st.cache_resource
+    def load_data_after(p):
+        return LiveQuestionBank(p)
+
+    session = {}
+    nav = ("📏 Medición de Intervalos", 0, None, None)
+    before = per_call_us(lambda: load_data_before(path), reps)
+    after = per_call_us(lambda: pin_session_bank(load_data_after(path), session, nav), reps)
+    return before, after
+
+
+def reload_latency(path, edits=5):
+    live = LiveQuestionBank(path, debounce=0.05).start()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    samples = []
+    try:
+        for i in range(edits):
+            version = live.version
+            data["visual"][0]["title"] = f"editado {i}"
+            t0 = time.perf_counter()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            while live.version == version and time.perf_counter() - t0 < 10:
+                time.sleep(0.005)
+            samples.append(time.perf_counter() - t0)
+            time.sleep(0.2)
+    finally:
+        live.stop()
+    return statistics.median(samples) * 1000
+
+
+def main(n=50_000, reps=50):
+    n, reps = int(n), int(reps)
+    tmp = tempfile.mkdtemp()
+    try:
+        real = os.path.join(tmp, "db.json")
+        shutil.copy(os.path.join(ROOT, "data", "db.json"), real)
+        big = os.path.join(tmp, "db_big.json")
+        with open(big, "w", encoding="utf-8") as f:
+            json.dump(synthetic_bank(n, 25), f)
+
+        print(f"{'banco':<22}{'cache_data µs/rerun':>21}{'compartido µs/rerun':>21}")
+        for label, path in (("data/db.json", real), (f"sintético {n}", big)):
+            before, after = measure(path, reps)
+            print(f"{label:<22}{before:>21.1f}{after:>21.2f}")
+
+        print(f"\nrecarga tras editar db.json: {reload_latency(real):.0f} ms (debounce 50 ms)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
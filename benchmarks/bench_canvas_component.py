@@ -0,0 +1,134 @@
+"""
+Bytes por rerun y reconstrucciones del canvas del módulo visual
+(utils/canvas.py) con streamlit.testing.
+
+Abre el módulo visual, provoca N reruns escribiendo en el campo de ms y mide:
+  - bytes del elemento del canvas en cada rerun: después, los argumentos del
+    componente; antes, el HTML completo del iframe (equivale a
+    utils/canvas_component/index.html con los argumentos incrustados),
+  - cuántos ids distintos tuvo el componente (cada id nuevo es un iframe
+    nuevo en el navegador),
+  - bytes del valor que devuelve el componente para distintas cantidades de
+    marcas,
+  - que la imagen del canvas carga desde el iframe del componente: levanta
+    `streamlit run app.py` (con y sin server.baseUrlPath), resuelve el src que
+    recibe el componente contra la URL de su index.html, como hace el
+    navegador, y pide la imagen al servidor.
+
+Uso:
+    python benchmarks/bench_canvas_component.py [reruns]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import warnings
+import subprocess
+import urllib.request
+from urllib.error import URLError
+from urllib.parse import urljoin
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+import utils.static_assets as static_assets  # noqa: E402
+from utils.canvas import FRONTEND_DIR, Marks, encode_marks  # noqa: E402
+from utils.image_cache import image_path  # noqa: E402
+
+USER = {k: "x" for k in ["name", "dni", "sex", "country", "level", "term", "university",
+                         "experience", "formal_training", "clinical_frequency"]}
+
+
+def canvas_elements(node):
+    if type(node).__name__ == "UnknownElement" and node.type == "component_instance":
+        yield node
+    children = getattr(node, "children", None)
+    if isinstance(children, dict):
+        for child in children.values():
+            yield from canvas_elements(child)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def image_from_component(image_name, base_path=""):
+    """(URL pedida, status HTTP) de la imagen tal como la resuelve el iframe del componente."""
+    st.config.set_option("server.baseUrlPath", base_path)
+    static_assets._published.clear()
+    src = static_assets.file_src(image_path(image_name))
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+         "--server.port", str(port), "--server.baseUrlPath", base_path],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        prefix = f"http://127.0.0.1:{port}/" + (f"{base_path.strip('/')}/" if base_path else "")
+        frame = urljoin(prefix, "component/utils.canvas.ekg_canvas/index.html")
+        url = urljoin(frame, src)
+        deadline = time.time() + 30
+        while True:
+            try:
+                urllib.request.urlopen(urljoin(prefix, "_stcore/health"), timeout=2).close()
+                break
+            except URLError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.3)
+        try:
+            with urllib.request.urlopen(url, timeout=5) as r:
+                return url, r.status
+        except URLError as e:
+            return url, getattr(e, "code", None)
+    finally:
+        server.terminate()
+        server.wait()
+        st.config.set_option("server.baseUrlPath", "")
+        static_assets._published.clear()
+
+
+def main(reruns=20):
+    reruns = int(reruns)
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.session_state["user_data"] = USER
+    at.session_state["welcome_completed"] = True
+    at.run()
+    at.sidebar.radio[0].set_value("📏 Medición de Intervalos").run()
+
+    with open(os.path.join(FRONTEND_DIR, "index.html"), encoding="utf-8") as f:
+        html_bytes = len(f.read().encode())
+
+    sizes, ids = [], set()
+    for i in range(reruns):
+        at.number_input[0].set_value(100 + i).run()
+        element = next(canvas_elements(at._tree))
+        sizes.append(element.proto.ByteSize())
+        ids.add(element.proto.id)
+
+    after = sum(sizes) / len(sizes)
+    before = html_bytes + len(element.proto.json_args)
+    print(f"{reruns} reruns del módulo visual")
+    print(f"bytes del canvas por rerun: antes ~{before:,.0f} (HTML del iframe), después {after:,.0f} (argumentos)")
+    print(f"ids distintos del componente (iframes montados): {len(ids)}")
+
+    for n in (2, 10, 50):
+        marks = Marks(1236, [(100 + 7 * k, 200 + k) for k in range(n)], [(100, 200, 160 + k, 200) for k in range(n // 2)])
+        print(f"valor devuelto con {n} círculos + {n // 2} líneas: {len(json.dumps(encode_marks(marks)))} bytes")
+
+    for base_path in ("", "ekg"):
+        url, status = image_from_component("ej_1.png", base_path)
+        print(f"imagen desde el iframe del componente (baseUrlPath={base_path!r}): {status} {url.split('?')[0]}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,74 @@
+"""
+Benchmark de arranque en frío: totales de `python -X importtime` por módulo.
+
+Cada objetivo se importa en un proceso nuevo (varias repeticiones, se reporta
+la mediana). Para app.py se ejecuta el script en modo "bare" de Streamlit,
+sin usuario en sesión, o sea, el camino de la pantalla de login.
+
+Uso:
+    python benchmarks/bench_cold_start.py [repeticiones] [--top N]
+"""
+import os
+import re
+import sys
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    ("app.py (login)", "import runpy; runpy.run_path('app.py', run_name='__main__')"),
+    ("login", "import login"),
+    ("welcome", "import welcome"),
+    ("utils.helpers", "import utils.helpers"),
+    ("modules.visual", "import modules.visual"),
+    ("modules.multiple", "import modules.multiple"),
+    ("modules.open_q", "import modules.open_q"),
+]
+
+# Dependencias pesadas que no deberían cargarse en login/bienvenida
+HEAVY = ("openai", "google.generativeai", "matplotlib", "PIL", "gspread")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def importtime(code):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONWARNINGS="ignore")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3))))
+    return modules
+
+
+def main(reps=5, top=0):
+    reps, top = int(reps), int(top)
+    print(f"{'objetivo':<18}{'total ms':>10}{'módulos':>9}  pesados cargados")
+    for label, code in TARGETS:
+        totals = []
+        for _ in range(reps):
+            modules = importtime(code)
+            totals.append(sum(self_us for _, self_us, _, _ in modules) / 1000)
+        names = {name for name, _, _, _ in modules}
+        heavy = [h for h in HEAVY if h in names]
+        print(f"{label:<18}{statistics.median(totals):>10.1f}{len(modules):>9}  {', '.join(heavy) or '-'}")
+
+        if top:
+            roots = sorted((m for m in modules if m[3] == 1), key=lambda m: -m[2])[:top]
+            for name, _, cumulative, _ in roots:
+                print(f"{'':<20}{cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    top = 0
+    if "--top" in args:
+        i = args.index("--top")
+        top = args[i + 1]
+        del args[i:i + 2]
+    main(*(args[:1] or [5]), top=top)
@@ -0,0 +1,109 @@
+"""
+Corrección local de los casos abiertos (utils/diagnosis_matcher.py).
+
+  - Aciertos sobre respuestas de ejemplo de los casos de data/db.json
+    (tildes, mayúsculas, errores de tipeo, siglas y negaciones).
+  - Latencia de grade() con el banco real y con N casos sintéticos, contra
+    buscar cada sinónimo como subcadena (lo más simple que se podría hacer
+    sin autómata; no reconoce errores de tipeo ni negaciones).
+
+La corrección anterior esperaba la respuesta completa de Gemini (segundos)
+antes de decidir.
+
+Uso:
+    python benchmarks/bench_diagnosis_matcher.py [casos_sinteticos]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.question_bank import QuestionBank  # noqa: E402
+from utils.diagnosis_matcher import DiagnosisMatcher, fold  # noqa: E402
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "db.json")
+
+# (id del caso, texto del estudiante, ¿correcto?)
+SAMPLES = [
+    (201, "Ritmo sinusal a 75 lpm, P antes de cada QRS", True),
+    (201, "RITMO SINUSAL normal", True),
+    (201, "QRS no ancho, sinusal", True),
+    (201, "Ritmo no sinusal", False),
+    (202, "Fibrilación auricular con respuesta ventricular controlada", True),
+    (202, "fibrilasion auricular, RR irregular", True),
+    (202, "FA", True),
+    (202, "No es fibrilación auricular, es un flutter", False),
+    (202, "Ritmo sinusal", False),
+    (203, "Bloqueo de rama derecho, rsR' en V1", True),
+    (203, "BRD completo", True),
+    (203, "Descarto BRD; parece bloqueo de rama izquierda", False),
+    (204, "Taquicardia por reentrada nodal", True),
+    (204, "taquicardia por rentrada nodal (AVNRT)", True),
+    (204, "Taquicardia sinusal", False),
+    (202, "FA, bloqueo de rama derecha, sinusal, reentrada nodal", False),
+    (201, "Sinusal o fibrilación auricular", False),
+    (202, "FA, no es ritmo sinusal", True),
+    (203, "Ritmo sinusal a 75 lpm con QRS ancho y rsR en V1. Compatible con bloqueo de rama derecha", True),
+    (202, "Ausencia de ritmo sinusal, RR irregular. Fibrilación auricular", True),
+    (202, "Ritmo sinusal ausente: fibrilación auricular", True),
+    (202, "Sin evidencia de ritmo sinusal; fibrilación auricular", True),
+    (204, "Pérdida del ritmo sinusal, taquicardia por reentrada nodal", True),
+    (204, "Taquicardia por reentrada nodal o fibrilación auricular", False),
+]
+
+
+def substring_grade(q, text):
+    text = fold(text)
+    return any(fold(s) in text for s in q["correct_diagnosis"])
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def synthetic_cases(n, rng):
+    words = ["taquicardia", "bloqueo", "rama", "auricular", "ventricular", "nodal", "reentrada",
+             "fibrilacion", "flutter", "extrasistole", "sinusal", "derecha", "izquierda", "fascicular"]
+    cases = []
+    for i in range(n):
+        name = " ".join(rng.sample(words, 3)) + f" tipo{i}"
+        cases.append({"id": 10_000 + i, "correct_diagnosis": [name, name.upper(), f"S{i}"],
+                      "key_features": ""})
+    return cases
+
+
+def main(n_cases=2_000):
+    n_cases = int(n_cases)
+    bank = QuestionBank.from_file(DB_PATH)
+    cases = bank["open"]
+    by_id = {q["id"]: q for q in cases}
+
+    matcher = DiagnosisMatcher(cases)
+    ok_matcher = sum(matcher.grade(by_id[qid], text).correct == exp for qid, text, exp in SAMPLES)
+    ok_substring = sum(substring_grade(by_id[qid], text) == exp for qid, text, exp in SAMPLES)
+    print(f"aciertos sobre {len(SAMPLES)} respuestas: matcher {ok_matcher}, subcadena {ok_substring}")
+
+    text = "Ritmo irregular sin ondas P visibles, QRS estrecho. Compatible con fibrilasion auricular."
+    findings = {"rhythm": "No sinusal", "qrs": "Estrecho", "p": "Ausentes"}
+    q = by_id[202]
+    print(f"banco real ({len(cases)} casos): grade() {timed(lambda: matcher.grade(q, text, text, findings=findings), 2000):.1f} µs, "
+          f"subcadena {timed(lambda: substring_grade(q, text), 2000):.1f} µs")
+
+    big = list(cases) + synthetic_cases(n_cases, random.Random(0))
+    t0 = time.perf_counter()
+    big_matcher = DiagnosisMatcher(big)
+    build_ms = (time.perf_counter() - t0) * 1000
+    fresh = DiagnosisMatcher(big)
+    cold = timed(lambda: fresh.grade(q, text), 1)
+    all_substring = timed(lambda: [substring_grade(c, text) for c in big], 20)
+    print(f"{len(big)} casos: construir {build_ms:.0f} ms, grade() {timed(lambda: big_matcher.grade(q, text), 2000):.1f} µs "
+          f"(primera vez {cold:.0f} µs), buscar todos los sinónimos como subcadena {all_substring:.0f} µs")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
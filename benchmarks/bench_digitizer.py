@@ -0,0 +1,146 @@
+"""
+Precisión y velocidad del digitalizador de tiras (utils/digitizer.py).
+
+Precisión:
+  - tira sintética: una señal conocida (P, QRS, T gaussianas) dibujada sobre
+    papel milimetrado rosa a 25 mm/s y 10 mm/mV; se digitaliza con todo el
+    pipeline (incluida la calibración por la cuadrícula) y se compara con la
+    señal original: calibración, RMS en mV fuera del QRS, distancia en px al
+    trazo real (en el QRS el error es de tiempo, no de amplitud) y amplitud de R,
+  - PNGs de assets/images: las muestras se vuelven a dibujar en píxeles y se
+    cuenta qué fracción de los píxeles del trazo queda cubierta (a 1.5 px).
+Velocidad y tamaño:
+  - digitize_image() por imagen, np.load() del .npy contra decodificar el PNG,
+    y KB del .npy contra KB del PNG.
+
+Uso:
+    python benchmarks/bench_digitizer.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+from utils.image_cache import IMAGES_DIR  # noqa: E402
+from utils.auto_annotate import trace_mask  # noqa: E402
+from utils.digitizer import _strip_images, digitize_image, to_pixels  # noqa: E402
+
+PX_PER_MM = 8
+BEAT_MS = 800
+
+
+def synthetic_signal(t_ms):
+    """mV de un latido normal repetido cada BEAT_MS."""
+    phase = np.mod(t_ms, BEAT_MS)
+    waves = ((0.15, 150, 25), (-0.1, 265, 8), (1.2, 285, 10), (-0.25, 305, 8), (0.3, 520, 45))
+    return sum(a * np.exp(-0.5 * ((phase - mu) / sd) ** 2) for a, mu, sd in waves)
+
+
+def synthetic_strip(width=1200, height=300):
+    img = Image.new("RGB", (width, height), (252, 236, 236))
+    draw = ImageDraw.Draw(img)
+    for mm in range(0, max(width, height) // PX_PER_MM + 1):
+        color, w = ((226, 120, 120), 2) if mm % 5 == 0 else ((244, 190, 190), 1)
+        draw.line([(mm * PX_PER_MM, 0), (mm * PX_PER_MM, height)], fill=color, width=w)
+        draw.line([(0, mm * PX_PER_MM), (width, mm * PX_PER_MM)], fill=color, width=w)
+    ms_per_pixel = 40 / PX_PER_MM
+    x = np.arange(width, step=0.25)
+    baseline = height * 0.6
+    y = baseline - synthetic_signal(x * ms_per_pixel) * 10 * PX_PER_MM
+    draw.line(list(zip(x.tolist(), y.tolist())), fill=(20, 20, 20), width=2)
+    return img, ms_per_pixel
+
+
+def coverage(samples, info, mask, tol=1.5):
+    """Fracción de píxeles del trazo a menos de `tol` px del trazo reconstruido."""
+    x, y = to_pixels(samples, info)
+    # Trazo reconstruido densificado y reducido a un rango [min, max] por columna
+    t = np.linspace(0, len(x) - 1, len(x) * 10)
+    xd = np.interp(t, np.arange(len(x)), x)
+    yd = np.interp(t, np.arange(len(y)), y)
+    cols = np.clip(np.round(xd).astype(int), 0, mask.shape[1] - 1)
+    lo = np.full(mask.shape[1], np.inf)
+    hi = np.full(mask.shape[1], -np.inf)
+    np.minimum.at(lo, cols, yd)
+    np.maximum.at(hi, cols, yd)
+    top, bottom = info["strip"]
+    rows, cc = np.nonzero(mask[top:bottom])
+    rows = rows + top
+    half = 0.5 * (np.median(np.bincount(cc)) if len(cc) else 0)
+    ok = (rows >= lo[cc] - tol - half) & (rows <= hi[cc] + tol + half)
+    return ok.mean() if len(ok) else 0.0
+
+
+def main():
+    # ---------- Precisión con señal conocida ----------
+    img, true_ms_px = synthetic_strip()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sintetica.png")
+        img.save(path)
+        samples, info = digitize_image(path)
+    truth = synthetic_signal(samples[:, 0])
+    # La línea de base del digitalizador es la mediana: se compara sin el offset
+    offset = np.median(samples[:, 1]) - np.median(truth)
+    err = samples[:, 1] - offset - truth
+    # En el QRS un error mínimo en el tiempo es mucho en mV: ahí se mide la
+    # distancia en píxeles a la curva real (la más cercana a ±2 px)
+    px_ms = 1 / true_ms_px
+    xs = samples[:, 0] * px_ms
+    ys = (samples[:, 1] - offset) * 10 * PX_PER_MM
+    fine = xs[:, None] + np.linspace(-2, 2, 161)[None, :]
+    curve = synthetic_signal(fine * true_ms_px) * 10 * PX_PER_MM
+    dist = np.sqrt((fine - xs[:, None]) ** 2 + (curve - ys[:, None]) ** 2).min(axis=1)
+    qrs = np.abs(np.mod(samples[:, 0], BEAT_MS) - 285) < 40
+    r_true = synthetic_signal(np.arange(0, 1200 * true_ms_px, 0.5)).max()
+    r_dig = samples[:, 1].max() - offset
+    print("tira sintética (1200 px, 8 px/mm, trazo de 2 px):")
+    print(f"  ms/px detectado {info['ms_per_pixel']} (real {true_ms_px})")
+    print(f"  fuera del QRS: RMS {np.sqrt(np.mean(err[~qrs] ** 2)):.4f} mV; "
+          f"distancia al trazo real: RMS {np.sqrt(np.mean(dist ** 2)):.2f} px, máx {dist.max():.2f} px")
+    print(f"  amplitud de R: {r_dig:.3f} mV (real {r_true:.3f})")
+
+    # ---------- PNGs reales ----------
+    print(f"\n{'imagen':<24}{'muestras':>9}{'cobertura':>11}{'digitalizar':>13}{'png':>9}{'npy':>9}"
+          f"{'KB png':>9}{'KB npy':>8}")
+    totals = {"png": 0, "npy": 0}
+    for name, stored in _strip_images().items():
+        path = os.path.join(IMAGES_DIR, name)
+        t0 = time.perf_counter()
+        samples, info = digitize_image(path, stored)
+        t_dig = time.perf_counter() - t0
+        if samples is None:
+            print(f"{name:<24}  ⚠️ {info['error']}")
+            continue
+
+        with Image.open(path) as im:
+            rgb = np.asarray(im.convert("RGB"), dtype=np.float32)
+        cov = coverage(samples, info, trace_mask(rgb))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            npy = os.path.join(tmp, "t.npy")
+            np.save(npy, samples)
+            t0 = time.perf_counter()
+            for _ in range(20):
+                np.load(npy)
+            t_npy = (time.perf_counter() - t0) / 20
+            npy_bytes = os.path.getsize(npy)
+        t0 = time.perf_counter()
+        for _ in range(5):
+            with Image.open(path) as im:
+                im.convert("RGB").load()
+        t_png = (time.perf_counter() - t0) / 5
+        png_bytes = os.path.getsize(path)
+        totals["png"] += png_bytes
+        totals["npy"] += npy_bytes
+        print(f"{name:<24}{len(samples):>9}{cov:>10.1%}{t_dig * 1000:>11.0f}ms{t_png * 1000:>7.1f}ms"
+              f"{t_npy * 1000:>7.2f}ms{png_bytes / 1024:>9.0f}{npy_bytes / 1024:>8.1f}")
+    print(f"\ntotal: PNG {totals['png'] / 1024:.0f} KB -> npy {totals['npy'] / 1024:.0f} KB "
+          f"({totals['png'] / max(totals['npy'], 1):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Tiempo de la calibración automática desde la cuadrícula
+(utils/grid_calibration.py).
+
+  - calibrate_image() por imagen de assets/images (mediana),
+  - todas las imágenes en secuencia contra calibrate_all() con el pool de
+    procesos (en una máquina de un núcleo el pool solo suma el arranque).
+
+Uso:
+    python benchmarks/bench_grid_calibration.py [procesos]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from utils.image_cache import IMAGES_DIR  # noqa: E402
+from utils.grid_calibration import EXTENSIONS, calibrate_all, calibrate_image  # noqa: E402
+
+
+def main(workers=None):
+    workers = int(workers) if workers else os.cpu_count()
+    paths = sorted(os.path.join(IMAGES_DIR, f) for f in os.listdir(IMAGES_DIR)
+                   if f.lower().endswith(EXTENSIONS))
+
+    times = []
+    t_all = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        calibrate_image(path)
+        times.append(time.perf_counter() - t0)
+    t_seq = time.perf_counter() - t_all
+    print(f"{len(paths)} imágenes: {np.median(times) * 1000:.0f} ms por imagen (mediana), "
+          f"{t_seq:.2f} s en secuencia")
+
+    t0 = time.perf_counter()
+    calibrate_all(workers=workers)
+    t_pool = time.perf_counter() - t0
+    print(f"calibrate_all() con {workers} proceso(s): {t_pool:.2f} s ({t_seq / t_pool:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,53 @@
+"""
+Compara los bytes que viajan por el websocket en cada rerun del canvas
+(argumentos de utils/canvas.py) antes (data URI con el PNG re-codificado) y
+después (URL estática).
+
+Uso:
+    python benchmarks/bench_image_payload.py [imagen]   # por defecto ej_1.png
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.helpers import load_image
+from utils.image_cache import get_cached_image
+from utils.static_assets import _publish, image_path
+from modules.visual import pil_to_base64
+from utils.canvas import canvas_args
+
+
+def main(image_name="ej_1.png"):
+    entry = get_cached_image(image_name)
+    if entry is None:
+        print(f"No existe {image_name}")
+        return
+
+    # Antes: decodificar con PIL + re-codificar PNG + base64 en cada rerun
+    t0 = time.perf_counter()
+    img = load_image(image_name)
+    b64 = pil_to_base64(img)
+    before_html = json.dumps(canvas_args(f"data:image/png;base64,{b64}", img.width, img.height))
+    t_before = time.perf_counter() - t0
+
+    # Después: la imagen se publica una vez y el iframe solo lleva la URL
+    url = _publish(entry, image_path(image_name))
+    t0 = time.perf_counter()
+    after_html = json.dumps(canvas_args(url, entry.width, entry.height))
+    t_after = time.perf_counter() - t0
+
+    before = len(before_html.encode())
+    after = len(after_html.encode())
+    print(f"Imagen: {image_name} ({len(entry.data):,} bytes en disco, {entry.width}x{entry.height})")
+    print(f"{'':<22}{'bytes/rerun':>14}{'ms/rerun':>12}")
+    print(f"{'antes (data URI)':<22}{before:>14,}{t_before * 1000:>12.2f}")
+    print(f"{'después (URL)':<22}{after:>14,}{t_after * 1000:>12.2f}")
+    print(f"Reducción: {before / after:,.0f}x ({before - after:,} bytes menos por rerun)")
+    print(f"URL: {url}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
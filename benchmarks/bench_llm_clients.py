@@ -0,0 +1,58 @@
+"""
+Costo de preparar el cliente LLM en cada llamada, antes y después del registro.
+
+No hace llamadas de red: mide solo la construcción/configuración del cliente,
+que es lo que get_ai_feedback pagaba en cada llamada.
+
+Uso:
+    python benchmarks/bench_llm_clients.py [iteraciones]
+"""
+import os
+import sys
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+import google.generativeai as genai
+from utils.llm_clients import gemini_model, openai_client, client_stats
+
+API_KEY = "bench-key-no-valida"
+
+
+def timeit(fn, n):
+    fn()  # calentamiento
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def old_gemini():
+    genai.configure(api_key=API_KEY)
+    llm = genai.GenerativeModel("gemini-2.5-flash")
+    # generate_content crea el cliente gRPC en la primera llamada tras configure()
+    from google.generativeai import client
+    return client.get_default_generative_client(), llm
+
+
+def old_openai():
+    return openai.OpenAI(api_key=API_KEY)
+
+
+def main(n=200):
+    n = int(n)
+    rows = [
+        ("gemini: configure + GenerativeModel", timeit(old_gemini, n), timeit(lambda: gemini_model(API_KEY), n)),
+        ("openai: OpenAI(...)", timeit(old_openai, n), timeit(lambda: openai_client(API_KEY).with_options(timeout=30), n)),
+    ]
+    print(f"{'':<38}{'antes µs':>12}{'después µs':>14}{'x':>8}")
+    for name, before, after in rows:
+        print(f"{name:<38}{before:>12.1f}{after:>14.1f}{before / after:>8.0f}")
+    print(client_stats())
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
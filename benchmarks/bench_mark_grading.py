@@ -0,0 +1,61 @@
+"""
+Costo de corregir las marcas del canvas (utils/mark_grading.py).
+
+  - grade_marks() para una entrega típica (2-6 marcas) de cada ejercicio
+    visual de data/db.json,
+  - marks_in_zones() sobre un lote de entregas (marcas x zonas en una sola
+    operación de NumPy) contra el doble bucle en Python.
+
+Uso:
+    python benchmarks/bench_mark_grading.py [entregas_del_lote]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from utils.canvas import Marks  # noqa: E402
+from utils.question_bank import QuestionBank  # noqa: E402
+from utils.mark_grading import calibration, grade_marks, marks_in_zones  # noqa: E402
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "db.json")
+
+
+def loop_in_zones(xs, zones):
+    return [[any(lo <= x <= hi for lo, hi in zones) for x in row] for row in xs]
+
+
+def main(batch=20_000):
+    batch = int(batch)
+    rng = random.Random(0)
+    visuals = QuestionBank.from_file(DB_PATH)["visual"]
+
+    times = []
+    for q in visuals:
+        marks = Marks(1236, [(rng.uniform(0, 900), 100) for _ in range(rng.randint(2, 6))])
+        t0 = time.perf_counter()
+        for _ in range(200):
+            grade_marks(q, marks)
+        times.append((time.perf_counter() - t0) / 200 * 1e6)
+    print(f"grade_marks(): {np.median(times):.1f} µs por entrega (mediana en {len(visuals)} ejercicios)")
+
+    _, zones = calibration(visuals[1])
+    xs = np.random.default_rng(0).uniform(0, 900, size=(batch, 6))
+    t0 = time.perf_counter()
+    inside = marks_in_zones(xs, zones)
+    t_np = time.perf_counter() - t0
+    zone_list = zones.tolist()
+    rows = xs.tolist()
+    t0 = time.perf_counter()
+    expected = loop_in_zones(rows, zone_list)
+    t_py = time.perf_counter() - t0
+    assert (inside == np.array(expected)).all()
+    print(f"lote de {batch} entregas x 6 marcas x {len(zones)} zonas: NumPy {t_np * 1000:.1f} ms, "
+          f"bucle Python {t_py * 1000:.1f} ms ({t_py / t_np:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
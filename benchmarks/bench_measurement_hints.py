@@ -0,0 +1,76 @@
+"""
+Cobertura de utils/measurement_hints.py sobre los ejercicios de data/db.json.
+
+Para cada ejercicio visual con duración (o frecuencia) genera respuestas
+incorrectas de dos clases:
+  - errores mecánicos (cuadros de más o de menos, x5, lpm en vez de ms, RR
+    en vez de frecuencia...), que deberían recibir una pista local,
+  - errores "de criterio" (marca corrida al azar, entre la tolerancia y
+    30 ms o dos tolerancias), que en general van al LLM; los que caen cerca
+    de 40 ms reciben la pista de "un cuadrito", que también es correcta,
+y cuenta cuántas llamadas al LLM se evitan, cuántas pistas locales caen en
+errores de criterio y cuánto tarda classify().
+
+Uso:
+    python benchmarks/bench_measurement_hints.py [respuestas_por_ejercicio]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.question_bank import QuestionBank  # noqa: E402
+from utils.measurement_hints import NON_DURATION_PREFIXES, RATE_TOPICS, classify  # noqa: E402
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "db.json")
+
+
+def mechanical(q, rng):
+    c = q["correct_ms"]
+    if q["topic"] in RATE_TOPICS:
+        return rng.choice([round(60000 / c), round(1500 / c), round(300 / c, 1)])
+    options = [c + rng.choice((-1, 1)) * rng.randint(1, 2) * 40, c + rng.choice((-1, 1)) * 200, c * 5]
+    bpm = round(60000 / c)
+    if bpm < c / 2 or bpm > c * 2:
+        options.append(bpm)  # lpm que no se confunde con una duración plausible
+    return rng.choice([v for v in options if v > 0])
+
+
+def judgement(q, rng):
+    c, tol = q["correct_ms"], q["tolerance_ms"]
+    while True:
+        v = round(c + rng.choice((-1, 1)) * rng.uniform(tol + 1, max(2 * tol, 30)))
+        if v > 0:
+            return v
+
+
+def main(per_question=200):
+    per_question = int(per_question)
+    rng = random.Random(0)
+    visuals = [q for q in QuestionBank.from_file(DB_PATH)["visual"]
+               if not q["topic"].upper().startswith(NON_DURATION_PREFIXES)]
+
+    hinted = missed = false_hints = 0
+    calls = 0
+    t0 = time.perf_counter()
+    for q in visuals:
+        for _ in range(per_question):
+            hinted_m = classify(q, mechanical(q, rng)) is not None
+            hinted += hinted_m
+            missed += not hinted_m
+            false_hints += classify(q, judgement(q, rng)) is not None
+            calls += 2
+    elapsed = (time.perf_counter() - t0) / calls * 1e6
+
+    n = len(visuals) * per_question
+    print(f"{len(visuals)} ejercicios, {n} errores mecánicos + {n} de criterio")
+    print(f"errores mecánicos con pista local: {hinted / n:.0%} (al LLM: {missed})")
+    print(f"errores de criterio con pista local (a ~40 ms del valor): {false_hints / n:.0%}")
+    print(f"llamadas al LLM evitadas si la mitad de los errores son mecánicos: "
+          f"{(hinted + false_hints) / (2 * n):.0%}; classify() {elapsed:.1f} µs")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
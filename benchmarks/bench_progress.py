@@ -0,0 +1,69 @@
+"""
+Benchmark del costo por rerun de las consultas de progreso.
+
+Compara, para sesiones con cada vez más intentos acumulados, lo que se hacía
+en cada rerun (copias inline de los recorridos anteriores):
+  - barra lateral: contar correctas con una lista por comprensión,
+  - visual: filtrar los intentos de la pregunta para saber si acertó a la primera,
+  - open_q: any(...) para no registrar dos veces el mismo caso,
+con las mismas consultas sobre ProgressTracker.
+
+Uso:
+    python benchmarks/bench_progress.py [repeticiones]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.progress import ProgressTracker  # noqa: E402
+
+SIZES = (10, 100, 1_000, 5_000, 20_000)
+RESULTS = ("correct_first_try", "failed_first_try", "correct_second_try", "failed_second_try", "correct", "fail")
+
+
+def legacy_rerun(attempts, qid):
+    correct = len([a for a in attempts if "correct" in a["result"]])
+    total = len(attempts)
+    pct = round((correct / total) * 100)
+    mine = [a for a in attempts if a.get("id") == qid]
+    first_try_success = any("correct_first_try" == a.get("result") for a in mine)
+    already = any(a["id"] == qid for a in attempts)
+    return pct, first_try_success, already
+
+
+def tracker_rerun(progress, qid):
+    return progress.percent, progress.first_try_ok(qid), progress.has_attempt(qid)
+
+
+def median_us(fn, reps):
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e6
+
+
+def main(reps=200):
+    reps = int(reps)
+    rng = random.Random(0)
+    print(f"{'intentos':>10}{'recorridos µs':>16}{'tracker µs':>13}")
+    for n in SIZES:
+        progress = ProgressTracker()
+        for _ in range(n):
+            progress.record(rng.randrange(1, 500), f"Tema {rng.randrange(8)}", rng.choice(RESULTS))
+        attempts = progress.attempts
+        qid = rng.randrange(1, 500)
+
+        assert legacy_rerun(attempts, qid) == tracker_rerun(progress, qid)
+        old = median_us(lambda: legacy_rerun(attempts, qid), reps)
+        new = median_us(lambda: tracker_rerun(progress, qid), reps)
+        print(f"{n:>10}{old:>16.1f}{new:>13.2f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
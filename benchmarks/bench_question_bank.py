@@ -0,0 +1,117 @@
+"""
+Benchmark del banco de preguntas: recorridos lineales vs QuestionBank indexado.
+
+Genera un banco sintético (por defecto 50.000 preguntas visuales repartidas en
+temas contiguos) y compara:
+  - navegación "mismo tema" / "siguiente tema" con los antiguos find_next_*
+    (copias inline de la versión con recorrido lineal) y con los punteros
+    precalculados de QuestionList,
+  - búsqueda por id (recorrido de la lista vs índice),
+  - costo de construir el banco (validación + congelado + índices).
+
+Uso:
+    python benchmarks/bench_question_bank.py [n_preguntas] [n_temas]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.question_bank import QuestionBank  # noqa: E402
+
+
+# ---------- versión anterior (recorridos lineales) ----------
+def legacy_same_topic(visuals, current_idx):
+    current_topic = visuals[current_idx].get("topic")
+    for i in range(current_idx + 1, len(visuals)):
+        if visuals[i].get("topic") == current_topic:
+            return i
+    return None
+
+
+def legacy_next_topic(visuals, current_idx):
+    current_topic = visuals[current_idx].get("topic")
+    for i in range(current_idx + 1, len(visuals)):
+        if visuals[i].get("topic") != current_topic:
+            return i
+    return None
+
+
+def legacy_by_id(visuals, qid):
+    for q in visuals:
+        if q["id"] == qid:
+            return q
+    return None
+
+
+def synthetic_bank(n, topics):
+    per_topic = max(1, n // topics)
+    return {
+        "visual": [
+            {
+                "id": i + 1,
+                "topic": f"Tema {i // per_topic}",
+                "title": f"Ejercicio {i + 1}",
+                "image": "ej_1.png",
+                "instruction": "Mide el intervalo PR",
+                "ms_per_pixel": 4.0,
+                "correct_ms": 160,
+                "tolerance_ms": 20,
+                "valid_zone_pairs": [{"x_min": 10, "x_max": 40}, {"x_min": 60, "x_max": 90}],
+            }
+            for i in range(n)
+        ],
+        "multiple_choice": [],
+        "open": [],
+    }
+
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e6, max(samples) * 1e6
+
+
+def main(n=50_000, topics=25):
+    n, topics = int(n), int(topics)
+    data = synthetic_bank(n, topics)
+    raw = data["visual"]
+
+    t0 = time.perf_counter()
+    bank = QuestionBank(data)
+    build_ms = (time.perf_counter() - t0) * 1000
+    visuals = bank["visual"]
+
+    rng = random.Random(0)
+    idxs = [rng.randrange(n) for _ in range(200)]
+    ids = [raw[i]["id"] for i in idxs]
+
+    # Los punteros deben coincidir con los recorridos
+    for i in idxs:
+        assert visuals.next_same_topic(i) == legacy_same_topic(raw, i)
+        assert visuals.next_other_topic(i) == legacy_next_topic(raw, i)
+
+    print(f"banco sintético: {n} preguntas, {topics} temas; construcción {build_ms:.0f} ms")
+    print(f"{'operación':<22}{'lineal med µs':>15}{'máx µs':>10}{'índice med µs':>16}{'máx µs':>10}")
+    rows = [
+        ("mismo tema", (legacy_same_topic, [(raw, i) for i in idxs]),
+         (visuals.next_same_topic, [(i,) for i in idxs])),
+        ("siguiente tema", (legacy_next_topic, [(raw, i) for i in idxs]),
+         (visuals.next_other_topic, [(i,) for i in idxs])),
+        ("por id", (legacy_by_id, [(raw, q) for q in ids]),
+         (visuals.by_id, [(q,) for q in ids])),
+    ]
+    for label, (old_fn, old_args), (new_fn, new_args) in rows:
+        old_med, old_max = timed(old_fn, old_args)
+        new_med, new_max = timed(new_fn, new_args)
+        print(f"{label:<22}{old_med:>15.1f}{old_max:>10.1f}{new_med:>16.2f}{new_max:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,79 @@
+"""
+Benchmark de arranque y memoria: db.json (QuestionBank) vs almacén SQLite.
+
+Para bancos sintéticos de distinto tamaño mide, en un proceso nuevo por caso,
+el tiempo hasta tener la primera pregunta en mano (abrir/parsear + leer la
+pregunta 0 + su puntero de navegación) y el aumento de memoria residente.
+También mide una búsqueda FTS en el almacén SQLite (en el banco sintético
+"intervalo PR" coincide con todas las preguntas, es el peor caso de ranking).
+
+Uso:
+    python benchmarks/bench_question_store.py [tamaños separados por coma]
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from utils.question_store import import_json  # noqa: E402
+from bench_question_bank import synthetic_bank  # noqa: E402
+
+PROBE = r"""
+import sys, time, json
+from utils.question_store import load_bank
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+before = rss_kb()
+t0 = time.perf_counter()
+bank = load_bank(sys.argv[1])
+visuals = bank["visual"]
+q = visuals[0]
+visuals.next_other_topic(0)
+elapsed = time.perf_counter() - t0
+out = {"ms": elapsed * 1000, "rss_mb": (rss_kb() - before) / 1024}
+if hasattr(bank, "search"):
+    t0 = time.perf_counter()
+    hits = bank.search("intervalo PR", limit=20)
+    out["fts_ms"] = (time.perf_counter() - t0) * 1000
+print(json.dumps(out))
+"""
+
+
+def probe(path):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, "-c", PROBE, path], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def main(sizes="1000,10000,50000"):
+    tmp = tempfile.mkdtemp()
+    try:
+        print(f"{'preguntas':>10}{'json ms':>10}{'json MB':>10}{'sqlite ms':>11}{'sqlite MB':>11}{'fts ms':>9}")
+        for n in (int(s) for s in str(sizes).split(",")):
+            json_path = os.path.join(tmp, f"db_{n}.json")
+            db_path = os.path.join(tmp, f"db_{n}.sqlite3")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(synthetic_bank(n, 25), f)
+            import_json(json_path, db_path)
+
+            j = probe(json_path)
+            s = probe(db_path)
+            print(f"{n:>10}{j['ms']:>10.0f}{j['rss_mb']:>10.1f}{s['ms']:>11.1f}{s['rss_mb']:>11.1f}{s['fts_ms']:>9.1f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
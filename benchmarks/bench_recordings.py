@@ -0,0 +1,128 @@
+"""
+Registros largos mapeados en memoria (utils/recordings.py): latencia de la
+ventana y memoria residente sobre registros sintéticos de varias horas.
+
+Para cada duración arma el registro y su pirámide (por bloques) en un
+directorio temporal y, en un proceso nuevo por caso, mide:
+  - memmap: abrir el registro, N ventanas al azar (lectura con
+    Recording.window() y la WaveformView completa, LTTB incluido) y la vista
+    general desde la pirámide,
+  - carga completa: np.load() sin mmap y las mismas ventanas cortando el
+    array, y la vista general recorriendo todas las muestras,
+  - el aumento de VmRSS del proceso y cuánto del registro queda residente
+    (páginas de los .npy en /proc/self/smaps, o el array entero).
+Los archivos recién escritos están en la caché de páginas del sistema: la
+latencia es la de un servidor que ya sirvió ese registro, no la de un disco frío.
+
+Uso:
+    python benchmarks/bench_recordings.py [horas separadas por coma] [fs] [ventanas]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import utils.recordings as recordings  # noqa: E402
+
+PROBE = r"""
+import re, sys, time, json
+import numpy as np
+import utils.recordings as recordings
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+def mapped_kb(suffix):
+    total, current = 0, ""
+    with open("/proc/self/smaps") as f:
+        for line in f:
+            if re.match(r"^[0-9a-f]+-[0-9a-f]+ ", line):
+                current = line.split()[-1]
+            elif line.startswith("Rss:") and current.endswith(suffix):
+                total += int(line.split()[1])
+    return total
+
+recordings.RECORDINGS_DIR = sys.argv[1]
+recordings.MANIFEST_PATH = sys.argv[1] + "/recordings.json"
+name, mode, n_windows = sys.argv[2], sys.argv[3], int(sys.argv[4])
+width, window_ms = 1024, 10000
+rng = np.random.default_rng(1)
+
+before = rss_kb()
+t0 = time.perf_counter()
+rec = recordings.open_recording(name)
+if mode == "load":
+    full = np.load(f"{sys.argv[1]}/{name}.npy")
+open_ms = (time.perf_counter() - t0) * 1000
+
+starts = (rng.random(n_windows) * (rec.duration_ms - window_ms)).astype(int)
+reads, views = [], []
+for start in starts:
+    t0 = time.perf_counter()
+    if mode == "load":
+        i0 = int(start * rec.fs / 1000)
+        y = full[i0:i0 + int(window_ms * rec.fs / 1000)].astype(np.float32) / 1000.0
+    else:
+        y = rec.window(int(start), window_ms)
+    t1 = time.perf_counter()
+    recordings._build_view({"fs": rec.fs, "samples": y}, width, rec.span_mv, int(start))
+    reads.append(t1 - t0)
+    views.append(time.perf_counter() - t0)
+
+t0 = time.perf_counter()
+if mode == "load":
+    edges = np.linspace(0, len(full), width + 1).astype(np.int64)[:-1]
+    np.minimum.reduceat(full, edges), np.maximum.reduceat(full, edges)
+else:
+    recordings.overview_image(rec, width, 60, (0, window_ms))
+overview_ms = (time.perf_counter() - t0) * 1000
+
+trace_kb = full.nbytes / 1024 if mode == "load" else mapped_kb(".npy")
+print(json.dumps({"open_ms": open_ms, "read_ms": np.median(reads) * 1000, "p50": np.median(views) * 1000,
+                  "p95": np.percentile(views, 95) * 1000, "overview_ms": overview_ms,
+                  "rss_mb": (rss_kb() - before) / 1024, "trace_mb": trace_kb / 1024}))
+"""
+
+
+def probe(directory, name, mode, windows):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, "-c", PROBE, directory, name, mode, str(windows)], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def main(hours="1,8,24", fs=250, windows=500):
+    fs, windows = float(fs), int(windows)
+    tmp = tempfile.mkdtemp()
+    recordings.RECORDINGS_DIR = tmp
+    recordings.MANIFEST_PATH = os.path.join(tmp, "recordings.json")
+    try:
+        print(f"{windows} ventanas de 10 s al azar por caso; 'trazo MB' = páginas del registro residentes en el proceso")
+        print(f"{'registro':<10}{'MB':>5}{'build s':>9}  {'modo':<8}{'abrir ms':>9}{'lectura':>10}"
+              f"{'vista p50':>11}{'p95':>8}{'general ms':>11}{'RSS MB':>8}{'trazo MB':>10}")
+        for h in (float(v) for v in str(hours).split(",")):
+            name = f"sint_{h:g}h"
+            t0 = time.perf_counter()
+            entry = recordings.synthetic_recording(name, h * 3600, fs, pauses=[(h * 1800, 2400)])
+            build = time.perf_counter() - t0
+            size = sum(os.path.getsize(os.path.join(tmp, entry[k])) for k in ("file", "pyramid")) / 1024 / 1024
+            for mode in ("memmap", "load"):
+                r = probe(tmp, name, mode, windows)
+                print(f"{f'{h:g} h':<10}{size:>5.0f}{build:>9.1f}  {mode:<8}{r['open_ms']:>9.1f}"
+                      f"{r['read_ms']:>8.3f}ms{r['p50']:>9.1f}ms{r['p95']:>6.1f}ms{r['overview_ms']:>11.1f}"
+                      f"{r['rss_mb']:>8.1f}{r['trace_mb']:>10.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
@@ -0,0 +1,66 @@
+"""
+Costo de una muestra de utils/session_metrics.py.
+
+Arma N sesiones sintéticas parecidas a las reales (progreso con muchos
+intentos, feedback de la IA guardado, estado por pregunta) y mide:
+  - sample(): recorrer todas las sesiones con Pympler de una vez,
+  - SessionMetricsSampler.tick(): la ronda con presupuesto que usa el hilo
+    de fondo, y cuántas rondas hacen falta para cubrir todas las sesiones.
+
+Uso:
+    python benchmarks/bench_session_metrics.py [sesiones] [intentos_por_sesion]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.progress import ProgressTracker  # noqa: E402
+from utils.question_state import question_state  # noqa: E402
+from utils.session_metrics import SessionMetricsSampler, sample  # noqa: E402
+
+
+def synthetic_session(attempts, rng):
+    state = {"user_data": {"name": "Estudiante", "dni": "00000000"}, "visual_idx": 3, "mc_idx": 1}
+    progress = ProgressTracker()
+    for _ in range(attempts):
+        progress.record(rng.randrange(1, 300), f"Tema {rng.randrange(8)}", rng.choice(("correct", "fail")))
+    state["progress"] = progress
+    for qid in range(3):
+        qs = question_state("visual", qid, session=state)
+        qs["ai_feedback"] = "Revisa el inicio de la onda P. " * 40
+        qs["logic"] = "Conté tres cuadritos grandes. " * 5
+    return state
+
+
+def main(sessions=50, attempts=500):
+    sessions, attempts = int(sessions), int(attempts)
+    rng = random.Random(0)
+    fake = [(f"s{i}", synthetic_session(attempts, rng)) for i in range(sessions)]
+
+    samples = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        snap = sample(sessions=fake, media={})
+        samples.append(time.perf_counter() - t0)
+    top = snap["by_session"][0]
+    print(f"{sessions} sesiones x {attempts} intentos: sample() {min(samples) * 1000:.1f} ms, "
+          f"{snap['state_bytes'] / 1024:.0f} KB de estado")
+
+    sampler = SessionMetricsSampler(interval=0)
+    ticks, rounds = [], 0
+    while len(sampler._rows) < sessions:
+        t0 = time.perf_counter()
+        sampler.tick(sessions=fake, media={})
+        ticks.append(time.perf_counter() - t0)
+        rounds += 1
+    print(f"tick() con presupuesto de {sampler.budget * 1000:.0f} ms: máx {max(ticks) * 1000:.1f} ms por ronda, "
+          f"{rounds} rondas para medir todas las sesiones")
+    print(f"sesión más pesada: {top['state_bytes'] / 1024:.0f} KB; claves: "
+          + ", ".join(f"{k}={n / 1024:.0f} KB" for k, n in top["top_keys"][:3]))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,96 @@
+"""
+Huella de st.session_state en una sesión larga, medida con Pympler.
+
+Reproduce sobre un dict las escrituras que hace cada módulo por pregunta:
+  - antes: claves sueltas "<nombre>_<id>" tal como las dejaban visual, multiple
+    y open_q (solo valores propios; los valores de widgets ya los limpia
+    Streamlit cuando el widget deja de mostrarse),
+  - después: utils/question_state.py con la ventana por defecto,
+y mide asizeof() del estado a medida que el estudiante avanza por un banco
+sintético de preguntas con ids distintos (vueltas por un banco grande, o
+varios cursos).
+
+Uso:
+    python benchmarks/bench_session_state.py [preguntas_visitadas] [ventana]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pympler import asizeof  # noqa: E402
+from utils.question_state import question_state, clear_question_state  # noqa: E402
+
+FEEDBACK = "Revisa el inicio de la onda P: " + "x" * 1200
+EXPLANATION = "Conté tres cuadritos grandes desde el inicio de la P hasta el QRS. " * 3
+MODULES = ("visual", "multiple_choice", "open")
+
+
+# ---------- antes ----------
+def legacy_visit(session, module, qid):
+    if module == "visual":
+        for key in ["first_expl_sent", "ai_feedback", "attempt_failed", "solved_success", "failed_second_attempt"]:
+            session.setdefault(f"{key}_{qid}", False)
+        session[f"attempt_failed_{qid}"] = True
+        session[f"logic_{qid}"] = EXPLANATION
+        session[f"first_expl_sent_{qid}"] = True
+        session[f"ai_feedback_{qid}"] = FEEDBACK
+        session[f"second_ms_value_{qid}"] = 160
+        session[f"solved_success_{qid}"] = True
+        session[f"show_success_message_{qid}"] = True
+        # reset_question_state(qid) al navegar
+        for k in [f"ai_feedback_{qid}", f"user_ms_{qid}", f"attempt_failed_{qid}", f"solved_success_{qid}",
+                  f"second_ms_value_{qid}", f"first_expl_sent_{qid}", f"logic_{qid}",
+                  f"failed_second_attempt_{qid}", f"show_success_message_{qid}", f"show_error_message_{qid}"]:
+            session.pop(k, None)
+    elif module == "multiple_choice":
+        session[f"mc_answered_{qid}"] = True       # nunca se borraba
+    else:
+        session[f"status_{qid}"] = "feedback"
+        session[f"feedback_{qid}"] = FEEDBACK
+        session[f"result_{qid}"] = "correct"
+        for k in (f"status_{qid}", f"feedback_{qid}", f"result_{qid}"):
+            session.pop(k, None)
+
+
+# ---------- después ----------
+def namespaced_visit(session, module, qid, window):
+    qs = question_state(module, qid, window=window, session=session)
+    if module == "visual":
+        for key in ["first_expl_sent", "ai_feedback", "attempt_failed", "solved_success", "failed_second_attempt"]:
+            qs.setdefault(key, False)
+        qs.key("user_ms")
+        qs["attempt_failed"] = True
+        qs["logic"] = EXPLANATION
+        qs["first_expl_sent"] = True
+        qs["ai_feedback"] = FEEDBACK
+        qs["second_ms_value"] = 160
+        qs["solved_success"] = True
+        clear_question_state(module, qid, session=session)
+    elif module == "multiple_choice":
+        qs.key("sel")
+        qs["answered"] = True
+    else:
+        qs["status"] = "feedback"
+        qs["feedback"] = FEEDBACK
+        qs["result"] = "correct"
+        clear_question_state(module, qid, session=session)
+
+
+def main(visits=20_000, window=None):
+    visits = int(visits)
+    window = int(window) if window else None
+    legacy, namespaced = {}, {}
+    checkpoints = sorted({100, 1_000, 5_000, visits})
+    print(f"{'preguntas':>10}{'antes KB':>11}{'claves':>9}{'después KB':>13}{'claves':>9}")
+    for i in range(1, visits + 1):
+        module = MODULES[i % 3]
+        legacy_visit(legacy, module, i)
+        namespaced_visit(namespaced, module, i, window)
+        if i in checkpoints:
+            print(f"{i:>10}{asizeof.asizeof(legacy) / 1024:>11.1f}{len(legacy):>9}"
+                  f"{asizeof.asizeof(namespaced) / 1024:>13.1f}{len(namespaced):>9}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,73 @@
+"""
+Escritura diferida a Sheets contra una hoja falsa local.
+
+Mide cuánto bloquea al usuario encolar un resultado (antes: un round trip
+completo a Sheets) y comprueba que los reintentos no duplican filas. Con una
+hoja que ya tiene muchas filas, mide cuántas celdas de claves se leen para
+reintentar un lote cuyo envío quedó en duda (antes: la columna entera).
+
+Uso:
+    python benchmarks/bench_sheets_writer.py [n_filas] [latencia_s]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.sheets_writer as sw
+from utils.sheets_writer import ResultSpool, SheetsWriter
+from utils.sheets_fake import FakeWorksheet
+
+
+def main(n=200, latency=0.3):
+    n, latency = int(n), float(latency)
+    sw.BACKOFF_BASE = 0.05  # reintentos rápidos para el benchmark
+
+    ws = FakeWorksheet(latency=latency, fail_next=1, fail_after_write=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = ResultSpool(os.path.join(tmp, "spool.sqlite3"))
+        writer = SheetsWriter(spool, lambda name: ws, interval=0.05)
+        writer.start()
+
+        t0 = time.perf_counter()
+        for i in range(n):
+            spool.put("Registro_EKG", f"key-{i}", ["2025-01-01", f"alumno {i}", i])
+            spool.put("Registro_EKG", f"key-{i}", ["2025-01-01", f"alumno {i}", i])  # doble encolado
+            writer.notify()
+        enqueue_ms = (time.perf_counter() - t0) * 1000 / n
+
+        deadline = time.time() + 60
+        while spool.depth() and time.time() < deadline:
+            time.sleep(0.05)
+        writer.stop()
+
+        keys = [r[-1] for r in ws.rows]
+        print(f"Filas encoladas: {n} (cada una dos veces)")
+        print(f"Bloqueo por encolado: {enqueue_ms:.2f} ms/fila  (antes: ~{latency * 1000:.0f} ms de round trip)")
+        print(f"Llamadas a append_rows: {ws.calls}")
+        print(f"Filas en la hoja: {len(ws.rows)}  únicas: {len(set(keys))}")
+        print(writer.metrics())
+
+    # Hoja grande: reintento después de un envío en duda
+    big = FakeWorksheet()
+    big.rows = [["2024-01-01", f"viejo {i}", i, f"old-{i}"] for i in range(100_000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = ResultSpool(os.path.join(tmp, "spool.sqlite3"))
+        writer = SheetsWriter(spool, lambda name: big)
+        spool.put("Registro_EKG", "warm", ["2025-01-01", "alumno", 0])
+        writer.flush_once()  # la respuesta de append_rows deja conocida la última fila
+        big.fail_after_write = 1
+        for i in range(50):
+            spool.put("Registro_EKG", f"dudosa-{i}", ["2025-01-01", f"alumno {i}", i])
+        writer.flush_once()
+        spool.mark_failed([i for i, _, _, _ in spool.due_batch(now=float("inf"))[1]], 0)  # reintento ya
+        writer.flush_once()
+        keys = [r[-1] for r in big.rows]
+        print(f"\nHoja con {len(big.rows):,} filas: celdas leídas para reintentar {big.cells_read} "
+              f"(columna entera: {len(big.rows):,}); duplicadas: {len(keys) - len(set(keys))}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
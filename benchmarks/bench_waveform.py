@@ -0,0 +1,113 @@
+"""
+Ejercicios con trazo vectorial (utils/waveform.py) contra la imagen PNG.
+
+  - lttb() sobre trazos sintéticos de distinta duración y frecuencia de
+    muestreo al doble del ancho del canvas, y cuánto de la amplitud de R
+    conserva frente a quedarse con una muestra cada k (stride),
+  - bytes del payload del trazo de db.json contra la imagen del mismo
+    ejercicio (rendition del canvas en base64),
+  - bytes de los argumentos del canvas por rerun con streamlit.testing: el
+    trazo viaja una vez y, cuando la instancia lo confirma (campo "d"), los
+    reruns siguientes llevan solo los argumentos chicos. AppTest no ejecuta
+    el JavaScript, así que la confirmación se simula con el valor que
+    mandaría el componente.
+
+Uso:
+    python benchmarks/bench_waveform.py [reruns]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import logging
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from utils.question_bank import QuestionBank  # noqa: E402
+from utils.renditions import CANVAS_WIDTH, resolve_rendition  # noqa: E402
+from utils.waveform import POINTS_PER_PX, lttb, waveform_view  # noqa: E402
+
+USER = {k: "x" for k in ["name", "dni", "sex", "country", "level", "term", "university",
+                         "experience", "formal_training", "clinical_frequency"]}
+
+
+def synthetic(seconds, fs, bpm=75):
+    t = np.arange(int(seconds * fs)) * 1000.0 / fs
+    phase = np.mod(t, 60000.0 / bpm)
+    waves = ((0.15, 150, 25), (-0.1, 265, 8), (1.2, 285, 10), (-0.25, 305, 8), (0.3, 520, 45))
+    return sum(a * np.exp(-0.5 * ((phase - mu) / sd) ** 2) for a, mu, sd in waves)
+
+
+def canvas_element(node):
+    if type(node).__name__ == "UnknownElement" and node.type == "component_instance":
+        return node
+    for child in (getattr(node, "children", None) or {}).values():
+        found = canvas_element(child)
+        if found is not None:
+            return found
+    return None
+
+
+def main(reruns=10):
+    reruns = int(reruns)
+    n_out = POINTS_PER_PX * CANVAS_WIDTH
+
+    # ---------- LTTB ----------
+    print(f"LTTB a {n_out} puntos ({POINTS_PER_PX} por px de {CANVAS_WIDTH}):")
+    print(f"{'trazo':<16}{'muestras':>9}{'tiempo':>10}{'R lttb':>9}{'R stride':>10}")
+    for seconds, fs in ((10, 500), (10, 1000), (60, 1000)):
+        y = synthetic(seconds, fs)
+        t0 = time.perf_counter()
+        idx = lttb(y, n_out)
+        elapsed = time.perf_counter() - t0
+        stride = y[::max(1, len(y) // n_out)]
+        r = y.max()
+        print(f"{seconds:>3} s a {fs:>4} Hz{len(y):>10}{elapsed * 1000:>8.1f}ms"
+              f"{y[idx].max() / r:>9.1%}{stride.max() / r:>10.1%}")
+
+    # ---------- Payload contra la imagen ----------
+    bank = QuestionBank.from_file("data/db.json")
+    q = next(q for q in bank["visual"] if q.get("waveform"))
+    view = waveform_view(q, CANVAS_WIDTH)
+    payload_bytes = len(json.dumps(view.payload))
+    print(f"\nejercicio {q['id']}: {len(q['waveform']['samples'])} muestras, "
+          f"{len(view.payload['x'])} puntos, {view.width}x{view.height} px")
+    print(f"payload del trazo: {payload_bytes / 1024:.1f} KB")
+    png = next((p for p in bank["visual"] if p.get("image") == "ej_1.png"), None)
+    if png is not None:
+        rendition = resolve_rendition(png["image"], CANVAS_WIDTH)
+        with open(rendition.path, "rb") as f:
+            b64 = len(base64.b64encode(f.read()))
+        print(f"imagen {png['image']} ({rendition.width} px) en base64: {b64 / 1024:.1f} KB "
+              f"({b64 / payload_bytes:.1f}x)")
+
+    # ---------- Bytes por rerun ----------
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.session_state["user_data"] = USER
+    at.session_state["welcome_completed"] = True
+    at.run()
+    at.session_state["visual_idx"] = [p["id"] for p in bank["visual"]].index(q["id"])
+    at.sidebar.radio[0].set_value("📏 Medición de Intervalos").run()
+
+    key = f"q:visual:{q['id']}:canvas"
+    sizes = [len(canvas_element(at._tree).proto.json_args)]
+    # Lo que manda la instancia al terminar de dibujar el trazo
+    ack = {"w": view.width, "c": [], "l": [], "i": "bench", "d": view.payload["key"]}
+    for i in range(reruns):
+        at.session_state[key] = ack
+        at.number_input[0].set_value(100 + i).run()
+        sizes.append(len(canvas_element(at._tree).proto.json_args))
+    print(f"\nargumentos del canvas: primer render {sizes[0] / 1024:.1f} KB, "
+          f"después de la confirmación {np.mean(sizes[1:]):,.0f} bytes por rerun ({reruns} reruns)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
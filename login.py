@@ -1,6 +1,6 @@
 import os
-from PIL import Image
 import streamlit as st
+from utils.static_assets import show_image
 
 def login_screen():
 
@@ -40,10 +40,9 @@ def login_screen():
     with c2:
         logo_col1, logo_col2, logo_col3 = st.columns([0.7, 4, 1])
         with logo_col2:
-            try:
-                logo = Image.open("assets/logo/logo.png")
-                st.image(logo, width=900)
-            except FileNotFoundError:
+            if os.path.exists("assets/logo/logo.png"):
+                show_image("assets/logo/logo.png", width=900)
+            else:
                 st.error("Error: No se encontró el logo en la ruta relativa 'assets/logo/logo.png'.")
 
     # ---------- TEXTO ----------
@@ -1,26 +1,10 @@
 import streamlit as st
+from utils.question_state import question_state
 
 def register_result_mc(q, selected):
     """Guarda resultado en la estructura global de progreso."""
-    topic = q.get("topic", "Teoría ECG")
-
     result = "correct" if selected == q["correct_answer"] else "fail"
-
-    # Registrar intento total
-    st.session_state["progress"]["attempts"].append({
-        "id": q["id"],
-        "topic": topic,
-        "result": result
-    })
-
-    # Registrar por tema
-    if topic not in st.session_state["progress"]["by_topic"]:
-        st.session_state["progress"]["by_topic"][topic] = {"ok": 0, "fail": 0}
-
-    if result == "correct":
-        st.session_state["progress"]["by_topic"][topic]["ok"] += 1
-    else:
-        st.session_state["progress"]["by_topic"][topic]["fail"] += 1
+    st.session_state["progress"].record(q["id"], q.get("topic", "Teoría ECG"), result)
 
 
 def render(data_list):
@@ -33,10 +17,12 @@ def render(data_list):
     # Si ya no hay más preguntas
     if idx >= len(data_list):
         st.success("🎉 ¡Completaste todas las preguntas teóricas!")
-        st.session_state["progress"]["completed"] = True
+        st.session_state["progress"].completed = True
         return
 
     q = data_list[idx]
+    # Estado de esta pregunta (utils/question_state.py); las anteriores se descartan solas
+    qs = question_state("multiple_choice", q["id"])
 
     st.markdown("<h2 style='margin-top:60px; margin-bottom:20px;'>📝 Pregunta Teórica</h2>", unsafe_allow_html=True)
     st.markdown(f"<h3>{q['question']}</h3>", unsafe_allow_html=True)
@@ -44,27 +30,24 @@ def render(data_list):
     options = list(q["options"].keys())
 
     # Mantener selección por pregunta
-    selected_key = f"mc_sel_{q['id']}"
     selected = st.radio(
         "Selecciona la respuesta:",
         options,
         index=0,
-        key=selected_key
+        key=qs.key("sel")
     )
 
     # Estado: ¿ya respondió esta pregunta?
-    answered_key = f"mc_answered_{q['id']}"
-    if answered_key not in st.session_state:
-        st.session_state[answered_key] = False
+    qs.setdefault("answered", False)
 
     # Mostrar botón solo si NO ha respondido todavía
-    if not st.session_state[answered_key]:
-        if st.button("Comprobar", key=f"btn_{q['id']}"):
+    if not qs["answered"]:
+        if st.button("Comprobar", key=qs.key("btn")):
             if not selected:
                 st.warning("Selecciona una opción antes de continuar.")
                 return
             
-            st.session_state[answered_key] = True
+            qs["answered"] = True
             register_result_mc(q, selected)
             st.rerun()
 
@@ -80,6 +63,6 @@ def render(data_list):
             st.info(f"👉 La respuesta correcta era: **{q['correct_answer']}**")
         
         st.markdown("---")
-        if st.button("➡️ Siguiente pregunta", key=f"next_{q['id']}"):
+        if st.button("➡️ Siguiente pregunta", key=qs.key("next")):
             st.session_state["mc_idx"] += 1
             st.rerun()
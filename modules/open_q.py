@@ -1,6 +1,9 @@
-from matplotlib import text
 import streamlit as st
-from utils.helpers import load_image, get_ai_feedback
+from utils.helpers import stream_ai_feedback
+from utils.renditions import DISPLAY_WIDTH, resolve_rendition
+from utils.static_assets import show_image
+from utils.question_state import question_state, clear_question_state
+from utils.diagnosis_matcher import FINDING_LABELS, get_matcher
 
 
 # ------------------------------------------------------------
@@ -8,24 +11,8 @@ from utils.helpers import load_image, get_ai_feedback
 # ------------------------------------------------------------
 def register_result_open(q, result):
 
-    topic = "Diagnóstico ECG"
-
-    # Evitar duplicaciones
-    already = any(a["id"] == q["id"] for a in st.session_state["progress"]["attempts"])
-    if not already:
-        st.session_state["progress"]["attempts"].append({
-            "id": q["id"],
-            "topic": topic,
-            "result": result
-        })
-
-        if topic not in st.session_state["progress"]["by_topic"]:
-            st.session_state["progress"]["by_topic"][topic] = {"ok": 0, "fail": 0}
-
-        if result == "correct":
-            st.session_state["progress"]["by_topic"][topic]["ok"] += 1
-        else:
-            st.session_state["progress"]["by_topic"][topic]["fail"] += 1
+    # once=True: un solo intento por caso (evita duplicaciones al recargar)
+    st.session_state["progress"].record(q["id"], "Diagnóstico ECG", result, once=True)
 
 
 # ------------------------------------------------------------
@@ -42,33 +29,27 @@ def render_open_all(open_list, api_key):
     # --------------- FIN DEL MÓDULO ----------------
     if idx >= len(open_list):
         st.success("🎉 ¡Has completado todos los casos diagnósticos!")
-        st.session_state["progress"]["completed"] = True
+        st.session_state["progress"].completed = True
 
         if st.button("🔄 Volver a empezar"):
             st.session_state["open_idx"] = 0
-            st.session_state["progress"]["attempts"] = []
-            st.session_state["progress"]["by_topic"] = {}
-            st.session_state["progress"]["completed"] = False
+            st.session_state["progress"].reset()
             st.experimental_rerun()
         return
 
     # Obtener caso actual
     q = open_list[idx]
 
-    # Keys consistentes por pregunta
-    status_key = f"status_{q['id']}"                # "input" o "feedback"
-    feedback_key = f"feedback_{q['id']}"
-    result_key = f"result_{q['id']}"
-
-    if status_key not in st.session_state:
-        st.session_state[status_key] = "input"
+    # Estado del caso (utils/question_state.py): status ("input" o "feedback"), feedback, result
+    qs = question_state("open", q["id"])
+    qs.setdefault("status", "input")
 
     st.markdown("<h2 style='margin-top:60px; margin-bottom:20px;'>🩺 Interpretación Diagnóstica del ECG</h2>", unsafe_allow_html=True)
 
 
     # Mostrar ECG
     try:
-        st.image(load_image(q["image"]), use_container_width=True)
+        show_image(resolve_rendition(q["image"], DISPLAY_WIDTH).path)
     except Exception:
         st.error("No se pudo cargar la imagen.")
 
@@ -78,9 +59,9 @@ def render_open_all(open_list, api_key):
     # ===========================================================
     #     FASE 1 — FORMULARIO ESTRUCTURADO + ANALISIS
     # ===========================================================
-    if st.session_state[status_key] == "input":
+    if qs["status"] == "input":
 
-        with st.form(key=f"form_{q['id']}"):
+        with st.form(key=qs.key("form")):
 
             st.subheader("1️⃣ Evaluación estructurada del ECG")
 
@@ -89,33 +70,33 @@ def render_open_all(open_list, api_key):
             with c1:
                 rhythm = st.selectbox("Ritmo:", 
                     ["Selecciona...", "Sinusal", "No sinusal", "Indeterminado"],
-                    key=f"rhythm_{q['id']}"
+                    key=qs.key("rhythm")
                 )
                 rate = st.selectbox("Frecuencia:", 
                     ["Selecciona...", "<60 (Bradicardia)", "60–100 (Normal)", ">100 (Taquicardia)"],
-                    key=f"rate_{q['id']}"
+                    key=qs.key("rate")
                 )
                 axis = st.selectbox("Eje:", 
                     ["Selecciona...", "Normal", "Izq", "Der", "Indeterminado"],
-                    key=f"axis_{q['id']}"
+                    key=qs.key("axis")
                 )
                 pr = st.selectbox("Intervalo PR:", 
                     ["Selecciona...", "Normal", "Prolongado", "Corto", "No medible"],
-                    key=f"pr_{q['id']}"
+                    key=qs.key("pr")
                 )
 
             with c2:
                 qrs = st.selectbox("QRS:", 
                     ["Selecciona...", "Estrecho", "Ancho"],
-                    key=f"qrs_{q['id']}"
+                    key=qs.key("qrs")
                 )
                 st_segment = st.selectbox("Segmento ST:", 
                     ["Selecciona...", "Normal", "Elevado", "Deprimido", "No evaluable"],
-                    key=f"st_{q['id']}"
+                    key=qs.key("st")
                 )
                 pwaves = st.selectbox("Ondas P:", 
                     ["Selecciona...", "Presentes", "Ausentes", "Anormales"],
-                    key=f"p_{q['id']}"
+                    key=qs.key("p")
                 )
 
             st.write("---")
@@ -144,6 +125,12 @@ def render_open_all(open_list, api_key):
             if invalid:
                 st.error("⚠️ Debes completar TODAS las secciones antes de enviar.")
             else:
+                # -------- Corrección local (utils/diagnosis_matcher.py) --------
+                findings = {"rhythm": rhythm, "rate": rate, "axis": axis, "pr": pr,
+                            "qrs": qrs, "st": st_segment, "p": pwaves}
+                grade = get_matcher(open_list).grade(q, ekg_description, justification, findings=findings)
+                result_status = "correct" if grade.correct else "fail"
+
                 structured = (
                     f"Ritmo: {rhythm}, Frecuencia: {rate}, "
                     f"Eje: {axis}, PR: {pr}, QRS: {qrs}, ST: {st_segment}, P: {pwaves}"
@@ -153,46 +140,17 @@ def render_open_all(open_list, api_key):
                     f"Descripción: {ekg_description}\n"
                     f"Justificación: {justification}"
                 )
-                instuction = "llegar al diagnóstico correcto basándote en tu análisis estructurado y justificación"
-                
-                context = f"Diagnóstico correcto: {q['correct_diagnosis']}\nClaves: {q['key_features']}"
-                
-                gold = (
-                    f"Diagnóstico correcto: {q['correct_diagnosis']}\n"
-                    f"Claves: {q['key_features']}"
-                )
-
-                # -------- Llamada a IA --------
-                with st.spinner("🤖 Analizando tu interpretación..."):
-                    prompt = (
-                        "Eres un cardiólogo experto. Evalúa la interpretación del estudiante.\n"
-                        "Indica si su diagnóstico concuerda o no. vas a decir Diagnóstico correcto! o Diagnóstico incorrecto!\n"
-                        "Explica brevemente en segunda persona sus aciertos o errores.\n\n"
-                        f"{gold}\n\n"
-                        f"Evaluación del estudiante:\n{structured}\n\n"
-                        f"{student_full}"
-                    )
 
-                    feedback = get_ai_feedback(api_key, "Experto ECG", prompt,instuction, context, model="gemini")
-
-                # ¿El estudiante mencionó el diagnóstico correcto?
-                import matplotlib
-                text = feedback.lower()
-                feedback_correct = ("diagnóstico correcto" in text) or ("diagnostico correcto" in text)
-
-                
-                # Evaluar si aparece en el texto del estudiante
-                result_status = "correct" if feedback_correct else "fail"
-
-
-                # Guardar estados
-                st.session_state[feedback_key] = feedback
-                st.session_state[result_key] = result_status
+                # Guardar estados; la explicación del LLM se pide en la fase 2
+                qs["result"] = result_status
+                qs["findings"] = grade.findings
+                qs["other"] = grade.other
+                qs["student"] = (structured, student_full)
 
                 register_result_open(q, result_status)
 
                 # Cambiar a modo feedback Y RECARGAR
-                st.session_state[status_key] = "feedback"
+                qs["status"] = "feedback"
                 st.rerun()  # <--- ESTA ES LA CLAVE
 
     # ===========================================================
@@ -202,20 +160,52 @@ def render_open_all(open_list, api_key):
         st.markdown("---")
         st.markdown("## 👩‍⚕️ Retroalimentación del docente")
 
-        res = st.session_state.get(result_key, "fail")
+        res = qs.get("result", "fail")
 
         if res == "correct":
             st.success("✅ ¡Diagnóstico correcto!")
         else:
-            st.error(f"❌ Diagnóstico incorrecto. Lo correcto era **{q['correct_diagnosis']}**")
+            st.error(f"❌ Diagnóstico incorrecto. Lo correcto era **{', '.join(q['correct_diagnosis'])}**")
+            if qs.get("other"):
+                st.warning(f"Propusiste: {', '.join(qs['other'])}")
+
+        # Hallazgos estructurados contra los esperados del caso
+        for field, (given, expected, ok) in qs.get("findings", {}).items():
+            label = FINDING_LABELS.get(field, field)
+            if ok:
+                st.markdown(f"✅ **{label}:** {given}")
+            else:
+                st.markdown(f"❌ **{label}:** {given} (esperado: {expected})")
 
-        st.info(st.session_state.get(feedback_key, "No hay feedback disponible."))
+        # La explicación se dibuja debajo del botón: el estudiante puede pasar
+        # al siguiente caso sin esperar al LLM
+        explanation = st.container()
 
         if st.button("➡️ Siguiente Caso"):
             st.session_state["open_idx"] += 1
-            # Limpieza de variables de estado de la pregunta anterior
-            del st.session_state[status_key]
-            if feedback_key in st.session_state: del st.session_state[feedback_key]
-            if result_key in st.session_state: del st.session_state[result_key]
+            # Limpieza del estado de la pregunta anterior (incluye los widgets del formulario)
+            clear_question_state("open", q["id"])
             
             st.rerun()
+
+        with explanation:
+            if qs.get("feedback"):
+                st.info(qs["feedback"])
+            elif not api_key:
+                st.caption("Sin API Key no hay explicación del docente; la corrección no la necesita.")
+            elif "student" in qs:
+                structured, student_full = qs["student"]
+                verdict = "correcto" if res == "correct" else "incorrecto"
+                instuction = "explicar por qué el diagnóstico del estudiante es correcto o incorrecto"
+                context = f"Diagnóstico correcto: {', '.join(q['correct_diagnosis'])}\nClaves: {q['key_features']}"
+                prompt = (
+                    "Eres un cardiólogo experto. El diagnóstico del estudiante ya fue corregido: "
+                    f"es {verdict}.\n"
+                    "Explica brevemente en segunda persona sus aciertos o errores.\n\n"
+                    f"{context}\n\n"
+                    f"Evaluación del estudiante:\n{structured}\n\n"
+                    f"{student_full}"
+                )
+                qs["feedback"] = st.write_stream(
+                    stream_ai_feedback(api_key, "Experto ECG", prompt, instuction, context, model="gemini", qid=q["id"])
+                )
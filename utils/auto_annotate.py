@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from utils.image_cache import IMAGES_DIR
+from utils.question_bank import QuestionBank, thaw
+from utils.grid_calibration import DB_PATH, calibrate_rgb
+
+
+# ----------------------------------------------------
+# ANOTACIÓN AUTOMÁTICA DE LOS EJERCICIOS VISUALES (en lote)
+# ----------------------------------------------------
+# Reemplaza el clic a clic de get_coords.py: para cada ejercicio visual de
+# data/db.json propone valid_zone_pairs y correct_ms a partir del trazo y los
+# deja en un archivo de revisión junto a db.json. Quien arma el banco solo
+# confirma (o corrige) las propuestas:
+#   python -m utils.auto_annotate propose [--workers N]   -> data/db.proposals.json
+#   (poner "accepted": true en las propuestas revisadas)
+#   python -m utils.auto_annotate apply                   -> las copia a db.json
+#
+# Por imagen (en paralelo, un proceso por núcleo):
+#   1. calibración desde la cuadrícula (utils/grid_calibration.py); si es
+#      ambigua se elige la hipótesis con una frecuencia cardíaca plausible y,
+#      si ninguna lo es, se usa el ms_per_pixel de db.json,
+#   2. trazo separado de la cuadrícula: píxeles oscuros en los tres canales
+#      (la cuadrícula es de color) menos el fondo de cada fila y columna,
+#   3. tiras (derivaciones apiladas) por filas sin trazo; se analiza la tira
+#      con más latidos,
+#   4. por columna, la extensión vertical del trazo (pendiente) y su distancia
+#      máxima a la línea de base (mediana móvil); todo vectorizado con NumPy,
+#   5. QRS = tramos empinados que llegan a la mitad de la pendiente máxima,
+#      con período refractario de 200 ms; sus bordes son el inicio y el final
+#      del QRS. Onda P = última deflexión antes del QRS (hasta 450 ms)
+#      separada por un segmento isoeléctrico; final de T = final de la
+#      primera deflexión después del QRS (hasta 800 ms).
+#
+# Las propuestas quedan en píxeles de la imagen original, igual que db.json.
+
+PROPOSALS_PATH = os.path.join(os.path.dirname(DB_PATH), "db.proposals.json")
+SUPPORTED_TOPICS = ("PR", "QRS", "QT", "FC")
+
+MIN_TRACE_INK = 60        # oscuridad mínima (0-255) del trazo sobre la cuadrícula
+MIN_STRIP_ROWS = 10
+REFRACTORY_MS = 200
+PR_MAX_MS = 450
+QT_MAX_MS = 800
+MIN_WAVE_MS = 20
+MIN_QRS_MS = 20
+ZONE_MARGIN_MS = 40       # un cuadro chico a cada lado de la zona válida
+PLAUSIBLE_BPM = (30, 220)
+
+
+# ---------- TRAZO ----------
+def trace_mask(rgb):
+    """bool (H, W): píxeles del trazo, sin la cuadrícula."""
+    dark = 255.0 - rgb.max(axis=2)
+    # Percentil 25 y no mediana: una línea de base larga ocupa más de media fila
+    grid = np.maximum(np.percentile(dark, 25, axis=0)[None, :], np.percentile(dark, 25, axis=1)[:, None])
+    residual = dark - grid
+    threshold = max(MIN_TRACE_INK, 0.5 * np.percentile(residual, 99.5))
+    return residual > threshold
+
+
+def strips(mask, min_gap=4):
+    """[(fila_inicial, fila_final)] de cada tira de trazo, de arriba a abajo."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return []
+    cuts = np.flatnonzero(np.diff(rows) > min_gap)
+    starts = np.r_[rows[0], rows[cuts + 1]]
+    ends = np.r_[rows[cuts], rows[-1]] + 1
+    return [(int(a), int(b)) for a, b in zip(starts, ends) if b - a >= MIN_STRIP_ROWS]
+
+
+def _fill_gaps(values, valid):
+    x = np.arange(len(values))
+    if valid.sum() < 2:
+        return np.zeros(len(values))
+    return np.interp(x, x[valid], values[valid])
+
+
+def _rolling_median(values, window):
+    window = max(3, int(window) | 1)
+    padded = np.pad(values, window // 2, mode="edge")
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+
+
+def column_features(strip_mask, baseline_px):
+    """Por columna: (extensión vertical del trazo, distancia máxima a la línea de base), en px.
+
+    La extensión mide la pendiente (el QRS es casi vertical, P y T no); la
+    distancia, cuánto se aparta el trazo del isoeléctrico.
+    """
+    h, w = strip_mask.shape
+    rows = np.arange(h, dtype=float)[:, None]
+    has = strip_mask.any(axis=0)
+    top = np.where(strip_mask, rows, h).min(axis=0)
+    bottom = np.where(strip_mask, rows, -1).max(axis=0)
+    extent = _fill_gaps(bottom - top + 1, has)
+    counts = np.maximum(strip_mask.sum(axis=0), 1)
+    centroid = _fill_gaps((strip_mask * rows).sum(axis=0) / counts, has)
+    base = _rolling_median(centroid, baseline_px)
+    dev = np.where(strip_mask, np.abs(rows - base[None, :]), 0.0).max(axis=0)
+    return extent, _fill_gaps(dev, has)
+
+
+def _runs(flags):
+    """[(inicio, fin_exclusivo)] de los tramos True de un vector bool."""
+    edges = np.diff(np.r_[0, flags.astype(np.int8), 0])
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+# ---------- LATIDOS ----------
+def _merge(runs, max_gap):
+    merged = []
+    for a, b in runs:
+        if merged and a - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], b)
+        else:
+            merged.append((a, b))
+    return merged
+
+
+def detect_beats(extent, dev, ms_per_pixel):
+    """[{"r", "qrs_on", "qrs_end", "p_on", "t_end"}] en columnas (None si no se ve)."""
+    px = 1.0 / ms_per_pixel
+    thickness = float(np.median(extent))
+    steepest = float(np.percentile(extent, 99)) - thickness
+    if steepest <= 2:
+        return []
+    steep = extent > thickness + max(1.0, 0.1 * steepest)
+    noise = float(np.median(dev))
+    low = noise + max(2.0, 0.08 * (float(np.percentile(dev, 99)) - noise))
+    active = dev > low
+    min_wave = max(2, int(MIN_WAVE_MS * px))
+
+    # QRS: tramos empinados (unidos si los separa menos de un cuadro chico)
+    # que llegan a la mitad de la pendiente máxima; período refractario entre R
+    # La referencia es el percentil 75 de los picos de cada tramo y no el
+    # máximo: unos pocos complejos gigantes no deben esconder a los demás.
+    runs = [(a, b) for a, b in _merge(_runs(steep), ZONE_MARGIN_MS * px) if (b - a) * ms_per_pixel >= MIN_QRS_MS]
+    if not runs:
+        return []
+    tops = np.array([extent[a:b].max() for a, b in runs])
+    reference = float(np.percentile(tops, 75))
+    complexes = []
+    for (start, end), top in zip(runs, tops):
+        if top < thickness + 0.5 * (reference - thickness):
+            continue
+        r = int(start + np.argmax(dev[start:end]))
+        if complexes and r - complexes[-1][2] < REFRACTORY_MS * px:
+            continue
+        complexes.append((int(start), int(end), r))
+
+    beats = []
+    for qrs_on, qrs_end, r in complexes:
+        if qrs_on == 0 or qrs_end >= len(dev):
+            continue      # complejo cortado por el borde de la imagen
+
+        p_on = None
+        lo = max(0, qrs_on - int(PR_MAX_MS * px))
+        waves = [(a, b) for a, b in _runs(active[lo:qrs_on]) if b - a >= min_wave and lo + b < qrs_on]
+        if waves and waves[-1][0] > 0:
+            p_on = int(lo + waves[-1][0])
+
+        t_end = None
+        hi = min(len(dev), qrs_end + int(QT_MAX_MS * px))
+        waves = [(a, b) for a, b in _runs(active[qrs_end:hi]) if b - a >= min_wave]
+        if waves and qrs_end + waves[0][1] < hi:
+            t_end = int(qrs_end + waves[0][1])
+
+        beats.append({"r": r, "qrs_on": qrs_on, "qrs_end": qrs_end, "p_on": p_on, "t_end": t_end})
+    return beats
+
+
+def _bpm(beats, ms_per_pixel):
+    if len(beats) < 2:
+        return None
+    rr = np.diff([b["r"] for b in beats]) * ms_per_pixel
+    return float(60000 / np.median(rr))
+
+
+def analyze_image(path, stored_ms_per_pixel=None):
+    """Calibración y latidos de una imagen (dict serializable). Corre en un proceso aparte."""
+    from PIL import Image
+
+    name = os.path.basename(path)
+    try:
+        with Image.open(path) as img:
+            rgb = np.asarray(img.convert("RGB"), dtype=np.float32)
+    except OSError as e:
+        return {"image": name, "error": str(e)}
+    return {"image": name, **analyze_rgb(rgb, trace_mask(rgb), stored_ms_per_pixel)}
+
+
+def analyze_rgb(rgb, mask, stored_ms_per_pixel=None):
+    """Como analyze_image() pero con la imagen ya decodificada y su máscara de trazo."""
+    cal = calibrate_rgb(rgb)
+    hypotheses = [cal.get("ms_per_pixel"), cal.get("alt_ms_per_pixel")]
+    best = None
+    for top, bottom in strips(mask):
+        sub = mask[top:bottom]
+        for ms_px in [h for h in hypotheses if h]:
+            beats = detect_beats(*column_features(sub, 800 / ms_px), ms_px)
+            bpm = _bpm(beats, ms_px)
+            # Con un solo latido no hay frecuencia: se queda la hipótesis de 1 mm
+            plausible = bpm is None or PLAUSIBLE_BPM[0] <= bpm <= PLAUSIBLE_BPM[1]
+            score = (plausible, len(beats))
+            if best is None or score > best["score"]:
+                best = {"score": score, "ms_per_pixel": ms_px, "strip": [top, bottom], "beats": beats}
+            if not cal.get("ambiguous"):
+                break
+
+    notes = []
+    if best is None or not best["beats"]:
+        return {"error": "no se encontraron complejos QRS"}
+    source = "cuadrícula"
+    if not best["score"][0]:
+        if stored_ms_per_pixel:
+            best["ms_per_pixel"], source = stored_ms_per_pixel, "db.json"
+        notes.append("frecuencia fuera de rango con la calibración detectada")
+    elif cal.get("ambiguous"):
+        notes.append("cuadrícula ambigua: se eligió la escala con frecuencia plausible")
+    if len(best["beats"]) == 1:
+        notes.append("un solo latido")
+    return {
+        "ms_per_pixel": best["ms_per_pixel"],
+        "calibration_source": source,
+        "strip": best["strip"],
+        "beats": best["beats"],
+        "notes": notes,
+    }
+
+
+# ---------- PROPUESTAS ----------
+def _zones(beats, start, end, margin):
+    return [{"x_min": int(b[start] - margin), "x_max": int(b[end] + margin)}
+            for b in beats if b[start] is not None and b[end] is not None]
+
+
+def propose(q, analysis):
+    """Propuesta de calibración, zonas y correct_ms para una pregunta visual."""
+    topic = (q.get("topic") or "").upper()
+    entry = {
+        "id": q["id"],
+        "image": q["image"],
+        "topic": topic,
+        "accepted": False,
+        "stored": {k: thaw(q.get(k)) for k in ("ms_per_pixel", "correct_ms", "valid_zone_pairs", "valid_zone") if k in q},
+    }
+    if topic not in SUPPORTED_TOPICS:
+        entry["notes"] = [f"tema {topic} sin anotación automática"]
+        return entry
+    if "error" in analysis:
+        entry["notes"] = [analysis["error"]]
+        return entry
+
+    ms_px = analysis["ms_per_pixel"]
+    beats = analysis["beats"]
+    margin = ZONE_MARGIN_MS / ms_px
+    proposal = {"ms_per_pixel": round(ms_px, 4)}
+    if topic == "FC":
+        bpm = _bpm(beats, ms_px)
+        if bpm:
+            proposal["correct_ms"] = int(round(bpm))
+            proposal["valid_zone"] = {"x_min": int(beats[0]["r"] - margin), "x_max": int(beats[-1]["r"] + margin)}
+    else:
+        start, end = {"PR": ("p_on", "qrs_on"), "QRS": ("qrs_on", "qrs_end"), "QT": ("qrs_on", "t_end")}[topic]
+        measured = [b[end] - b[start] for b in beats if b[start] is not None and b[end] is not None]
+        if measured:
+            proposal["correct_ms"] = int(round(float(np.median(measured)) * ms_px))
+            proposal["valid_zone_pairs"] = _zones(beats, start, end, margin)
+
+    entry["proposed"] = proposal
+    entry["beats"] = len(beats)
+    entry["notes"] = list(analysis["notes"])
+    if "correct_ms" not in proposal:
+        entry["notes"].append("no se pudo medir el intervalo en ningún latido")
+    return entry
+
+
+def propose_all(db_path=DB_PATH, images_dir=IMAGES_DIR, workers=None):
+    """Propuestas para todos los ejercicios visuales, analizando cada imagen una vez."""
+    visuals = QuestionBank.from_file(db_path)["visual"]
+    by_image = {}
+    for q in visuals:
+        if q.get("image"):
+            by_image.setdefault(q["image"], q.get("ms_per_pixel"))
+    names = sorted(by_image)
+    paths = [os.path.join(images_dir, n) for n in names]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        analyses = dict(zip(names, pool.map(analyze_image, paths, [by_image[n] for n in names])))
+    return [propose(q, analyses[q["image"]]) for q in visuals if q.get("image")]
+
+
+def write_proposals(proposals, path=PROPOSALS_PATH, db_path=DB_PATH):
+    report = {
+        "source": os.path.basename(db_path),
+        "generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "proposals": proposals,
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def apply_proposals(path=PROPOSALS_PATH, db_path=DB_PATH):
+    """Copia a db.json las propuestas con "accepted": true. Devuelve los ids aplicados."""
+    with open(path, "r", encoding="utf-8") as f:
+        accepted = {p["id"]: p["proposed"] for p in json.load(f)["proposals"]
+                    if p.get("accepted") and p.get("proposed")}
+    with open(db_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    applied = []
+    for q in data.get("visual", []):
+        proposal = accepted.get(q["id"])
+        if proposal is None:
+            continue
+        if "valid_zone_pairs" in proposal:
+            q.pop("valid_zone", None)
+        if "valid_zone" in proposal:
+            q.pop("valid_zone_pairs", None)
+        q.update(proposal)
+        applied.append(q["id"])
+
+    QuestionBank(data)    # valida con el esquema antes de escribir
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, db_path)
+    return applied
+
+
+def _print_summary(proposals):
+    print(f"{'id':>4}  {'tema':<9}{'imagen':<18}{'latidos':>8}  correct_ms (db -> propuesto)")
+    for p in proposals:
+        proposed = p.get("proposed", {})
+        change = f"{p['stored'].get('correct_ms')} -> {proposed.get('correct_ms', '-')}" if proposed else "-"
+        notes = f"  ({'; '.join(p['notes'])})" if p.get("notes") else ""
+        print(f"{p['id']:>4}  {p['topic']:<9}{p['image']:<18}{p.get('beats', 0):>8}  {change}{notes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propone zonas válidas y correct_ms para los ejercicios visuales.")
+    parser.add_argument("action", choices=("propose", "apply"))
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--out", default=PROPOSALS_PATH, help="archivo de revisión")
+    args = parser.parse_args()
+
+    if args.action == "propose":
+        result = propose_all(workers=args.workers)
+        write_proposals(result, args.out)
+        _print_summary(result)
+        print(f"\nPropuestas en {args.out}: marcar \"accepted\": true y correr `apply`.")
+    else:
+        ids = apply_proposals(args.out)
+        print(f"Aplicadas a db.json: {', '.join(map(str, ids)) or 'ninguna'}")
+        sys.exit(0 if ids else 1)
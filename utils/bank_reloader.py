@@ -0,0 +1,168 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from utils.image_cache import IMAGES_DIR
+from utils.question_store import load_bank
+
+
+# ----------------------------------------------------
+# BANCO DE PREGUNTAS COMPARTIDO CON RECARGA EN CALIENTE
+# ----------------------------------------------------
+# Un único LiveQuestionBank por proceso (st.cache_resource) guarda el
+# QuestionBank vigente y las últimas versiones anteriores. Un observador de
+# watchdog mira data/db.json (o el almacén .sqlite3 de utils/question_store.py)
+# y las imágenes que el banco referencia; al cambiar alguno, reconstruye el
+# banco en segundo plano y lo publica de una vez (cambio de referencia bajo
+# lock). Si el archivo nuevo no valida, se registra el error y se sigue
+# sirviendo la versión anterior.
+#
+# Cada sesión fija un número de versión y lo conserva mientras no cambie de
+# pregunta (ver pin_session_bank), así una edición no le cambia el enunciado
+# a alguien que está respondiendo.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(PROJECT_ROOT, "data", "db.json")
+KEEP_VERSIONS = 4
+DEBOUNCE_S = 0.5
+# Solo eventos de escritura: leer el banco al recargar genera opened/closed_no_write
+_WRITE_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+logger = logging.getLogger(__name__)
+
+
+class LiveQuestionBank:
+    def __init__(self, path=DB_PATH, images_dir=IMAGES_DIR, keep=KEEP_VERSIONS, debounce=DEBOUNCE_S):
+        self.path = os.path.abspath(path)
+        self.images_dir = os.path.abspath(images_dir)
+        self.keep = keep
+        self.debounce = debounce
+        self._versions = OrderedDict()  # versión -> QuestionBank
+        self._lock = threading.Lock()
+        self._timer = None
+        self._observer = None
+        self._images = set()
+        self.version = 0
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        # La primera carga sí debe fallar ruidosamente
+        self._install(load_bank(self.path))
+
+    def _install(self, bank):
+        with self._lock:
+            self.version += 1
+            self._versions[self.version] = bank
+            while len(self._versions) > self.keep:
+                self._versions.popitem(last=False)
+            self._images = bank.referenced_images()
+        return self.version
+
+    # ---------- lectura ----------
+    def current(self):
+        with self._lock:
+            return self._versions[self.version]
+
+    def get(self, version):
+        """La versión pedida si aún se conserva; si no, la vigente."""
+        with self._lock:
+            return self._versions.get(version) or self._versions[self.version]
+
+    # ---------- recarga ----------
+    def reload(self):
+        """Reconstruye el banco desde disco. Devuelve True si se publicó una versión nueva."""
+        try:
+            bank = load_bank(self.path)
+        except Exception as e:
+            self.failed_reloads += 1
+            self.last_error = str(e)
+            logger.warning("El banco no se recargó, se mantiene la versión %s: %s", self.version, e)
+            return False
+        version = self._install(bank)
+        self.reloads += 1
+        self.last_error = None
+        logger.info("Banco de preguntas recargado: versión %s (%s preguntas)", version, len(bank))
+        return True
+
+    def _schedule_reload(self):
+        # Los editores suelen escribir varias veces seguidas: se agrupan en una recarga
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.reload)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _is_watched(self, path):
+        if not path:
+            return False
+        path = os.path.abspath(path)
+        if path == self.path:
+            return True
+        return os.path.dirname(path) == self.images_dir and os.path.basename(path) in self._images
+
+    def on_change(self, *paths):
+        if any(self._is_watched(p) for p in paths):
+            self._schedule_reload()
+
+    def start(self):
+        """Arranca el observador de watchdog (una sola vez). Sin watchdog no hay recarga automática."""
+        if self._observer is not None:
+            return self
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.warning("watchdog no está instalado: el banco no se recargará automáticamente")
+            return self
+
+        owner = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory and event.event_type in _WRITE_EVENTS:
+                    owner.on_change(event.src_path, getattr(event, "dest_path", None))
+
+        observer = Observer()
+        observer.daemon = True
+        handler = _Handler()
+        observer.schedule(handler, os.path.dirname(self.path), recursive=False)
+        if os.path.isdir(self.images_dir):
+            observer.schedule(handler, self.images_dir, recursive=False)
+        observer.start()
+        self._observer = observer
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "kept_versions": list(self._versions),
+                "reloads": self.reloads,
+                "failed_reloads": self.failed_reloads,
+                "last_error": self.last_error,
+                "watching": self._observer is not None,
+            }
+
+
+def pin_session_bank(live, session_state, nav):
+    """QuestionBank de esta sesión.
+
+    `nav` identifica la pregunta en pantalla (módulo + índices). Mientras no
+    cambie, la sesión sigue con la versión que tenía fijada; al navegar se
+    pasa a la vigente.
+    """
+    pin = session_state.get("bank_pin")
+    if pin is None or pin[1] != nav:
+        pin = (live.version, nav)
+        session_state["bank_pin"] = pin
+    return live.get(pin[0])
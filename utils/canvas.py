@@ -0,0 +1,114 @@
+import os
+import json
+import threading
+import streamlit as st
+import streamlit.components.v1 as components
+
+
+# ----------------------------------------------------
+# CANVAS DE MARCAS BIDIRECCIONAL (componente de Streamlit)
+# ----------------------------------------------------
+# Reemplaza al iframe de components.html que se reconstruía en cada rerun:
+#   - el iframe (utils/canvas_component/index.html) se monta una vez por
+#     pregunta (key por pregunta) y conserva las marcas entre reruns,
+#   - en cada rerun solo viajan los argumentos (URL de la imagen, tamaño,
+#     locked y las marcas guardadas), no el HTML ni la imagen,
+#   - las marcas vuelven a Python como listas planas de enteros en píxeles
+#     de la rendition mostrada,
+#   - en los ejercicios con trazo vectorial (utils/waveform.py) el componente
+#     dibuja la cuadrícula y el trazo; las muestras se envían solo hasta que
+#     la instancia confirma que las tiene (campo "d" del valor), así que los
+#     reruns siguientes vuelven a llevar solo los argumentos chicos.
+#
+# canvas_stats() acumula por proceso los bytes de argumentos por render, los
+# bytes de cada valor recibido y cuántas veces se montó un iframe (cada
+# instancia manda un id propio al montarse). Se ven en la página de admin.
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "canvas_component")
+
+_component = components.declare_component("ekg_canvas", path=FRONTEND_DIR)
+
+_stats = {"renders": 0, "args_bytes": 0, "values": 0, "value_bytes": 0, "mounts": 0}
+_stats_lock = threading.Lock()
+
+
+class Marks:
+    """Marcas del estudiante en píxeles de una imagen de `width` px de ancho."""
+
+    __slots__ = ("width", "circles", "lines")
+
+    def __init__(self, width, circles=(), lines=()):
+        self.width = width
+        self.circles = tuple(circles)   # ((x, y), ...)
+        self.lines = tuple(lines)       # ((x1, y1, x2, y2), ...)
+
+    def __bool__(self):
+        return bool(self.circles or self.lines)
+
+    def __repr__(self):
+        return f"Marks(width={self.width}, circles={len(self.circles)}, lines={len(self.lines)})"
+
+
+def _chunks(values, n):
+    values = list(values or ())
+    return tuple(tuple(values[i:i + n]) for i in range(0, len(values) - n + 1, n))
+
+
+def decode_marks(value):
+    """Marks a partir del valor compacto del componente ({"w", "c", "l"}), o None."""
+    if not value:
+        return None
+    return Marks(value.get("w"), _chunks(value.get("c"), 2), _chunks(value.get("l"), 4))
+
+
+def encode_marks(marks):
+    if not marks:
+        return None
+    return {
+        "w": marks.width,
+        "c": [v for c in marks.circles for v in c],
+        "l": [v for line in marks.lines for v in line],
+    }
+
+
+def canvas_args(img_src, width, height, locked=False, marks=None, qid=None, waveform=None):
+    """Argumentos que se envían al componente en cada rerun."""
+    return {"src": img_src, "width": width, "height": height, "locked": bool(locked),
+            "marks": encode_marks(marks), "qid": qid, "waveform": waveform}
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for k, v in deltas.items():
+            _stats[k] += v
+
+
+def canvas_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def ekg_canvas(img_src, width, height, state, locked=False, qid=None, waveform=None):
+    """Dibuja el canvas y devuelve las marcas actuales (Marks o None).
+
+    `state` es el QuestionState de la pregunta: guarda las marcas (para
+    restaurarlas si el iframe se vuelve a montar) y el id de la instancia.
+    `waveform` es el payload de una WaveformView en lugar de la imagen.
+    """
+    key = state.key("canvas")
+    # El valor que llegó en este rerun (ya está en session_state antes de renderizar)
+    current = st.session_state.get(key) or state.get("canvas_value") or {}
+    if waveform is not None and current.get("d") == waveform["key"]:
+        waveform = None     # la instancia montada ya lo dibujó
+    args = canvas_args(img_src, width, height, locked, state.get("marks"), qid, waveform)
+    value = _component(key=key, default=None, **args)
+    _count(renders=1, args_bytes=len(json.dumps(args)))
+
+    if value is not None and value != state.get("canvas_value"):
+        state["canvas_value"] = value
+        _count(values=1, value_bytes=len(json.dumps(value)))
+        if value.get("i") != state.get("canvas_instance"):
+            state["canvas_instance"] = value.get("i")
+            _count(mounts=1)
+        state["marks"] = decode_marks(value)
+    return state.get("marks")
@@ -0,0 +1,259 @@
+import re
+import unicodedata
+from collections import OrderedDict, deque
+
+
+# ----------------------------------------------------
+# CORRECCIÓN LOCAL DE LOS CASOS ABIERTOS
+# ----------------------------------------------------
+# Decide si el estudiante llegó al diagnóstico sin pasar por el LLM:
+#   1. normaliza el texto (sin tildes, minúsculas, solo letras y números),
+#   2. corrige cada palabra contra el vocabulario de los sinónimos con una
+#      distancia de edición acotada (1 error en palabras de 5-7 letras, 2 en
+#      las más largas; las siglas como "fa" o "brd" deben ser exactas); los
+#      candidatos salen de un índice de borrados, no de recorrer el vocabulario,
+#   3. busca todos los sinónimos de todos los casos en una sola pasada con un
+#      autómata Aho-Corasick sobre palabras,
+#   4. descarta las menciones negadas ("no es fibrilación auricular",
+#      "descarto BRD", "ausencia de ritmo sinusal", "ritmo sinusal ausente");
+#      la negación solo alcanza a su propia frase, así que "QRS no ancho,
+#      sinusal" sigue nombrando el ritmo sinusal,
+#   5. si además propone sin negar un diagnóstico que el caso excluye
+#      (`excludes`: ids de los casos incompatibles, p. ej. FA y ritmo sinusal),
+#      la respuesta es incorrecta: enumerar todos los ritmos no cuenta como
+#      acierto. Lo que puede coexistir (ritmo sinusal con un bloqueo de rama)
+#      no se penaliza.
+# Las respuestas de los selectbox se comparan con `expected_findings` del
+# caso cuando existe. El LLM queda solo para la explicación.
+
+# Antes de la mención ("sin evidencia de FA" entra por "sin")
+NEGATIONS = {"no", "sin", "descarto", "descarta", "descartado", "descartada", "ni", "excluyo", "excluye",
+             "ausencia", "perdida"}
+# Después de la mención ("ritmo sinusal ausente")
+POST_NEGATIONS = {"ausente", "ausentes", "perdido", "descartado", "descartada"}
+NEGATION_WINDOW = 3
+POST_NEGATION_WINDOW = 2
+
+FINDING_LABELS = {
+    "rhythm": "Ritmo",
+    "rate": "Frecuencia",
+    "axis": "Eje",
+    "pr": "Intervalo PR",
+    "qrs": "QRS",
+    "st": "Segmento ST",
+    "p": "Ondas P",
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_CLAUSE = re.compile(r"[.,;:!?()\n]+")
+
+
+def fold(text):
+    """Texto sin tildes, en minúsculas y con cualquier separador como un espacio."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def tokens(text):
+    return fold(text).split()
+
+
+def _max_edits(word):
+    if len(word) <= 4:
+        return 0
+    return 1 if len(word) <= 7 else 2
+
+
+def _deletes(word, depth):
+    """`word` y todas sus variantes con hasta `depth` letras borradas."""
+    out = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def _within(a, b, limit):
+    """¿Distancia de Damerau-Levenshtein(a, b) <= limit? Con corte temprano."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        best = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            best = min(best, cur[j])
+        if best > limit:
+            return False
+        prev2, prev = prev, cur
+    return prev[-1] <= limit
+
+
+class _Automaton:
+    """Aho-Corasick sobre secuencias de palabras."""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+    def add(self, words, payload):
+        node = 0
+        for w in words:
+            nxt = self.goto[node].get(w)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][w] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append((len(words), payload))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for w, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and w not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(w, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, words):
+        """[(inicio, fin, payload)] de todas las coincidencias."""
+        node = 0
+        hits = []
+        for i, w in enumerate(words):
+            while node and w not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(w, 0)
+            for length, payload in self.out[node]:
+                hits.append((i - length + 1, i + 1, payload))
+        return hits
+
+
+class Grade:
+    __slots__ = ("correct", "matched", "negated", "other", "findings")
+
+    def __init__(self, correct, matched, negated, other, findings):
+        self.correct = correct      # ¿nombró el diagnóstico del caso (sin negarlo) y ninguno incompatible?
+        self.matched = matched      # sinónimos del caso encontrados
+        self.negated = negated      # sinónimos del caso mencionados pero negados
+        self.other = other          # diagnósticos incompatibles con el caso que propuso
+        self.findings = findings    # {campo: (respuesta, esperado, ok)}
+
+    @property
+    def findings_ok(self):
+        return sum(ok for _, _, ok in self.findings.values())
+
+
+class DiagnosisMatcher:
+    def __init__(self, cases):
+        self._automaton = _Automaton()
+        self._vocab = set()
+        self._by_delete = {}        # variante con letras borradas -> {palabra del vocabulario}
+        self._fuzzy_cache = {}
+        self._names = {}            # id del caso -> nombre para mostrar
+        self._expected = {}
+        self._excludes = {}         # id del caso -> ids de los diagnósticos incompatibles
+        for q in cases:
+            qid = q["id"]
+            self._names[qid] = q["correct_diagnosis"][0]
+            self._expected[qid] = q.get("expected_findings") or {}
+            self._excludes[qid] = frozenset(q.get("excludes") or ())
+            seen = set()
+            for synonym in q["correct_diagnosis"]:
+                words = tuple(tokens(synonym))
+                # "FA" y "fa" son el mismo patrón
+                if not words or words in seen:
+                    continue
+                seen.add(words)
+                self._automaton.add(words, (qid, synonym))
+                self._vocab.update(words)
+        for w in self._vocab:
+            for d in _deletes(w, _max_edits(w)):
+                self._by_delete.setdefault(d, set()).add(w)
+        self._automaton.build()
+
+    def _canonical(self, word):
+        """La palabra del vocabulario más cercana, o la misma si ninguna está a tiro."""
+        hit = self._fuzzy_cache.get(word)
+        if hit is not None:
+            return hit
+        result = word
+        limit = _max_edits(word)
+        if limit and word not in self._vocab:
+            # Índice de borrados (como SymSpell): solo se compara contra las
+            # palabras que comparten alguna variante con letras borradas
+            candidates = set()
+            for d in _deletes(word, limit):
+                candidates |= self._by_delete.get(d, set())
+            for v in sorted(candidates, key=lambda v: (abs(len(v) - len(word)), v)):
+                if _max_edits(v) and _within(word, v, limit):
+                    result = v
+                    break
+        if len(self._fuzzy_cache) < 50_000:
+            self._fuzzy_cache[word] = result
+        return result
+
+    def find(self, text):
+        """[(id del caso, sinónimo, negado)] mencionados en `text`."""
+        found = []
+        for clause in _CLAUSE.split(text or ""):
+            words = [self._canonical(w) for w in tokens(clause)]
+            hits = self._automaton.search(words)
+            for start, end, (qid, synonym) in hits:
+                # "sinusal" dentro de "ritmo sinusal": la negación se mide desde la mención completa
+                start = min(s for s, e, (hit_qid, _) in hits if hit_qid == qid and s <= start and e >= end)
+                before = words[max(0, start - NEGATION_WINDOW):start]
+                after = words[end:end + POST_NEGATION_WINDOW]
+                negated = any(w in NEGATIONS for w in before) or any(w in POST_NEGATIONS for w in after)
+                found.append((qid, synonym, negated))
+        return found
+
+    def grade(self, q, *texts, findings=None):
+        """Grade del caso `q` para los textos del estudiante (descripción, justificación...)."""
+        qid = q["id"]
+        excludes = self._excludes.get(qid, frozenset())
+        matched, negated, other = [], [], []
+        for text in texts:
+            for hit_qid, synonym, is_negated in self.find(text):
+                if hit_qid == qid:
+                    bucket = negated if is_negated else matched
+                    if synonym not in bucket:
+                        bucket.append(synonym)
+                elif not is_negated and hit_qid in excludes and self._names[hit_qid] not in other:
+                    other.append(self._names[hit_qid])
+
+        checked = {}
+        for field, expected in self._expected.get(qid, {}).items():
+            given = (findings or {}).get(field)
+            options = expected if isinstance(expected, (list, tuple)) else [expected]
+            checked[field] = (given, " / ".join(options), fold(given) in {fold(o) for o in options})
+
+        return Grade(bool(matched) and not other, matched, negated, other, checked)
+
+
+_matchers = OrderedDict()
+
+
+def get_matcher(cases):
+    """DiagnosisMatcher de una lista de casos (uno por versión del banco)."""
+    key = id(cases)
+    entry = _matchers.get(key)
+    if entry is None or entry[0] is not cases:
+        entry = (cases, DiagnosisMatcher(cases))
+        _matchers[key] = entry
+        while len(_matchers) > 4:
+            _matchers.popitem(last=False)
+    return entry[1]
@@ -0,0 +1,226 @@
+import os
+import json
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from utils.image_cache import IMAGES_DIR, get_cached_image
+from utils.grid_calibration import DB_PATH, EXTENSIONS, MS_PER_MM
+from utils.auto_annotate import analyze_rgb, strips, trace_mask
+
+
+# ----------------------------------------------------
+# DIGITALIZADOR DE TIRAS DE EKG (PNG -> muestras)
+# ----------------------------------------------------
+# Paso de build:   python -m utils.digitizer [--workers N]
+# Para cada imagen de assets/images (menos las corrected_image, que tienen las
+# marcas dibujadas encima) extrae el trazo como una señal 1-D y la guarda
+# junto a la imagen:
+#   assets/images/<imagen>.npy   float32 (N, 2): tiempo (ms), amplitud (mV)
+#   assets/images/traces.json    calibración de cada .npy y sha256 de la imagen
+#
+# Por imagen (en paralelo, un proceso por núcleo):
+#   1. calibración y tira de utils/auto_annotate.analyze_rgb() (cuadrícula
+#      + frecuencia plausible); la cuadrícula es cuadrada, así que los px/mm
+#      verticales son los mismos que los horizontales,
+#   2. máscara del trazo sin la cuadrícula (trace_mask),
+#   3. por columna, todo con NumPy: el centro del trazo; en las columnas
+#      empinadas (QRS) dos muestras, el extremo de arriba y el de abajo, en
+#      el orden en que las recorre el trazo, para no perder la amplitud de R y S,
+#   4. tiempo = x * ms_per_pixel (0 = borde izquierdo de la imagen) y
+#      amplitud = (línea de base - y) / px por mV (10 mm/mV).
+#
+# Las columnas sin trazo no generan muestras; quien dibuja interpola.
+# load_trace() devuelve None si la imagen cambió después del build.
+
+MANIFEST_PATH = os.path.join(IMAGES_DIR, "traces.json")
+MM_PER_MV = 10.0
+
+
+# ---------- EXTRACCIÓN ----------
+def trace_samples(strip_mask):
+    """(x, y) en píxeles de la tira, en el orden en que se recorre el trazo."""
+    h, w = strip_mask.shape
+    rows = np.arange(h, dtype=np.float32)[:, None]
+    has = strip_mask.any(axis=0)
+    if not has.any():
+        return np.empty(0, np.float32), np.empty(0, np.float32)
+    top = np.where(strip_mask, rows, h).min(axis=0)
+    bottom = np.where(strip_mask, rows, -1).max(axis=0)
+    centroid = (strip_mask * rows).sum(axis=0) / np.maximum(strip_mask.sum(axis=0), 1)
+    extent = bottom - top + 1
+    thickness = float(np.median(extent[has]))
+    half = thickness / 2
+
+    # Centro del trazo en la columna anterior con trazo (para ordenar los extremos)
+    x = np.arange(w)
+    last = np.r_[-1, np.maximum.accumulate(np.where(has, x, -1))[:-1]]
+    previous = np.where(last >= 0, centroid[last.clip(0)], centroid)
+
+    steep = has & (extent > 2 * thickness)
+    upper = top + half - 0.5
+    lower = bottom - half + 0.5
+    upper_first = np.abs(previous - upper) < np.abs(previous - lower)
+
+    # Dos ranuras por columna: (primera, segunda); la segunda solo en columnas empinadas
+    ys = np.stack([
+        np.where(steep, np.where(upper_first, upper, lower), centroid),
+        np.where(upper_first, lower, upper),
+    ], axis=1)
+    xs = np.stack([np.where(steep, x - 0.25, x), x + 0.25], axis=1).astype(np.float32)
+    keep = np.stack([has, steep], axis=1)
+    return xs[keep], ys[keep].astype(np.float32)
+
+
+def digitize_image(path, stored_ms_per_pixel=None):
+    """(muestras (N, 2) float32, info) de una imagen, o (None, {"error"}). Corre en un proceso aparte."""
+    from PIL import Image
+
+    name = os.path.basename(path)
+    try:
+        with Image.open(path) as img:
+            rgb = np.asarray(img.convert("RGB"), dtype=np.float32)
+    except OSError as e:
+        return None, {"image": name, "error": str(e)}
+
+    mask = trace_mask(rgb)
+    analysis = analyze_rgb(rgb, mask, stored_ms_per_pixel)
+    if "error" in analysis:
+        # Sin latidos: la tira más alta y la calibración que haya
+        found = strips(mask)
+        if not found or not stored_ms_per_pixel:
+            return None, {"image": name, "error": analysis["error"]}
+        strip = list(max(found, key=lambda s: mask[s[0]:s[1]].sum()))
+        ms_per_pixel = stored_ms_per_pixel
+    else:
+        strip, ms_per_pixel = analysis["strip"], analysis["ms_per_pixel"]
+
+    top, bottom = strip
+    xs, ys = trace_samples(mask[top:bottom])
+    if len(xs) == 0:
+        return None, {"image": name, "error": "la tira no tiene trazo"}
+    ys += top
+    px_per_mv = MS_PER_MM / ms_per_pixel * MM_PER_MV
+    baseline_y = float(np.median(ys))
+
+    samples = np.empty((len(xs), 2), dtype=np.float32)
+    samples[:, 0] = xs * ms_per_pixel
+    samples[:, 1] = (baseline_y - ys) / px_per_mv
+    info = {
+        "image": name,
+        "width": rgb.shape[1],
+        "height": rgb.shape[0],
+        "ms_per_pixel": round(float(ms_per_pixel), 4),
+        "px_per_mv": round(float(px_per_mv), 4),
+        "baseline_y": round(baseline_y, 2),
+        "strip": [int(top), int(bottom)],
+        "samples": len(samples),
+    }
+    return samples, info
+
+
+def to_pixels(samples, info):
+    """(x, y) en píxeles de la imagen original a partir de las muestras."""
+    x = samples[:, 0] / info["ms_per_pixel"]
+    y = info["baseline_y"] - samples[:, 1] * info["px_per_mv"]
+    return x, y
+
+
+# ---------- BUILD ----------
+def trace_file(image_name):
+    return os.path.join(IMAGES_DIR, os.path.splitext(image_name)[0] + ".npy")
+
+
+def _digitize_to_file(path, stored_ms_per_pixel=None):
+    samples, info = digitize_image(path, stored_ms_per_pixel)
+    if samples is not None:
+        np.save(trace_file(info["image"]), samples)
+    return info
+
+
+def _strip_images(images_dir=IMAGES_DIR, db_path=DB_PATH):
+    """{imagen: ms_per_pixel de db.json o None}; sin las versiones corregidas (con marcas encima)."""
+    with open(db_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    corrected, stored = set(), {}
+    for items in data.values():
+        for q in items:
+            if q.get("corrected_image"):
+                corrected.add(q["corrected_image"])
+            if q.get("image") and q.get("ms_per_pixel"):
+                stored.setdefault(q["image"], q["ms_per_pixel"])
+    return {f: stored.get(f) for f in sorted(os.listdir(images_dir))
+            if f.lower().endswith(EXTENSIONS) and f not in corrected}
+
+
+def build_traces(images_dir=IMAGES_DIR, db_path=DB_PATH, workers=None):
+    """Digitaliza todas las imágenes de tiras y escribe traces.json."""
+    images = _strip_images(images_dir, db_path)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        infos = list(pool.map(_digitize_to_file, [os.path.join(images_dir, n) for n in images],
+                              images.values()))
+
+    manifest = {}
+    for info in infos:
+        if "error" in info:
+            continue
+        name = info.pop("image")
+        info["file"] = os.path.basename(trace_file(name))
+        info["sha256"] = get_cached_image(name).digest
+        manifest[name] = info
+
+    tmp = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)
+    _manifest_cache.clear()
+    return manifest, [i for i in infos if "error" in i]
+
+
+# ---------- RUNTIME ----------
+_manifest_cache = {}
+_lock = threading.Lock()
+
+
+def _load_manifest():
+    """Lee traces.json una vez por proceso (se relee si cambia en disco)."""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return {}
+
+    with _lock:
+        if _manifest_cache.get("mtime") != mtime:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                _manifest_cache["data"] = json.load(f)
+            _manifest_cache["mtime"] = mtime
+        return _manifest_cache["data"]
+
+
+def load_trace(image_name):
+    """(muestras (N, 2), info) de la imagen, o None si no hay trazo vigente."""
+    info = _load_manifest().get(image_name)
+    entry = get_cached_image(image_name)
+    if info is None or entry is None or info.get("sha256") != entry.digest:
+        return None
+    try:
+        samples = np.load(os.path.join(IMAGES_DIR, info["file"]))
+    except OSError:
+        return None
+    return samples, info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Digitaliza el trazo de cada imagen de assets/images.")
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    built, failed = build_traces(workers=args.workers)
+    for name, info in built.items():
+        png = os.path.getsize(os.path.join(IMAGES_DIR, name))
+        npy = os.path.getsize(os.path.join(IMAGES_DIR, info["file"]))
+        print(f"{name}: {info['samples']} muestras, {npy / 1024:.1f} KB (PNG {png / 1024:.0f} KB), "
+              f"{info['ms_per_pixel']} ms/px")
+    for info in failed:
+        print(f"⚠️ {info['image']}: {info['error']}")
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from utils.image_cache import IMAGES_DIR
+
+
+# ----------------------------------------------------
+# CALIBRACIÓN AUTOMÁTICA DESDE LA CUADRÍCULA DEL PAPEL
+# ----------------------------------------------------
+# Uso:   python -m utils.grid_calibration [--workers N] [--tolerance 0.1] [--json ruta]
+#
+# Para cada imagen de assets/images:
+#   1. perfil de columnas (y de filas): mediana de la "tinta" (255 - el canal
+#      más oscuro) a lo largo del otro eje; las líneas de la cuadrícula
+#      cruzan toda la imagen, el trazo no, así que la mediana se queda con la
+#      cuadrícula y funciona con papel rosa, celeste o gris,
+#   2. autocorrelación del perfil por FFT,
+#   3. el primer pico alto es el período fundamental; si cada 5 períodos hay
+#      un pico claramente más alto, ese es el cuadro grande (5 mm) y el
+#      fundamental es 1 mm; si no, se ve un solo tipo de línea y el resultado
+#      se informa como ambiguo (1 mm o 5 mm),
+#   4. el período se afina con todos sus múltiplos (mínimos cuadrados) e
+#      interpolación parabólica de cada pico,
+#   5. ms_per_pixel = 40 ms / píxeles por mm (papel a 25 mm/s).
+# Se compara con el ms_per_pixel de data/db.json de cada ejercicio que usa la
+# imagen y se marcan las diferencias mayores a --tolerance (relativa). Cuando
+# el ms_per_pixel de un ejercicio está corregido se le agrega
+# "calibration_verified": true y recién entonces utils/mark_grading.py informa
+# cuánto miden las marcas.
+# Las imágenes se procesan en paralelo, un proceso por núcleo.
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "db.json")
+MS_PER_MM = 40.0          # 25 mm/s
+LARGE_BOX_MM = 5
+DEFAULT_TOLERANCE = 0.10
+MIN_PEAK = 0.1            # autocorrelación mínima para considerar un pico
+EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def ink(rgb):
+    """(H, W) con la oscuridad de cada píxel: 255 - el canal más bajo."""
+    return 255.0 - rgb.min(axis=2)
+
+
+def profile(ink_img, axis):
+    p = np.median(ink_img, axis=axis)
+    return p - p.mean()
+
+
+def autocorrelation(p):
+    n = len(p)
+    spectrum = np.fft.rfft(p, 2 * n)
+    r = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    return r / r[0] if r[0] > 0 else np.zeros(n)
+
+
+def _peaks(r, max_lag):
+    """Desfases (>= 2) que son máximos locales por encima de MIN_PEAK."""
+    lags = np.arange(2, max_lag)
+    mask = (r[lags] > r[lags - 1]) & (r[lags] >= r[lags + 1]) & (r[lags] > MIN_PEAK)
+    return lags[mask]
+
+
+def _refine(r, lag):
+    """Posición subpíxel del pico en `lag` (parábola por tres puntos)."""
+    a, b, c = r[lag - 1], r[lag], r[lag + 1]
+    denom = a - 2 * b + c
+    return lag + (0.5 * (a - c) / denom if denom else 0.0)
+
+
+def _fit_period(r, period, max_lag):
+    """Período afinado con los picos en sus múltiplos: pendiente por el origen."""
+    ks, positions = [], []
+    for k in range(1, int(max_lag // period) + 1):
+        guess = int(round(k * period))
+        lo, hi = max(2, guess - 2), min(max_lag, guess + 3)
+        if hi - lo < 3:
+            break
+        lag = lo + int(np.argmax(r[lo:hi]))
+        if lo < lag < hi - 1 and r[lag] > MIN_PEAK:
+            ks.append(k)
+            positions.append(_refine(r, lag))
+    if not ks:
+        return float(period)
+    ks, positions = np.array(ks, float), np.array(positions)
+    return float((ks * positions).sum() / (ks * ks).sum())
+
+
+def grid_period(p):
+    """(píxeles por mm, confianza, ambiguo) de un perfil, o (None, 0, False)."""
+    r = autocorrelation(p)
+    max_lag = len(r) // 3
+    if max_lag < 8:
+        return None, 0.0, False
+    peaks = _peaks(r, max_lag)
+    if len(peaks) == 0:
+        return None, 0.0, False
+
+    # Período fundamental: el primer pico razonablemente alto
+    top = r[peaks].max()
+    fundamental = int(peaks[r[peaks] >= 0.3 * top][0])
+
+    # ¿Cada 5 períodos hay una línea más marcada (cuadro grande)?
+    target = LARGE_BOX_MM * fundamental
+    five = peaks[np.abs(peaks - target) <= max(1.0, 0.15 * target)]
+    if len(five):
+        large = int(five[np.argmax(r[five])])
+        minors = [r[max(2, int(round(k * large / LARGE_BOX_MM)) - 1):int(round(k * large / LARGE_BOX_MM)) + 2].max()
+                  for k in range(1, LARGE_BOX_MM)]
+        if r[large] > np.mean(minors) + 0.05:
+            return _fit_period(r, large, max_lag) / LARGE_BOX_MM, float(r[large]), False
+
+    # Un solo tipo de línea visible: el período puede ser 1 mm o 5 mm
+    return _fit_period(r, fundamental, max_lag), float(r[fundamental]), True
+
+
+def calibrate_rgb(rgb):
+    """Calibración de una imagen ya decodificada (H, W, 3): dict sin el nombre."""
+    dark = ink(rgb)
+    cols = grid_period(profile(dark, axis=0))
+    rows = grid_period(profile(dark, axis=1))
+    px_per_mm, confidence, ambiguous = cols
+    if px_per_mm is None:
+        px_per_mm, confidence, ambiguous = rows
+    if px_per_mm is None:
+        return {"width": rgb.shape[1], "error": "no se encontró la cuadrícula"}
+
+    rows_mm = rows[0]
+    return {
+        "width": rgb.shape[1],
+        "px_per_mm": round(px_per_mm, 3),
+        "ms_per_pixel": round(MS_PER_MM / px_per_mm, 4),
+        "confidence": round(confidence, 2),
+        "ambiguous": ambiguous,
+        # Si es ambiguo, el período también podría ser el cuadro grande (5 mm):
+        # 5 veces menos píxeles por mm, 5 veces más ms por píxel
+        "alt_ms_per_pixel": round(MS_PER_MM * LARGE_BOX_MM / px_per_mm, 4) if ambiguous else None,
+        # Cuadrícula cuadrada: filas y columnas deberían coincidir
+        "rows_px_per_mm": round(rows_mm, 3) if rows_mm else None,
+    }
+
+
+def calibrate_image(path):
+    """Resultado de una imagen (dict serializable). Corre en un proceso aparte."""
+    from PIL import Image
+
+    name = os.path.basename(path)
+    try:
+        with Image.open(path) as img:
+            rgb = np.asarray(img.convert("RGB"), dtype=np.float32)
+    except OSError as e:
+        return {"image": name, "error": str(e)}
+    return {"image": name, **calibrate_rgb(rgb)}
+
+
+def stored_calibrations(db_path=DB_PATH):
+    """{imagen: [(id, ms_per_pixel)]} de las preguntas con calibración."""
+    with open(db_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    out = {}
+    for items in data.values():
+        for q in items:
+            if q.get("image") and "ms_per_pixel" in q:
+                out.setdefault(q["image"], []).append((q["id"], q["ms_per_pixel"]))
+    return out
+
+
+def calibrate_all(images_dir=IMAGES_DIR, db_path=DB_PATH, workers=None, tolerance=DEFAULT_TOLERANCE):
+    """Calibra todas las imágenes en paralelo y las compara con db.json."""
+    paths = sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir)
+                   if f.lower().endswith(EXTENSIONS))
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = list(pool.map(calibrate_image, paths))
+
+    stored = stored_calibrations(db_path)
+    for res in results:
+        res["questions"] = []
+        for qid, value in stored.get(res["image"], []):
+            candidates = [v for v in (res.get("ms_per_pixel"), res.get("alt_ms_per_pixel")) if v]
+            mismatch = bool(candidates) and all(abs(value - v) / v > tolerance for v in candidates)
+            res["questions"].append({"id": qid, "stored": value, "mismatch": mismatch})
+    return results
+
+
+def _print_report(results):
+    print(f"{'imagen':<28}{'px/mm':>8}{'ms/px':>8}{'conf':>6}  db.json")
+    for res in results:
+        if "error" in res:
+            print(f"{res['image']:<28}  ⚠️ {res['error']}")
+            continue
+        flag = f" (ambiguo: 1 mm o 5 mm, {res['alt_ms_per_pixel']} ms/px)" if res["ambiguous"] else ""
+        stored = ", ".join(
+            f"#{q['id']}={q['stored']}{' ❌' if q['mismatch'] else ' ✅'}" for q in res["questions"]
+        ) or "-"
+        print(f"{res['image']:<28}{res['px_per_mm']:>8.2f}{res['ms_per_pixel']:>8.3f}"
+              f"{res['confidence']:>6.2f}  {stored}{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibra ms_per_pixel desde la cuadrícula de cada imagen.")
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="diferencia relativa aceptada")
+    parser.add_argument("--json", help="guardar el informe en esta ruta")
+    args = parser.parse_args()
+
+    report = calibrate_all(workers=args.workers, tolerance=args.tolerance)
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    mismatches = sum(q["mismatch"] for res in report for q in res.get("questions", []))
+    if mismatches:
+        print(f"\n{mismatches} calibraciones de db.json no coinciden con la cuadrícula.")
+        sys.exit(1)
@@ -1,23 +1,191 @@
-import os
-from PIL import Image
+import uuid
+import threading
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime
+from datetime import datetime, timedelta
+from utils.sheets_writer import ResultSpool, SheetsWriter
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+CREDENTIALS_FILE = "credentials.json"
+REFRESH_MARGIN = timedelta(minutes=5)  # refrescar el token antes de que expire
+
+
+# ----------------------------------------------------
+# TRANSPORTE (intercambiable por un stub para trabajar sin red)
+# ----------------------------------------------------
+class GspreadTransport:
+    """Las cuatro operaciones de red/disco que necesita el pool."""
+
+    # gspread y google-auth se importan al primer uso para no cargarlos en el arranque
+
+    def load_credentials(self):
+        from google.oauth2.service_account import Credentials
+        return Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+
+    def refresh(self, creds):
+        from google.auth.transport.requests import Request
+        creds.refresh(Request())
+
+    def authorize(self, creds):
+        import gspread
+        return gspread.authorize(creds)
+
+    def open_worksheet(self, client, sheet_name):
+        return client.open(sheet_name).sheet1
+
+    def is_auth_error(self, exc):
+        import gspread
+        from google.auth.exceptions import RefreshError
+        if isinstance(exc, RefreshError):
+            return True
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+        return isinstance(exc, gspread.exceptions.APIError) and status == 401
+
+
+# ----------------------------------------------------
+# POOL DE CLIENTES gspread (uno por proceso)
+# ----------------------------------------------------
+class SheetsClientPool:
+    """Credenciales, cliente autorizado y worksheet por nombre de hoja, reutilizados.
+
+    Antes cada append leía credentials.json, autorizaba y buscaba la hoja por
+    nombre. Ahora eso pasa una vez; el token se refresca antes de expirar y,
+    si Google responde con error de autenticación, se reconecta y se reintenta.
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport or GspreadTransport()
+        self._creds = None
+        self._client = None
+        self._worksheets = {}
+        self._lock = threading.RLock()
+        self.authorizations = 0
+        self.refreshes = 0
+        self.reconnects = 0
+
+    def _ensure_client(self):
+        with self._lock:
+            if self._client is None:
+                self._creds = self.transport.load_credentials()
+                self.transport.refresh(self._creds)
+                self._client = self.transport.authorize(self._creds)
+                self.authorizations += 1
+            elif self._creds is not None:
+                expiry = getattr(self._creds, "expiry", None)
+                if expiry is not None and expiry - datetime.utcnow() < REFRESH_MARGIN:
+                    self.transport.refresh(self._creds)
+                    self.refreshes += 1
+            return self._client
+
+    def worksheet(self, sheet_name):
+        """Worksheet cacheado para `sheet_name` (proxy con reconexión automática)."""
+        with self._lock:
+            handle = self._worksheets.get(sheet_name)
+            if handle is None:
+                handle = PooledWorksheet(self, sheet_name)
+                self._worksheets[sheet_name] = handle
+            return handle
+
+    def _open(self, sheet_name):
+        client = self._ensure_client()
+        return self.transport.open_worksheet(client, sheet_name)
+
+    def invalidate(self):
+        """Descarta cliente y worksheets; el siguiente uso vuelve a autorizar."""
+        with self._lock:
+            self._creds = None
+            self._client = None
+            for handle in self._worksheets.values():
+                handle._ws = None
+            self.reconnects += 1
+
+    def stats(self):
+        return {
+            "authorizations": self.authorizations,
+            "refreshes": self.refreshes,
+            "reconnects": self.reconnects,
+            "sheets": sorted(self._worksheets),
+        }
+
+
+class PooledWorksheet:
+    """Envuelve un gspread.Worksheet: si una llamada falla por auth, reconecta y reintenta una vez."""
+
+    def __init__(self, pool, sheet_name):
+        self._pool = pool
+        self._sheet_name = sheet_name
+        self._ws = None
+
+    def _get(self):
+        if self._ws is None:
+            self._ws = self._pool._open(self._sheet_name)
+        else:
+            self._pool._ensure_client()  # refresco proactivo del token
+        return self._ws
+
+    def __getattr__(self, name):
+        attr = getattr(self._get(), name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self._get(), name)(*args, **kwargs)
+            except Exception as e:
+                if not self._pool.transport.is_auth_error(e):
+                    raise
+                self._pool.invalidate()
+                return getattr(self._get(), name)(*args, **kwargs)
+        return call
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SheetsClientPool()
+    return _pool
+
 
 def get_sheet(sheet_name):
-    scope = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    creds = Credentials.from_service_account_file("credentials.json", scopes=scope)
-    client = gspread.authorize(creds)
-    return client.open(sheet_name).sheet1
-
-def append_user_result(sheet_name, user_data):
-    try:
-        sh = get_sheet(sheet_name)
+    return get_pool().worksheet(sheet_name)
 
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Writer en segundo plano compartido por todo el proceso (se crea al primer uso)."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SheetsWriter(ResultSpool(), get_sheet)
+                _writer.start()
+    return _writer
+
+
+def writer_metrics():
+    """Profundidad de la cola y latencia de envío a Sheets."""
+    return get_writer().metrics()
+
+
+def append_user_result(sheet_name, user_data, key=None):
+    """Encola el resultado para Google Sheets y retorna de inmediato.
+
+    `key` es la clave de idempotencia: encolar dos veces la misma clave no
+    duplica la fila. Si no se da, se genera una nueva. La clave se escribe en
+    la hoja como columna extra después de num_questions (ver utils/sheets_writer.py).
+    """
+    try:
         row_data = [
             datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             user_data.get("name"),
@@ -35,7 +203,9 @@ def append_user_result(sheet_name, user_data):
             user_data.get("num_questions")  # <--- agregado
         ]
 
-        sh.append_row(row_data)
+        writer = get_writer()
+        writer.spool.put(sheet_name, key or uuid.uuid4().hex, row_data)
+        writer.notify()
         return True
 
     except Exception as e:
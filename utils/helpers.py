@@ -1,27 +1,23 @@
-import openai
 import os
-from PIL import Image, ImageDraw
-import google.generativeai as genai
+import io
+import time
+import logging
+from utils.image_cache import get_cached_file, get_cached_image, image_path
+from utils.renditions import resolve_rendition
+from utils.llm_cache import cached_call, lookup, store
+from utils.llm_providers import FeedbackRequest, GeminiProvider, OpenAIProvider, ProviderRouter
+from utils.llm_clients import gemini_model
 
-import google.generativeai as genai
-import openai
+# openai, google.generativeai y PIL se importan al primer uso: la pantalla de
+# login y la de bienvenida no los necesitan.
 
-def get_ai_visual_feedback(api_key, img_base64, user_measurement, correct_ms, tolerance, instruction, explanation=""):
+logger = logging.getLogger(__name__)
+
+def get_ai_visual_feedback(api_key, img_base64, user_measurement, correct_ms, tolerance, instruction, explanation="", qid=None, use_cache=True):
     """Envía la imagen con las marcas del estudiante a Gemini para revisión visual."""
-    import google.generativeai as genai
     import PIL.Image
-    import io
     import base64
-    
-    # Configurar Gemini
-    genai.configure(api_key=api_key)
-    
-    # Convertir base64 a imagen PIL
-    img_data = base64.b64decode(img_base64)
-    img_pil = PIL.Image.open(io.BytesIO(img_data))
-    
-    # Crear el modelo Gemini (usando Gemini 1.5 Flash o Pro para imágenes)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    import hashlib
     
     prompt = f"""tu Eres un profesor experto en electrocardiografía. Revisa visualmente las marcas que el estudiante hizo en el ECG.
 
@@ -38,55 +34,142 @@ Si hay errores, explica QUÉ está mal y CÓMO corregirlo (sin dar la respuesta
 
 Sé específico sobre la ubicación de los puntos en el complejo ECG."""
 
-    try:
-        # Enviar imagen y prompt a Gemini
-        response = model.generate_content([prompt, img_pil])
-        return response.text
-    except Exception as e:
-        return f"Error con Gemini: {str(e)}"
+    def call():
+        # Convertir base64 a imagen PIL
+        img_data = base64.b64decode(img_base64)
+        img_pil = PIL.Image.open(io.BytesIO(img_data))
+        
+        try:
+            # Modelo Gemini reutilizado del registro de clientes (no se reconfigura por llamada)
+            model = gemini_model(api_key, 'gemini-2.5-flash')
+            # Enviar imagen y prompt a Gemini
+            response = model.generate_content([prompt, img_pil])
+            return response.text
+        except Exception as e:
+            return f"Error con Gemini: {str(e)}"
+
+    # La imagen entra en la clave por su hash: mismas marcas + misma explicación = misma respuesta
+    img_hash = hashlib.sha256(img_base64.encode()).hexdigest()
+    return cached_call(
+        "gemini-visual", "gemini-2.5-flash", prompt + "\n" + img_hash, call,
+        qid=qid, measurement=user_measurement, tolerance_ms=tolerance, use_cache=use_cache
+    )
     
-def get_ai_feedback(api_key, system_prompt, user_input, instruction, context, model="gemini"):
+def _build_router(api_key, model):
+    """Proveedor pedido primero (con la API key del usuario) y el otro como respaldo.
+
+    El respaldo solo se agrega si su clave está en el entorno
+    (GEMINI_API_KEY / GOOGLE_API_KEY u OPENAI_API_KEY).
+    """
+    gemini_key = api_key if model == "gemini" else os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    openai_key = api_key if model == "openai" else os.environ.get("OPENAI_API_KEY")
+    gemini = GeminiProvider(gemini_key) if gemini_key else None
+    oai = OpenAIProvider(openai_key) if openai_key else None
+    order = [gemini, oai] if model == "gemini" else [oai, gemini]
+    return ProviderRouter(order)
+
+
+def _cache_identity(system_prompt, user_input, instruction, context, model):
+    """(proveedor, modelo, texto) con que se indexa la respuesta en el caché."""
+    if model == "gemini":
+        return "gemini", "gemini-2.5-flash", system_prompt + "\n\n" + user_input + "\n\n" + instruction + "\n\n" + context
+    return "openai", "gpt-4o-mini", system_prompt + "\n\n" + user_input
+
+
+def get_ai_feedback(api_key, system_prompt, user_input, instruction, context, model="gemini",
+                    qid=None, measurement=None, tolerance_ms=None, use_cache=True):
+    """Feedback de texto del LLM.
+
+    Las respuestas se guardan en el caché persistente (utils/llm_cache.py);
+    `measurement` y `tolerance_ms` permiten que mediciones equivalentes
+    compartan respuesta, y `qid` alimenta la métrica de aciertos por pregunta.
+    Las llamadas pasan por utils/llm_providers.py (deadline, reintentos,
+    circuit breaker y respaldo en el otro proveedor).
+    """
 
     if not api_key:
         return "⚠️ Necesitas ingresar tu API Key."
+    if model not in ("gemini", "openai"):
+        return None
 
-    # === Gemini ===
-    if model == "gemini":
-        try:
-            genai.configure(api_key=api_key)
-            llm = genai.GenerativeModel("gemini-2.5-flash")
-            response = llm.generate_content(
-                system_prompt + "\n\n" + user_input + "\n\n" + instruction + "\n\n" + context
-            )
-            return response.text
-        except Exception as e:
-            return f"❌ Error con Gemini: {str(e)}"
+    provider, model_name, text = _cache_identity(system_prompt, user_input, instruction, context, model)
+    router = _build_router(api_key, model)
+    request = FeedbackRequest(system_prompt, user_input, instruction, context)
 
-    # === OpenAI (fallback) ===
-    if model == "openai":
+    def call():
         try:
-            client = openai.OpenAI(api_key=api_key)
-            r = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input}
-                ]
-            )
-            return r.choices[0].message.content
+            return router.complete(request)
         except Exception as e:
-            return f"❌ Error con OpenAI: {str(e)}"
+            return f"❌ Error con {'Gemini' if model == 'gemini' else 'OpenAI'}: {str(e)}"
+
+    return cached_call(provider, model_name, text, call,
+                       qid=qid, measurement=measurement, tolerance_ms=tolerance_ms, use_cache=use_cache)
+
+
+def stream_ai_feedback(api_key, system_prompt, user_input, instruction, context, model="gemini",
+                       qid=None, measurement=None, tolerance_ms=None, use_cache=True):
+    """Igual que get_ai_feedback pero va entregando el texto a medida que llega.
+
+    Pensado para st.write_stream, que devuelve el texto completo al terminar.
+    Registra en el log el tiempo hasta el primer token y la latencia total.
+    """
+
+    if not api_key:
+        yield "⚠️ Necesitas ingresar tu API Key."
+        return
+    if model not in ("gemini", "openai"):
+        return
+
+    provider, model_name, text = _cache_identity(system_prompt, user_input, instruction, context, model)
+    key, hit = lookup(provider, model_name, text, qid, measurement, tolerance_ms, use_cache)
+    if hit is not None:
+        yield hit
+        return
+
+    router = _build_router(api_key, model)
+    request = FeedbackRequest(system_prompt, user_input, instruction, context)
+
+    t0 = time.perf_counter()
+    ttft = None
+    parts = []
+    try:
+        for piece in router.stream(request):
+            if not piece:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            parts.append(piece)
+            yield piece
+    except Exception as e:
+        yield f"❌ Error con {'Gemini' if model == 'gemini' else 'OpenAI'}: {str(e)}"
+        return
+
+    total = time.perf_counter() - t0
+    logger.info(
+        "LLM stream %s/%s qid=%s ttft=%.0fms total=%.0fms",
+        provider, model_name, qid, (ttft or total) * 1000, total * 1000
+    )
+    store(key, provider, model_name, "".join(parts))
+
+
+def load_image(image_name, target_width=None):
+    """Busca la imagen en ekg_app/assets/images usando ruta absoluta.
 
+    Los bytes salen del caché de imágenes del proceso; solo se decodifica con
+    PIL cuando el llamador necesita de verdad un objeto Image. Con target_width
+    se usa la rendition más pequeña que cubre ese ancho (ver utils/renditions.py).
+    """
+    from PIL import Image, ImageDraw
 
-def load_image(image_name):
-    """Busca la imagen en ekg_app/assets/images usando ruta absoluta."""
-    base_path = os.path.dirname(os.path.abspath(__file__))  # carpeta utils/
-    project_root = os.path.dirname(base_path)               # sube a ekg_app/
-    images_path = os.path.join(project_root, "assets", "images")
-    path = os.path.join(images_path, image_name)
+    path = image_path(image_name)
 
-    if os.path.exists(path):
-        return Image.open(path)
+    if target_width is not None:
+        rendition = resolve_rendition(image_name, target_width)
+        cached = get_cached_file(rendition.path) if rendition else None
+    else:
+        cached = get_cached_image(image_name)
+    if cached is not None:
+        return Image.open(io.BytesIO(cached.data))
 
     # Placeholder si no existe
     img = Image.new('RGB', (600, 300), color=(240, 240, 240))
@@ -0,0 +1,186 @@
+import os
+import base64
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+
+
+# ----------------------------------------------------
+# CACHÉ DE IMÁGENES DIRECCIONADA POR CONTENIDO
+# ----------------------------------------------------
+# Un solo caché por proceso, compartido por todas las sesiones de Streamlit.
+# Guarda los bytes crudos del archivo y su base64, indexados por el hash del
+# contenido. El índice ruta -> hash se invalida cuando cambia el mtime o el
+# tamaño del archivo, así que editar una imagen en disco no requiere reinicio.
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "images")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # bytes crudos + base64
+
+
+class CachedImage:
+    """Entrada inmutable del caché: bytes, base64 y dimensiones de la imagen."""
+
+    __slots__ = ("digest", "data", "mime", "width", "height", "_b64")
+
+    def __init__(self, digest, data, mime, width, height):
+        self.digest = digest
+        self.data = data
+        self.mime = mime
+        self.width = width
+        self.height = height
+        self._b64 = None
+
+    @property
+    def base64(self):
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.data).decode()
+        return self._b64
+
+    @property
+    def nbytes(self):
+        # El base64 ocupa ~4/3 de los bytes crudos; se cuenta aunque aún no exista
+        return len(self.data) + (len(self.data) + 2) // 3 * 4
+
+
+def _read_dimensions(data):
+    """Lee (mime, ancho, alto) de la cabecera PNG/JPEG sin decodificar con PIL."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return "image/png", width, height
+
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            seg_len = struct.unpack(">H", data[i + 2:i + 4])[0]
+            # SOF0..SOF15 excepto DHT (C4), JPG (C8) y DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return "image/jpeg", width, height
+            i += 2 + seg_len
+
+    return None
+
+
+def _read_dimensions_pil(data):
+    """Respaldo con PIL para formatos que no sabemos leer a mano."""
+    import io
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        mime = Image.MIME.get(img.format, "image/png")
+        return mime, img.width, img.height
+
+
+class ImageCache:
+    """LRU acotado por memoria, con contadores de aciertos, fallos y desalojos."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # digest -> CachedImage
+        self._paths = {}               # ruta -> (mtime_ns, size, digest)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path):
+        """Devuelve la CachedImage de `path` o None si el archivo no existe."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            known = self._paths.get(path)
+            if known is not None and known[:2] == stamp:
+                entry = self._entries.get(known[2])
+                if entry is not None:
+                    self._entries.move_to_end(known[2])
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+
+        # La lectura del disco se hace fuera del lock
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                info = _read_dimensions(data) or _read_dimensions_pil(data)
+                entry = CachedImage(digest, data, *info)
+                self._entries[digest] = entry
+                self._bytes += entry.nbytes
+                self._evict()
+            else:
+                # Mismo contenido bajo otra ruta (p. ej. "ekg_sample copy.png")
+                self._entries.move_to_end(digest)
+            self._paths[path] = (stamp[0], stamp[1], digest)
+            return entry
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            digest, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+            for p in [p for p, v in self._paths.items() if v[2] == digest]:
+                del self._paths[p]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache = ImageCache(int(os.environ.get("EKG_IMAGE_CACHE_BYTES", DEFAULT_MAX_BYTES)))
+
+
+def image_path(image_name):
+    """Ruta absoluta de una imagen dentro de assets/images."""
+    return os.path.join(IMAGES_DIR, image_name)
+
+
+def get_cached_image(image_name):
+    """Bytes + base64 + dimensiones de una imagen de assets/images, sin pasar por PIL."""
+    if not image_name:
+        return None
+    return _cache.get(image_path(image_name))
+
+
+def get_cached_file(path):
+    """Igual que get_cached_image pero para una ruta arbitraria (p. ej. el logo)."""
+    return _cache.get(os.path.abspath(path))
+
+
+def cache_stats():
+    """Contadores del caché de imágenes del proceso."""
+    return _cache.stats()
+
+
+def clear_image_cache():
+    _cache.clear()
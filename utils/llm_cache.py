@@ -0,0 +1,192 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+
+# ----------------------------------------------------
+# CACHÉ PERSISTENTE DE RESPUESTAS DEL LLM
+# ----------------------------------------------------
+# Compartido entre sesiones y procesos (SQLite en data/). La clave es
+# proveedor + modelo + hash del prompt normalizado: sin tildes, en minúsculas,
+# con espacios colapsados y con la medición del estudiante reemplazada por su
+# "cubeta" de tolerancia, de modo que 262 ms y 270 ms con tolerancia 20 ms
+# comparten respuesta.
+#
+# EKG_LLM_CACHE=off desactiva el caché (o use_cache=False en la llamada).
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, "data", "llm_cache.sqlite3")
+
+DEFAULT_TTL = 7 * 24 * 3600      # una semana
+DEFAULT_MAX_ENTRIES = 5000
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def cache_enabled():
+    return os.environ.get("EKG_LLM_CACHE", "on").lower() not in ("off", "0", "false", "no")
+
+
+def normalize_prompt(text, measurement=None, tolerance_ms=None):
+    """Texto canónico del prompt para construir la clave."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = " ".join(text.lower().split())
+
+    if measurement is not None:
+        try:
+            value = float(measurement)
+        except (TypeError, ValueError):
+            return text
+        tol = float(tolerance_ms) if tolerance_ms else 1.0
+        bucket = f"<m:{int(value // tol)}>"
+
+        def repl(m):
+            try:
+                same = float(m.group(0).replace(",", ".")) == value
+            except ValueError:
+                same = False
+            return bucket if same else m.group(0)
+        text = _NUMBER.sub(repl, text)
+
+    return text
+
+
+def make_key(provider, model, text, measurement=None, tolerance_ms=None):
+    norm = normalize_prompt(text, measurement, tolerance_ms)
+    return hashlib.sha256(f"{provider}\x00{model}\x00{norm}".encode()).hexdigest()
+
+
+class FeedbackCache:
+    """Caché clave -> texto en SQLite, con TTL, límite de entradas y métricas por pregunta."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS question_stats (
+                    qid TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key, qid=None):
+        now = time.time()
+        with self._connect() as con:
+            row = con.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                con.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                con.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._count(con, qid, hit=row is not None)
+        return row[0] if row else None
+
+    def put(self, key, provider, model, response):
+        now = time.time()
+        with self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, now, now),
+            )
+            with self._lock:
+                self._writes += 1
+                check = self._writes % 50 == 1
+            if check:
+                self._evict(con, now)
+
+    def _evict(self, con, now):
+        con.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        excess = con.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            con.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def _count(self, con, qid, hit):
+        if qid is None:
+            return
+        con.execute("INSERT OR IGNORE INTO question_stats (qid) VALUES (?)", (str(qid),))
+        column = "hits" if hit else "misses"
+        con.execute(f"UPDATE question_stats SET {column} = {column} + 1 WHERE qid = ?", (str(qid),))
+
+    def hit_rates(self):
+        """{qid: {"hits", "misses", "hit_rate"}} acumulado en todos los procesos."""
+        with self._connect() as con:
+            rows = con.execute("SELECT qid, hits, misses FROM question_stats ORDER BY qid").fetchall()
+        return {
+            qid: {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 4) if h + m else 0.0}
+            for qid, h, m in rows
+        }
+
+    def size(self):
+        with self._connect() as con:
+            return con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_feedback_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeedbackCache()
+    return _cache
+
+
+def lookup(provider, model, text, qid=None, measurement=None, tolerance_ms=None, use_cache=True):
+    """(clave, respuesta_cacheada). La clave es None si el caché está desactivado."""
+    if not (use_cache and cache_enabled()):
+        return None, None
+    key = make_key(provider, model, text, measurement, tolerance_ms)
+    return key, get_feedback_cache().get(key, qid)
+
+
+def store(key, provider, model, response):
+    """Guarda solo respuestas reales: los mensajes de error (⚠️/❌) no se cachean."""
+    if key is None:
+        return
+    if isinstance(response, str) and response.strip() and not response.startswith(("⚠️", "❌", "Error")):
+        get_feedback_cache().put(key, provider, model, response)
+
+
+def cached_call(provider, model, text, call, qid=None, measurement=None, tolerance_ms=None, use_cache=True):
+    """Devuelve la respuesta cacheada o ejecuta `call()` y guarda su resultado."""
+    key, hit = lookup(provider, model, text, qid, measurement, tolerance_ms, use_cache)
+    if hit is not None:
+        return hit
+
+    response = call()
+    store(key, provider, model, response)
+    return response
@@ -0,0 +1,135 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------
+# REGISTRO DE CLIENTES LLM REUTILIZABLES
+# ----------------------------------------------------
+# Antes cada llamada hacía genai.configure() + GenerativeModel(...) u
+# openai.OpenAI(...), creando un cliente (y su pool de conexiones) nuevo.
+# Aquí se guardan por (proveedor, hash de la API key, modelo) y se reutilizan
+# entre reruns y sesiones. El registro tiene tamaño máximo (LRU) y descarta
+# los clientes que llevan más de `idle_ttl` segundos sin usarse.
+
+MAX_CLIENTS = 32
+IDLE_TTL = 15 * 60
+
+
+def _key_hash(api_key):
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+
+class ClientRegistry:
+    def __init__(self, max_size=MAX_CLIENTS, idle_ttl=IDLE_TTL):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clients = OrderedDict()  # key -> [cliente, último uso]
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def get(self, provider, api_key, model, factory):
+        """Cliente cacheado para (provider, api_key, model); `factory()` lo crea si no existe."""
+        key = (provider, _key_hash(api_key), model)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            item = self._clients.get(key)
+            if item is not None:
+                item[1] = now
+                self._clients.move_to_end(key)
+                self.reused += 1
+                return item[0]
+
+        client = factory()
+        with self._lock:
+            item = self._clients.get(key)
+            if item is not None:
+                # Otro hilo lo creó mientras tanto: usamos ese y cerramos el nuestro
+                _close(client)
+                item[1] = now
+                self.reused += 1
+                return item[0]
+            self._clients[key] = [client, now]
+            self.created += 1
+            while len(self._clients) > self.max_size:
+                _, (old, _) = self._clients.popitem(last=False)
+                _close(old)
+                self.evicted += 1
+            return client
+
+    def _evict_idle(self, now):
+        stale = [k for k, (_, used) in self._clients.items() if now - used > self.idle_ttl]
+        for k in stale:
+            _close(self._clients.pop(k)[0])
+            self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            for client, _ in self._clients.values():
+                _close(client)
+            self._clients.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+
+def _close(client):
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+_registry = ClientRegistry()
+
+
+def client_stats():
+    return _registry.stats()
+
+
+# ---------- FÁBRICAS ----------
+def _new_gemini_model(api_key, model):
+    import google.generativeai as genai
+    from google.generativeai import client as genai_client
+
+    llm = genai.GenerativeModel(model)
+    try:
+        # Un gestor de clientes propio por API key: genai.configure() es global y
+        # reconfigurarlo en cada llamada tiraba el canal y mezclaba claves entre sesiones.
+        # _ClientManager y _client son internos de google-generativeai: la versión
+        # está fijada en requirements.txt y hay que revisar esto al subirla.
+        manager = genai_client._ClientManager()
+        manager.configure(api_key=api_key)
+        llm._client = manager.get_default_client("generative")
+    except Exception as e:
+        # Sin volver a genai.configure(): dejaría la clave de esta sesión como global
+        # para todas. La excepción sale de la fábrica y el registro no guarda nada.
+        logger.error("No se pudo crear el cliente de Gemini para %s: %s", model, e)
+        raise
+    return llm
+
+
+def gemini_model(api_key, model="gemini-2.5-flash"):
+    """GenerativeModel listo para usar, con su cliente y canal ya abiertos."""
+    return _registry.get("gemini", api_key, model, lambda: _new_gemini_model(api_key, model))
+
+
+def openai_client(api_key):
+    """openai.OpenAI reutilizable; usar .with_options(timeout=...) para ajustes por llamada."""
+    import openai
+    return _registry.get("openai", api_key, "*", lambda: openai.OpenAI(api_key=api_key))
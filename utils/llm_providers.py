@@ -0,0 +1,394 @@
+import os
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from utils.llm_clients import gemini_model, openai_client
+
+
+# ----------------------------------------------------
+# CAPA DE PROVEEDORES LLM: TIMEOUTS, REINTENTOS, CIRCUIT BREAKER Y HEDGING
+# ----------------------------------------------------
+# Cada proveedor (Gemini, OpenAI o uno falso para pruebas) expone
+# complete(request, timeout) y stream(request, timeout). El router:
+#   - corta cada llamada en `deadline` segundos,
+#   - reintenta hasta `retries` veces con backoff y jitter; los rechazos de la
+#     API (400/401/403: key inválida, pedido mal formado) no se reintentan ni
+#     cuentan como fallos del proveedor,
+#   - no llama a un proveedor cuyo circuit breaker está abierto; breakers y
+#     métricas van por (proveedor, hash de la API key), porque cada estudiante
+#     trae su key desde la barra lateral y una key mala no debe cortar el
+#     proveedor para las demás sesiones,
+#   - si `hedge_after` está definido y el primero no respondió en ese
+#     tiempo, lanza el segundo proveedor en paralelo y se queda con el primero
+#     que conteste bien,
+#   - si todo falla en el primero, pasa al siguiente de la lista.
+
+DEFAULT_DEADLINE = float(os.environ.get("EKG_LLM_DEADLINE_S", 30))
+DEFAULT_RETRIES = 2
+DEFAULT_HEDGE_AFTER = float(os.environ["EKG_LLM_HEDGE_MS"]) / 1000 if os.environ.get("EKG_LLM_HEDGE_MS") else None
+
+
+class ProviderError(Exception):
+    pass
+
+
+class CircuitOpen(ProviderError):
+    pass
+
+
+NON_RETRYABLE_STATUS = {400, 401, 403}
+
+
+def _status(exc):
+    """Código HTTP de la excepción de OpenAI (status_code) o de Google (code), si tiene."""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_rejection(exc):
+    """¿La API rechazó el pedido (key o pedido inválido)? Reintentar no sirve."""
+    return _status(exc) in NON_RETRYABLE_STATUS
+
+
+class FeedbackRequest:
+    """Las cuatro piezas del prompt que ya usaba get_ai_feedback."""
+
+    __slots__ = ("system_prompt", "user_input", "instruction", "context")
+
+    def __init__(self, system_prompt, user_input, instruction="", context=""):
+        self.system_prompt = system_prompt
+        self.user_input = user_input
+        self.instruction = instruction
+        self.context = context
+
+    def full_text(self):
+        return self.system_prompt + "\n\n" + self.user_input + "\n\n" + self.instruction + "\n\n" + self.context
+
+
+# ---------- PROVEEDORES ----------
+class GeminiProvider:
+    name = "gemini"
+    label = "Gemini"
+
+    def __init__(self, api_key, model="gemini-2.5-flash"):
+        self.api_key = api_key
+        self.model = model
+
+    def _llm(self):
+        return gemini_model(self.api_key, self.model)
+
+    def complete(self, request, timeout):
+        response = self._llm().generate_content(request.full_text(), request_options={"timeout": timeout})
+        return response.text
+
+    def stream(self, request, timeout):
+        chunks = self._llm().generate_content(request.full_text(), stream=True, request_options={"timeout": timeout})
+        for chunk in chunks:
+            yield chunk.text
+
+
+class OpenAIProvider:
+    name = "openai"
+    label = "OpenAI"
+
+    def __init__(self, api_key, model="gpt-4o-mini"):
+        self.api_key = api_key
+        self.model = model
+
+    def _messages(self, request):
+        return [
+            {"role": "system", "content": request.system_prompt},
+            {"role": "user", "content": request.user_input}
+        ]
+
+    def _client(self, timeout):
+        # with_options comparte el pool HTTP del cliente registrado
+        return openai_client(self.api_key).with_options(timeout=timeout, max_retries=0)
+
+    def complete(self, request, timeout):
+        r = self._client(timeout).chat.completions.create(model=self.model, messages=self._messages(request))
+        return r.choices[0].message.content
+
+    def stream(self, request, timeout):
+        stream = self._client(timeout).chat.completions.create(
+            model=self.model, messages=self._messages(request), stream=True
+        )
+        for c in stream:
+            if c.choices and c.choices[0].delta.content:
+                yield c.choices[0].delta.content
+
+
+class FakeProvider:
+    """Proveedor local para pruebas: latencia y tasa de error configurables."""
+
+    def __init__(self, name="fake", latency=0.0, error_rate=0.0, reply="respuesta de prueba", label=None,
+                 api_key=None, error_status=None):
+        self.name = name
+        self.label = label or name
+        self.model = "fake"
+        self.api_key = api_key
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status    # p. ej. 401 para simular una key inválida
+        self.reply = reply
+        self.calls = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+        if random.random() < self.error_rate:
+            error = ProviderError(f"{self.name}: error simulado")
+            error.status_code = self.error_status
+            raise error
+
+    def complete(self, request, timeout):
+        self._maybe_fail()
+        return self.reply
+
+    def stream(self, request, timeout):
+        self._maybe_fail()
+        for word in self.reply.split(" "):
+            yield word + " "
+
+
+# ---------- CIRCUIT BREAKER ----------
+class CircuitBreaker:
+    """closed -> open tras `threshold` fallos seguidos; half-open tras `reset_after` s."""
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                # En half-open un solo fallo vuelve a abrir
+                self.opened_at = time.monotonic()
+
+
+# ---------- MÉTRICAS ----------
+class ProviderStats:
+    def __init__(self, window=500):
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0       # 400/401/403: no cuentan como errores del proveedor
+        self.hedged = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok, timeout=False, rejected=False):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.latencies.append(seconds)
+            elif rejected:
+                self.rejected += 1
+            else:
+                self.errors += 1
+                self.timeouts += int(timeout)
+
+    def snapshot(self):
+        with self._lock:
+            lat = sorted(self.latencies)
+            calls, errors = self.calls, self.errors
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(len(lat) * p))] * 1000, 1) if lat else None
+        return {
+            "calls": calls,
+            "errors": errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "hedged": self.hedged,
+            "error_rate": round(errors / calls, 4) if calls else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+        }
+
+
+_stats = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+# Ejecutores separados: el de hedging espera a tareas del de llamadas, nunca al revés
+_call_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-call")
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+
+def provider_key(provider):
+    """(nombre, hash corto de la API key): la key en claro no queda en memoria compartida."""
+    api_key = getattr(provider, "api_key", None)
+    digest = hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else None
+    return provider.name, digest
+
+
+def _stats_for(provider):
+    with _registry_lock:
+        return _stats.setdefault(provider_key(provider), ProviderStats())
+
+
+def breaker_for(provider):
+    with _registry_lock:
+        return _breakers.setdefault(provider_key(provider), CircuitBreaker())
+
+
+def provider_metrics():
+    """{"proveedor:hash de key": {calls, errors, rejected, error_rate, p50_ms, p95_ms, breaker}} del proceso."""
+    with _registry_lock:
+        keys = sorted(set(_stats) | set(_breakers), key=lambda k: (k[0], k[1] or ""))
+        pairs = [(k, _stats.setdefault(k, ProviderStats()), _breakers.setdefault(k, CircuitBreaker())) for k in keys]
+    out = {}
+    for (name, digest), stats, breaker in pairs:
+        label = f"{name}:{digest}" if digest else name
+        out[label] = stats.snapshot()
+        out[label]["breaker"] = breaker.state
+    return out
+
+
+# ---------- ROUTER ----------
+class ProviderRouter:
+    def __init__(self, providers, deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, hedge_after=DEFAULT_HEDGE_AFTER):
+        self.providers = [p for p in providers if p is not None]
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge_after = hedge_after
+
+    def _attempt(self, provider, request):
+        """Una llamada con deadline; actualiza métricas y breaker."""
+        breaker = breaker_for(provider)
+        if not breaker.allow():
+            raise CircuitOpen(f"{provider.label}: circuito abierto")
+
+        stats = _stats_for(provider)
+        t0 = time.perf_counter()
+        future = _call_executor.submit(provider.complete, request, self.deadline)
+        try:
+            text = future.result(timeout=self.deadline)
+        except TimeoutError as e:
+            future.cancel()
+            stats.record(time.perf_counter() - t0, ok=False, timeout=True)
+            breaker.failure()
+            raise ProviderError(f"{provider.label}: sin respuesta en {self.deadline:.1f}s") from e
+        except Exception as e:
+            if is_rejection(e):
+                # Problema de la key o del pedido, no del proveedor
+                stats.record(time.perf_counter() - t0, ok=False, rejected=True)
+            else:
+                stats.record(time.perf_counter() - t0, ok=False)
+                breaker.failure()
+            raise
+        stats.record(time.perf_counter() - t0, ok=True)
+        breaker.success()
+        return text
+
+    def _with_retries(self, provider, request):
+        last = None
+        for attempt in range(self.retries + 1):
+            try:
+                return self._attempt(provider, request)
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                if is_rejection(e):
+                    raise
+                last = e
+                if attempt < self.retries:
+                    time.sleep(min(4.0, 0.25 * (2 ** attempt)) * random.uniform(0.5, 1.5))
+        raise last
+
+    def complete(self, request):
+        """Texto del primer proveedor que responda bien. Lanza la última excepción si todos fallan."""
+        candidates = [p for p in self.providers if breaker_for(p).allow()] or self.providers
+        if not candidates:
+            raise ProviderError("No hay proveedores configurados")
+
+        if self.hedge_after is not None and len(candidates) > 1:
+            return self._hedged(candidates[0], candidates[1], request, candidates[2:])
+
+        last = None
+        for provider in candidates:
+            try:
+                return self._with_retries(provider, request)
+            except Exception as e:
+                last = e
+        raise last
+
+    def _hedged(self, primary, secondary, request, rest):
+        first = _hedge_executor.submit(self._with_retries, primary, request)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if first in done and first.exception() is None:
+            return first.result()
+
+        _stats_for(secondary).hedged += 1
+        pending = {first, _hedge_executor.submit(self._with_retries, secondary, request)}
+        last = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                last = f.exception()
+
+        for provider in rest:
+            try:
+                return self._with_retries(provider, request)
+            except Exception as e:
+                last = e
+        raise last
+
+    def stream(self, request):
+        """Como complete() pero entregando trozos; solo cambia de proveedor antes del primer trozo."""
+        candidates = [p for p in self.providers if breaker_for(p).allow()] or self.providers
+        last = None
+        for provider in candidates:
+            stats = _stats_for(provider)
+            breaker = breaker_for(provider)
+            t0 = time.perf_counter()
+            started = False
+            try:
+                for piece in provider.stream(request, self.deadline):
+                    started = True
+                    yield piece
+            except Exception as e:
+                if is_rejection(e):
+                    stats.record(time.perf_counter() - t0, ok=False, rejected=True)
+                else:
+                    stats.record(time.perf_counter() - t0, ok=False)
+                    breaker.failure()
+                if started:
+                    raise
+                last = e
+                continue
+            stats.record(time.perf_counter() - t0, ok=True)
+            breaker.success()
+            return
+        if last is not None:
+            raise last
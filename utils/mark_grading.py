@@ -0,0 +1,152 @@
+import numpy as np
+from utils.renditions import scale_calibration
+
+
+# ----------------------------------------------------
+# CORRECCIÓN DE LAS MARCAS DEL CANVAS
+# ----------------------------------------------------
+# Con las marcas que devuelve utils/canvas.py y la calibración de la pregunta
+# (ms_per_pixel, valid_zone_pairs o valid_zone) se corrige la técnica, no
+# solo el número:
+#   - cada marca (círculo o extremo de línea) debe caer dentro de alguna zona
+#     válida; la comprobación es una sola operación de NumPy sobre
+#     marcas x zonas,
+#   - el intervalo se mide con la última línea o, si no hay líneas, con los
+#     dos últimos círculos,
+#   - en frecuencia (FC) los círculos son picos R consecutivos (así lo pide la
+#     consigna): lpm = 60000 / RR medio; fuera de PLAUSIBLE_BPM las marcas no
+#     son R consecutivos y no se da un número.
+# Las marcas llegan en píxeles de la rendition mostrada; scale_calibration()
+# lleva ms_per_pixel y las zonas a esa misma escala. En los ejercicios con
+# trazo vectorial la "rendition" es una WaveformView (utils/waveform.py); en
+# los registros largos (utils/recordings.py), la de la ventana mostrada.
+#
+# Los ejes (EJE_*) no se pueden medir con marcas en x: grade_marks() devuelve None.
+#
+# El ms_per_pixel de las imágenes de db.json se cargó a mano y no siempre
+# coincide con la cuadrícula (python -m utils.grid_calibration). Mientras una
+# imagen no tenga "calibration_verified": true, de sus marcas solo se usa la
+# comprobación de zonas (no depende de ms_per_pixel): no se informa cuánto
+# miden. Los trazos vectoriales y los registros tienen la escala exacta.
+
+RATE_TOPICS = {"FC"}
+PLAUSIBLE_BPM = (30, 220)     # mismo rango que utils/auto_annotate.py
+NON_MEASURABLE_PREFIXES = ("EJE",)
+
+
+class MarkGrade:
+    __slots__ = ("value", "unit", "correct", "points", "labels", "inside", "pair")
+
+    def __init__(self, value, unit, correct, points, labels, inside, pair):
+        self.value = value        # ms o lpm medidos con las marcas (None si no alcanzan)
+        self.unit = unit          # "ms" o "lpm"
+        self.correct = correct    # ¿value dentro de la tolerancia?
+        self.points = points      # ndarray (N, 2) en píxeles de la rendition
+        self.labels = labels      # nombre de cada punto para los mensajes
+        self.inside = inside      # ndarray bool (N,): ¿el punto cae en una zona válida?
+        self.pair = pair          # índices de los puntos usados para medir
+
+    @property
+    def outside(self):
+        return [self.labels[i] for i in np.flatnonzero(~self.inside)]
+
+    def summary(self):
+        """Versión serializable para guardar en el estado de la pregunta."""
+        return {"value": self.value, "unit": self.unit, "correct": self.correct, "outside": self.outside}
+
+
+def calibration_trusted(q):
+    """¿Las marcas de `q` se pueden convertir a ms / lpm?"""
+    return bool(q.get("waveform") or q.get("recording") or q.get("calibration_verified"))
+
+
+def _shift_zone(zone, ms):
+    return {"x_min": zone["x_min"] - ms, "x_max": zone["x_max"] - ms}
+
+
+def calibration(q, rendition=None, marks_width=None):
+    """(ms_per_pixel, zonas (Z, 2)) en píxeles de las marcas.
+
+    Si las marcas se hicieron sobre una imagen de otro ancho que `rendition`
+    (p. ej. el manifest cambió entre reruns) se reescala también eso.
+    """
+    if q.get("waveform") or q.get("recording"):
+        # Trazo vectorial: zonas en ms, como una imagen de 1 ms por píxel; en
+        # un registro largo, desde el inicio de la ventana mostrada
+        q = {**q, "ms_per_pixel": 1.0}
+        start = getattr(rendition, "start_ms", 0)
+        if "valid_zone_pairs" in q:
+            q["valid_zone_pairs"] = [_shift_zone(z, start) for z in q["valid_zone_pairs"]]
+        if "valid_zone" in q:
+            q["valid_zone"] = _shift_zone(q["valid_zone"], start)
+    cal = scale_calibration(q, rendition)
+    if marks_width and rendition is not None and rendition.width and marks_width != rendition.width:
+        factor = marks_width / rendition.width
+        cal["ms_per_pixel"] = cal.get("ms_per_pixel", 0) / factor or None
+        for zone in cal.get("valid_zone_pairs", []) + ([cal["valid_zone"]] if "valid_zone" in cal else []):
+            zone["x_min"] *= factor
+            zone["x_max"] *= factor
+
+    zones = cal.get("valid_zone_pairs") or ([cal["valid_zone"]] if "valid_zone" in cal else [])
+    zones = np.array([[z["x_min"], z["x_max"]] for z in zones], dtype=float).reshape(-1, 2)
+    return cal.get("ms_per_pixel"), zones
+
+
+def marks_in_zones(x, zones):
+    """bool con la forma de `x`: ¿cada coordenada cae en alguna zona? Sin zonas, todo vale."""
+    x = np.asarray(x, dtype=float)
+    if len(zones) == 0:
+        return np.ones(x.shape, dtype=bool)
+    inside = (x[..., None] >= zones[:, 0]) & (x[..., None] <= zones[:, 1])
+    return inside.any(axis=-1)
+
+
+def _points(marks):
+    """Puntos (N, 2), etiquetas y rangos de índices de círculos y líneas."""
+    circles = np.asarray(marks.circles, dtype=float).reshape(-1, 2)
+    lines = np.asarray(marks.lines, dtype=float).reshape(-1, 4)
+    points = np.vstack([circles, lines.reshape(-1, 2)])
+    labels = [f"la marca {i + 1}" for i in range(len(circles))]
+    for i in range(len(lines)):
+        labels += [f"el inicio de la línea {i + 1}", f"el final de la línea {i + 1}"]
+    return points, labels, len(circles)
+
+
+def grade_marks(q, marks, rendition=None):
+    """MarkGrade de las marcas del estudiante para `q`, o None si no se puede corregir."""
+    topic = (q.get("topic") or "").upper()
+    if not marks or topic.startswith(NON_MEASURABLE_PREFIXES):
+        return None
+    ms_per_pixel, zones = calibration(q, rendition, marks.width)
+    if not ms_per_pixel:
+        return None
+
+    points, labels, n_circles = _points(marks)
+    inside = marks_in_zones(points[:, 0], zones)
+    if not calibration_trusted(q):
+        return MarkGrade(None, "lpm" if topic in RATE_TOPICS else "ms", False, points, labels, inside, ())
+    correct_value = q.get("correct_ms")
+    tol = q.get("tolerance_ms", 5)
+
+    value, unit, pair = None, "ms", ()
+    if topic in RATE_TOPICS:
+        unit = "lpm"
+        xs = points[:n_circles, 0] if n_circles >= 2 else points[:, 0]
+        if len(xs) >= 2:
+            xs = np.sort(xs)
+            rr_ms = np.diff(xs).mean() * ms_per_pixel
+            bpm = 60000 / rr_ms if rr_ms > 0 else None
+            if bpm is not None and PLAUSIBLE_BPM[0] <= bpm <= PLAUSIBLE_BPM[1]:
+                value = float(bpm)
+                pair = tuple(range(len(xs)))
+    elif marks.lines:
+        start = n_circles + 2 * (len(marks.lines) - 1)
+        pair = (start, start + 1)
+    elif n_circles >= 2:
+        pair = (n_circles - 2, n_circles - 1)
+
+    if unit == "ms" and pair:
+        value = float(abs(points[pair[1], 0] - points[pair[0], 0]) * ms_per_pixel)
+
+    correct = value is not None and correct_value is not None and abs(value - correct_value) <= tol
+    return MarkGrade(value, unit, correct, points, labels, inside, pair)
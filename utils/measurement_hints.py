@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+
+
+# ----------------------------------------------------
+# PISTAS INMEDIATAS PARA ERRORES DE MEDICIÓN
+# ----------------------------------------------------
+# Muchos errores del módulo visual son mecánicos y se reconocen solo con
+# correct_ms, tolerance_ms y ms_per_pixel, sin pedirle nada al LLM:
+#   - frecuencia: se escribió el RR en ms, o la cantidad de cuadros en vez de
+#     aplicar 1500 / 300,
+#   - se escribió una frecuencia (lpm) donde se pide una duración en ms,
+#   - se usó el valor de un cuadro grande para los pequeños o al revés (x5),
+#   - la medición se corrió un número entero de cuadros grandes (200 ms) o
+#     pequeños (40 ms),
+#   - el valor corresponde a otro intervalo (QRS en lugar de PR, etc.),
+#   - con marcas en el canvas: alguna cae fuera de las zonas válidas, o las
+#     marcas miden bien y el error está en el número escrito.
+# Si ninguna regla lo explica, classify() devuelve None y se usa el LLM.
+#
+# Cada camino (regla o LLM) se cuenta por pregunta en
+# data/hint_stats.sqlite3 para ver cuántas llamadas a la API se ahorran.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATS_PATH = os.path.join(PROJECT_ROOT, "data", "hint_stats.sqlite3")
+
+SMALL_BOX_MS = 40     # 1 mm a 25 mm/s
+LARGE_BOX_MS = 200    # 5 mm a 25 mm/s
+CLICK_PX = 3          # precisión razonable de una marca en el canvas
+
+RATE_TOPICS = {"FC"}
+# Temas cuyo correct_ms no es una duración (ejes en grados): sin reglas
+NON_DURATION_PREFIXES = ("EJE",)
+
+# Rangos normales aproximados (ms) para reconocer "midió otro intervalo"
+INTERVALS = {
+    "PR": (120, 200, "intervalo PR", "inicio de la P → inicio del QRS"),
+    "QRS": (60, 110, "QRS", "inicio de la Q → final de la S"),
+    "QT": (340, 460, "QT", "inicio del QRS → final de la T"),
+}
+
+LLM = "llm"
+
+
+class Hint:
+    __slots__ = ("kind", "message")
+
+    def __init__(self, kind, message):
+        self.kind = kind
+        self.message = message
+
+
+def _near(value, target, tol):
+    return abs(value - target) <= tol
+
+
+def _direction(user_ms, correct_ms):
+    return "te pasaste" if user_ms > correct_ms else "te quedaste corto"
+
+
+def _rate_hint(user, correct, tol):
+    if user > 0 and _near(60000 / user, correct, tol):
+        return Hint("rate_rr_ms", "Ese valor parece el intervalo RR en ms. Aquí se pide la frecuencia en lpm: "
+                                  "convierte el RR (60000 / RR en ms).")
+    if user > 0 and _near(1500 / user, correct, tol):
+        return Hint("rate_small_boxes", "Parece que escribiste la cantidad de cuadritos pequeños entre dos R. "
+                                        "Con ese conteo, la frecuencia es 1500 dividido por los cuadritos.")
+    if user > 0 and _near(300 / user, correct, tol):
+        return Hint("rate_large_boxes", "Parece que escribiste la cantidad de cuadros grandes entre dos R. "
+                                        "Con ese conteo, la frecuencia es 300 dividido por los cuadros.")
+    return None
+
+
+def _marks_hint(mark_grade):
+    """Pista a partir de la corrección de las marcas (utils/mark_grading.py)."""
+    outside = mark_grade.get("outside")
+    if outside:
+        where = " y ".join([", ".join(outside[:-1]), outside[-1]] if len(outside) > 1 else outside)
+        verb = "quedaron" if len(outside) > 1 else "quedó"
+        return Hint("marks_outside", f"Revisa dónde marcaste: {where} {verb} fuera de la zona donde empieza o "
+                                     "termina lo que se pide medir.")
+    if mark_grade.get("correct"):
+        return Hint("marks_ok_number_wrong", "Tus marcas están bien ubicadas y miden un valor correcto: "
+                                             "revisa la cuenta de cuadros o el número que escribiste.")
+    return None
+
+
+def classify(q, user_ms, mark_grade=None):
+    """Hint para una medición incorrecta de `q`, o None si ninguna regla la explica.
+
+    `mark_grade` es el resumen de MarkGrade de las marcas del canvas, si hay.
+    """
+    if mark_grade:
+        hint = _marks_hint(mark_grade)
+        if hint is not None:
+            return hint
+
+    correct = q.get("correct_ms")
+    topic = (q.get("topic") or "").upper()
+    if not correct or user_ms is None or user_ms <= 0 or topic.startswith(NON_DURATION_PREFIXES):
+        return None
+    tol = q.get("tolerance_ms", 5)
+
+    if topic in RATE_TOPICS:
+        return _rate_hint(user_ms, correct, tol)
+
+    # Lo que se puede errar con el mouse no cuenta como "un cuadro de más"
+    click_ms = CLICK_PX * q.get("ms_per_pixel", 1.0)
+    slack = max(tol, click_ms)
+
+    # Solo si está lejos de lo esperado: 214 ms para un PR de 280 es una mala medición, no una frecuencia
+    far = user_ms < correct / 2 or user_ms > correct * 2
+    if far and _near(60000 / user_ms, correct, slack):
+        return Hint("bpm_for_ms", "Ese valor parece una frecuencia en lpm. Aquí se pide la duración del intervalo en ms.")
+
+    for factor, wrong in ((5, "grande (200 ms)"), (1 / 5, "pequeño (40 ms)")):
+        if _near(user_ms, correct * factor, slack * max(factor, 1)):
+            return Hint("box_scale", f"Revisa el valor de cada cuadro: parece que contaste con el de un cuadro {wrong} "
+                                     "en lugar del que corresponde. Cuadro pequeño = 40 ms, grande = 200 ms.")
+
+    diff = abs(user_ms - correct)
+    for box, names, kind in ((LARGE_BOX_MS, ("cuadro grande", "cuadros grandes"), "off_large_boxes"),
+                             (SMALL_BOX_MS, ("cuadrito pequeño", "cuadritos pequeños"), "off_small_boxes")):
+        n = round(diff / box)
+        if 1 <= n <= 3 and _near(diff, n * box, min(slack, box / 4)):
+            name = names[n > 1]
+            return Hint(kind, f"Tu medición está corrida por {n} {name} ({_direction(user_ms, correct)}). "
+                              "Revisa dónde pusiste el inicio y el final y vuelve a contar la cuadrícula.")
+
+    expected = INTERVALS.get(topic)
+    if expected and diff > SMALL_BOX_MS and not (expected[0] <= user_ms <= expected[1]):
+        others = [label for name, (lo, hi, label, _) in INTERVALS.items() if name != topic and lo <= user_ms <= hi]
+        if len(others) == 1:
+            return Hint("wrong_interval", f"Ese valor es típico de un {others[0]}. Aquí se mide el {expected[2]} "
+                                          f"({expected[3]}); revisa qué puntos marcaste.")
+    return None
+
+
+class HintStats:
+    """Contador persistente (SQLite) de qué camino tomó cada intento fallido por pregunta."""
+
+    def __init__(self, path=DEFAULT_STATS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS hint_paths (
+                    qid TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    n INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (qid, path)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def count(self, qid, path):
+        with self._connect() as con:
+            con.execute(
+                "INSERT INTO hint_paths (qid, path, n) VALUES (?, ?, 1) "
+                "ON CONFLICT(qid, path) DO UPDATE SET n = n + 1",
+                (str(qid), path),
+            )
+
+    def totals(self):
+        """{camino: n} sumado en todas las preguntas."""
+        with self._connect() as con:
+            return dict(con.execute("SELECT path, SUM(n) FROM hint_paths GROUP BY path ORDER BY 2 DESC").fetchall())
+
+    def by_question(self):
+        """{qid: {camino: n}}."""
+        out = {}
+        with self._connect() as con:
+            for qid, path, n in con.execute("SELECT qid, path, n FROM hint_paths ORDER BY qid, path"):
+                out.setdefault(qid, {})[path] = n
+        return out
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_hint_stats():
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = HintStats()
+    return _stats
+
+
+def record_path(qid, path):
+    """Cuenta un camino; un fallo del contador nunca debe cortar el ejercicio."""
+    try:
+        get_hint_stats().count(qid, path)
+    except sqlite3.Error:
+        pass
@@ -0,0 +1,56 @@
+# ----------------------------------------------------
+# PROGRESO DEL ESTUDIANTE
+# ----------------------------------------------------
+# Un ProgressTracker por sesión (st.session_state["progress"]) compartido por
+# los tres módulos. Los contadores se actualizan al registrar cada intento, así
+# que la barra lateral, el resumen final y el chequeo de "acertó a la primera"
+# son O(1) aunque la sesión acumule miles de intentos.
+
+
+def is_correct(result):
+    """Mismo criterio que antes: "correct", "correct_first_try", "correct_second_try"."""
+    return "correct" in result
+
+
+class ProgressTracker:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.attempts = []       # registro completo, en orden: {"id", "topic", "result"}
+        self.by_topic = {}       # tema -> {"ok": n, "fail": n}
+        self.completed = False
+        self.total = 0
+        self.correct = 0
+        self._seen = set()       # ids con al menos un intento
+        self._first_try_ok = set()
+
+    def record(self, qid, topic, result, once=False):
+        """Registra un intento. Con once=True se ignora si la pregunta ya tiene uno.
+
+        Devuelve True si se registró.
+        """
+        if once and qid in self._seen:
+            return False
+        self._seen.add(qid)
+        self.attempts.append({"id": qid, "topic": topic, "result": result})
+
+        ok = is_correct(result)
+        self.total += 1
+        self.correct += ok
+        stats = self.by_topic.setdefault(topic, {"ok": 0, "fail": 0})
+        stats["ok" if ok else "fail"] += 1
+        if result == "correct_first_try":
+            self._first_try_ok.add(qid)
+        return True
+
+    def has_attempt(self, qid):
+        return qid in self._seen
+
+    def first_try_ok(self, qid):
+        """¿La pregunta se acertó al primer intento?"""
+        return qid in self._first_try_ok
+
+    @property
+    def percent(self):
+        return round(self.correct / self.total * 100) if self.total else 0
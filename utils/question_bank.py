@@ -0,0 +1,240 @@
+import json
+from types import MappingProxyType
+
+
+# ----------------------------------------------------
+# BANCO DE PREGUNTAS INDEXADO
+# ----------------------------------------------------
+# Se carga una vez por proceso a partir de data/db.json, se valida con un
+# esquema precompilado (fastjsonschema) y se precalculan los índices que antes
+# se obtenían recorriendo las listas: por id, por tema y por módulo, más los
+# punteros "siguiente del mismo tema" y "siguiente tema" de cada posición.
+#
+# Los registros son inmutables (MappingProxyType), así que el mismo banco se
+# puede compartir entre todas las sesiones sin copias. bank["visual"] sigue
+# funcionando como antes y devuelve una QuestionList (tupla con navegación O(1)).
+
+MODULES = ("visual", "multiple_choice", "open")
+
+_ID = {"type": "integer"}
+_NUM = {"type": "number"}
+_STR = {"type": "string"}
+_ZONE = {
+    "type": "object",
+    "required": ["x_min", "x_max"],
+    "properties": {"x_min": _NUM, "x_max": _NUM},
+}
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "visual": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["id", "instruction", "correct_ms", "tolerance_ms"],
+                # Imagen PNG, trazo vectorial (utils/waveform.py) o registro
+                # largo de assets/recordings (utils/recordings.py)
+                "anyOf": [{"required": ["image"]}, {"required": ["waveform"]}, {"required": ["recording"]}],
+                "properties": {
+                    "id": _ID,
+                    "topic": _STR,
+                    "title": _STR,
+                    "image": _STR,
+                    "waveform": {
+                        "type": "object",
+                        "required": ["fs", "samples"],
+                        "properties": {
+                            "fs": {"type": "number", "exclusiveMinimum": 0},
+                            "samples": {"type": "array", "items": _NUM, "minItems": 3},
+                        },
+                    },
+                    "recording": _STR,
+                    "window_s": {"type": "number", "exclusiveMinimum": 0},
+                    "corrected_image": _STR,
+                    "instruction": _STR,
+                    "ms_per_pixel": _NUM,
+                    "calibration_verified": {"type": "boolean"},
+                    "correct_ms": _NUM,
+                    "tolerance_ms": _NUM,
+                    "valid_zone": _ZONE,
+                    "valid_zone_pairs": {"type": "array", "items": _ZONE},
+                },
+            },
+        },
+        "multiple_choice": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["id", "question", "options", "correct_answer"],
+                "properties": {
+                    "id": _ID,
+                    "topic": _STR,
+                    "question": _STR,
+                    "options": {"type": "object", "additionalProperties": _STR, "minProperties": 2},
+                    "correct_answer": _STR,
+                },
+            },
+        },
+        "open": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["id", "image", "question", "correct_diagnosis", "key_features"],
+                "properties": {
+                    "id": _ID,
+                    "image": _STR,
+                    "question": _STR,
+                    "correct_diagnosis": {"type": "array", "items": _STR, "minItems": 1},
+                    "key_features": _STR,
+                    # Ids de los casos con diagnósticos incompatibles (utils/diagnosis_matcher.py)
+                    "excludes": {"type": "array", "items": _ID},
+                    # Respuestas esperadas de los selectbox (utils/diagnosis_matcher.py)
+                    "expected_findings": {
+                        "type": "object",
+                        "additionalProperties": {"anyOf": [_STR, {"type": "array", "items": _STR, "minItems": 1}]},
+                    },
+                },
+            },
+        },
+    },
+}
+
+_validator = None
+
+
+def _validate(data):
+    """Valida con el esquema compilado una sola vez por proceso."""
+    global _validator
+    if _validator is None:
+        import fastjsonschema
+        _validator = fastjsonschema.compile(SCHEMA)
+    _validator(data)
+
+
+class QuestionBankError(ValueError):
+    pass
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Copia mutable (dict/list) de un registro, p. ej. para serializarlo a JSON."""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class QuestionList(tuple):
+    """Preguntas de un módulo en orden, con los punteros de navegación precalculados."""
+
+    def __new__(cls, records):
+        self = super().__new__(cls, records)
+        n = len(self)
+        # Mismo criterio que los antiguos find_next_*: .get("topic") sin valor por defecto
+        topics = [q.get("topic") for q in self]
+        next_same = [None] * n
+        next_other = [None] * n
+        last_seen = {}
+        for i in range(n - 1, -1, -1):
+            next_same[i] = last_seen.get(topics[i])
+            last_seen[topics[i]] = i
+            if i + 1 < n:
+                next_other[i] = i + 1 if topics[i + 1] != topics[i] else next_other[i + 1]
+        self._next_same = tuple(next_same)
+        self._next_other = tuple(next_other)
+        self._pos_by_id = {q["id"]: i for i, q in enumerate(self)}
+        self._by_topic = {}
+        for i, t in enumerate(topics):
+            self._by_topic.setdefault(t, []).append(i)
+        self._by_topic = {t: tuple(v) for t, v in self._by_topic.items()}
+        return self
+
+    def next_same_topic(self, idx):
+        """Índice de la siguiente pregunta del mismo tema, o None."""
+        return self._next_same[idx]
+
+    def next_other_topic(self, idx):
+        """Índice de la primera pregunta siguiente de otro tema, o None."""
+        return self._next_other[idx]
+
+    def position(self, qid):
+        return self._pos_by_id.get(qid)
+
+    def by_id(self, qid):
+        pos = self._pos_by_id.get(qid)
+        return None if pos is None else self[pos]
+
+    def topic_positions(self, topic):
+        return self._by_topic.get(topic, ())
+
+    def topics(self):
+        return tuple(self._by_topic)
+
+
+class QuestionBank:
+    """Banco completo: se comporta como el dict de db.json para lectura (bank["visual"], bank.get(...))."""
+
+    def __init__(self, data, source=None):
+        try:
+            _validate(data)
+        except Exception as e:
+            raise QuestionBankError(f"db.json inválido: {e}") from e
+
+        self.source = source
+        self._modules = {}
+        for module in MODULES:
+            items = data.get(module, [])
+            ids = [q["id"] for q in items]
+            if len(ids) != len(set(ids)):
+                dup = sorted({i for i in ids if ids.count(i) > 1})
+                raise QuestionBankError(f"IDs repetidos en '{module}': {dup}")
+            if module == "multiple_choice":
+                for q in items:
+                    if q["correct_answer"] not in q["options"]:
+                        raise QuestionBankError(f"Pregunta {q['id']}: correct_answer no está entre las opciones")
+            self._modules[module] = QuestionList([_freeze(q) for q in items])
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), source=path)
+
+    # ---------- interfaz tipo dict ----------
+    def __getitem__(self, module):
+        return self._modules[module]
+
+    def get(self, module, default=None):
+        return self._modules.get(module, default)
+
+    def __contains__(self, module):
+        return module in self._modules
+
+    def keys(self):
+        return self._modules.keys()
+
+    # ---------- búsquedas ----------
+    def question(self, module, qid):
+        """Registro por (módulo, id) en O(1)."""
+        return self._modules[module].by_id(qid)
+
+    def referenced_images(self):
+        """Nombres de archivo de assets/images usados por el banco."""
+        names = set()
+        for items in self._modules.values():
+            for q in items:
+                for key in ("image", "corrected_image"):
+                    if q.get(key):
+                        names.add(q[key])
+        return names
+
+    def __len__(self):
+        return sum(len(v) for v in self._modules.values())
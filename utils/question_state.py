@@ -0,0 +1,123 @@
+import os
+import streamlit as st
+
+
+# ----------------------------------------------------
+# ESTADO POR PREGUNTA, AGRUPADO Y CON LÍMITE
+# ----------------------------------------------------
+# Antes cada módulo dejaba en st.session_state claves sueltas por pregunta
+# (mc_answered_<id>, status_<id>, solved_success_<id>, ...) que nunca se
+# borraban. Ahora todo el estado de una pregunta vive bajo una sola clave,
+# "q:<módulo>:<id>", y los widgets piden su key con ns.key("nombre") para que
+# quede registrada en ese espacio.
+#
+# La sesión recuerda el orden en que se visitaron las preguntas y, al entrar
+# en una nueva, descarta los espacios que quedan fuera de la ventana de las
+# últimas EKG_QUESTION_STATE_WINDOW preguntas (valores y claves de widgets),
+# así la memoria por sesión no crece aunque el estudiante recorra el banco
+# una y otra vez.
+
+PREFIX = "q:"
+ORDER_KEY = "q:_order"
+WINDOW = int(os.environ.get("EKG_QUESTION_STATE_WINDOW", 3))
+
+
+def _ns_key(module, qid):
+    return f"{PREFIX}{module}:{qid}"
+
+
+class QuestionState:
+    """Vista tipo dict sobre el espacio de una pregunta."""
+
+    __slots__ = ("_module", "_qid", "_data", "_session")
+
+    def __init__(self, module, qid, data, session):
+        self._module = module
+        self._qid = qid
+        self._data = data
+        self._session = session
+
+    def key(self, name):
+        """Key de widget para esta pregunta; se borra junto con el espacio."""
+        widget_key = f"{_ns_key(self._module, self._qid)}:{name}"
+        self._data["widgets"].add(widget_key)
+        return widget_key
+
+    def __getitem__(self, name):
+        return self._data["values"][name]
+
+    def __setitem__(self, name, value):
+        self._data["values"][name] = value
+
+    def __delitem__(self, name):
+        del self._data["values"][name]
+
+    def __contains__(self, name):
+        return name in self._data["values"]
+
+    def get(self, name, default=None):
+        return self._data["values"].get(name, default)
+
+    def setdefault(self, name, default=None):
+        return self._data["values"].setdefault(name, default)
+
+    def pop(self, name, default=None):
+        return self._data["values"].pop(name, default)
+
+    def clear(self):
+        """Olvida valores y widgets de la pregunta (sigue siendo la actual)."""
+        _drop_widgets(self._session, self._data)
+        self._data["values"].clear()
+
+
+def _drop_widgets(session, data):
+    for widget_key in data["widgets"]:
+        if widget_key in session:
+            del session[widget_key]
+    data["widgets"].clear()
+
+
+def _evict(session, key):
+    data = session.get(key)
+    if data is not None:
+        _drop_widgets(session, data)
+        del session[key]
+
+
+def question_state(module, qid, window=None, session=None):
+    """Espacio de estado de la pregunta (module, qid); lo crea si no existe.
+
+    Marca la pregunta como la más reciente y descarta las que quedan fuera
+    de la ventana.
+    """
+    session = st.session_state if session is None else session
+    window = WINDOW if window is None else window
+    key = _ns_key(module, qid)
+
+    data = session.get(key)
+    if data is None:
+        data = {"values": {}, "widgets": set()}
+        session[key] = data
+
+    order = session.get(ORDER_KEY)
+    if order is None:
+        order = []
+        session[ORDER_KEY] = order
+    if not order or order[-1] != key:
+        if key in order:
+            order.remove(key)
+        order.append(key)
+        while len(order) > max(1, window):
+            _evict(session, order.pop(0))
+
+    return QuestionState(module, qid, data, session)
+
+
+def clear_question_state(module, qid, session=None):
+    """Borra del todo el espacio de una pregunta (p. ej. al pasar a la siguiente)."""
+    session = st.session_state if session is None else session
+    key = _ns_key(module, qid)
+    _evict(session, key)
+    order = session.get(ORDER_KEY)
+    if order and key in order:
+        order.remove(key)
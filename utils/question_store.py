@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from utils.question_bank import MODULES, QuestionBank, _freeze, thaw
+
+
+# ----------------------------------------------------
+# ALMACÉN DE PREGUNTAS EN SQLITE (OPCIONAL)
+# ----------------------------------------------------
+# Alternativa a db.json para bancos grandes: una tabla por módulo (visual,
+# multiple_choice, open) con la pregunta completa en JSON, su posición, su tema
+# y los punteros de navegación ya calculados, más un índice FTS5 sobre
+# question / instruction / key_features.
+#
+# Al abrirlo no se lee ninguna pregunta: len() es un COUNT y cada registro se
+# trae por posición o por id cuando se pide (con un LRU pequeño por módulo), así
+# que el arranque y la memoria no crecen con el banco.
+#
+# El loader elige el backend por extensión (ver load_bank), de modo que
+#   EKG_QUESTION_DB=data/questions.sqlite3 streamlit run app.py
+# usa este almacén sin cambiar nada más. Importar / exportar:
+#   python -m utils.question_store import data/db.json data/questions.sqlite3
+#   python -m utils.question_store export data/questions.sqlite3 data/db.json
+
+SQLITE_EXTENSIONS = (".sqlite3", ".sqlite", ".db")
+RECORD_CACHE_SIZE = 256
+SCHEMA_VERSION = 1
+
+_FTS_FIELDS = ("question", "instruction", "key_features")
+
+
+def is_sqlite_path(path):
+    return os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS
+
+
+# ---------- IMPORTAR / EXPORTAR ----------
+def import_json(json_path, db_path):
+    """Crea el almacén a partir de un db.json (validado con el mismo esquema).
+
+    Se escribe en un archivo temporal y se reemplaza de una vez, así quien tenga
+    abierta la versión anterior la sigue leyendo completa.
+    """
+    bank = QuestionBank.from_file(json_path)
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        con.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        con.execute(f"""
+            CREATE VIRTUAL TABLE questions_fts USING fts5(
+                module UNINDEXED, position UNINDEXED, {", ".join(_FTS_FIELDS)},
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        for module in MODULES:
+            con.execute(f"""
+                CREATE TABLE "{module}" (
+                    position INTEGER PRIMARY KEY,
+                    id INTEGER NOT NULL UNIQUE,
+                    topic TEXT,
+                    next_same INTEGER,
+                    next_other INTEGER,
+                    payload TEXT NOT NULL
+                )
+            """)
+            items = bank[module]
+            con.executemany(
+                f'INSERT INTO "{module}" VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (i, q["id"], q.get("topic"), items.next_same_topic(i), items.next_other_topic(i),
+                     json.dumps(thaw(q), ensure_ascii=False))
+                    for i, q in enumerate(items)
+                ),
+            )
+            con.executemany(
+                "INSERT INTO questions_fts VALUES (?, ?, ?, ?, ?)",
+                ((module, i, *(q.get(f) or "" for f in _FTS_FIELDS)) for i, q in enumerate(items)),
+            )
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return {module: len(bank[module]) for module in MODULES}
+
+
+def export_json(db_path, json_path):
+    """Escribe el almacén en el formato de db.json."""
+    con = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        data = {
+            module: [json.loads(p) for (p,) in con.execute(f'SELECT payload FROM "{module}" ORDER BY position')]
+            for module in MODULES
+        }
+    finally:
+        con.close()
+    tmp = f"{json_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, json_path)
+    return {module: len(items) for module, items in data.items()}
+
+
+# ---------- LECTURA PEREZOSA ----------
+class SqliteQuestionList:
+    """Misma interfaz que QuestionList, pero cada registro se lee al pedirlo."""
+
+    def __init__(self, store, module):
+        self._store = store
+        self._module = module
+        self._cache = OrderedDict()  # posición -> registro
+        self._len = store._scalar(f'SELECT COUNT(*) FROM "{module}"')
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return tuple(self[i] for i in range(*idx.indices(self._len)))
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError(idx)
+        with self._store._lock:
+            record = self._cache.get(idx)
+            if record is not None:
+                self._cache.move_to_end(idx)
+                return record
+        payload = self._store._scalar(f'SELECT payload FROM "{self._module}" WHERE position = ?', idx)
+        record = _freeze(json.loads(payload))
+        with self._store._lock:
+            self._cache[idx] = record
+            while len(self._cache) > RECORD_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return record
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def next_same_topic(self, idx):
+        return self._store._scalar(f'SELECT next_same FROM "{self._module}" WHERE position = ?', idx)
+
+    def next_other_topic(self, idx):
+        return self._store._scalar(f'SELECT next_other FROM "{self._module}" WHERE position = ?', idx)
+
+    def position(self, qid):
+        return self._store._scalar(f'SELECT position FROM "{self._module}" WHERE id = ?', qid)
+
+    def by_id(self, qid):
+        pos = self.position(qid)
+        return None if pos is None else self[pos]
+
+    def topic_positions(self, topic):
+        rows = self._store._rows(
+            f'SELECT position FROM "{self._module}" WHERE topic IS ? ORDER BY position', topic
+        )
+        return tuple(p for (p,) in rows)
+
+    def topics(self):
+        rows = self._store._rows(f'SELECT topic FROM "{self._module}" GROUP BY topic ORDER BY MIN(position)')
+        return tuple(t for (t,) in rows)
+
+
+class SqliteQuestionBank:
+    """Banco sobre SQLite con la interfaz de QuestionBank.
+
+    Usa una sola conexión de solo lectura (protegida con lock): si el archivo
+    se reemplaza, esta instancia sigue leyendo la versión con que se abrió.
+    """
+
+    def __init__(self, path):
+        self.source = path
+        self._lock = threading.RLock()
+        self._con = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=False)
+        version = self._scalar("SELECT value FROM meta WHERE key = 'schema_version'")
+        if version != str(SCHEMA_VERSION):
+            raise ValueError(f"{path}: versión de esquema {version!r}, se esperaba {SCHEMA_VERSION}")
+        self._modules = {module: SqliteQuestionList(self, module) for module in MODULES}
+
+    def _rows(self, sql, *args):
+        with self._lock:
+            return self._con.execute(sql, args).fetchall()
+
+    def _scalar(self, sql, *args):
+        rows = self._rows(sql, *args)
+        return rows[0][0] if rows else None
+
+    # ---------- interfaz tipo dict ----------
+    def __getitem__(self, module):
+        return self._modules[module]
+
+    def get(self, module, default=None):
+        return self._modules.get(module, default)
+
+    def __contains__(self, module):
+        return module in self._modules
+
+    def keys(self):
+        return self._modules.keys()
+
+    def question(self, module, qid):
+        return self._modules[module].by_id(qid)
+
+    def referenced_images(self):
+        names = set()
+        for module in ("visual", "open"):
+            for key in ("image", "corrected_image"):
+                rows = self._rows(f"""SELECT DISTINCT json_extract(payload, '$.{key}') FROM "{module}" """)
+                names.update(n for (n,) in rows if n)
+        return names
+
+    def __len__(self):
+        return sum(len(v) for v in self._modules.values())
+
+    # ---------- búsqueda ----------
+    def search(self, text, module=None, limit=20):
+        """[(módulo, registro)] que coinciden con `text` (sintaxis FTS5), por relevancia."""
+        sql = "SELECT module, position FROM questions_fts WHERE questions_fts MATCH ?"
+        args = [text]
+        if module is not None:
+            sql += " AND module = ?"
+            args.append(module)
+        sql += " ORDER BY rank LIMIT ?"
+        args.append(limit)
+        return [(m, self._modules[m][p]) for m, p in self._rows(sql, *args)]
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+def load_bank(path):
+    """QuestionBank desde db.json, o SqliteQuestionBank si `path` es un .sqlite3/.db."""
+    if is_sqlite_path(path):
+        return SqliteQuestionBank(path)
+    return QuestionBank.from_file(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Uso: python -m utils.question_store import|export <origen> <destino>")
+        sys.exit(2)
+    action, src, dst = sys.argv[1:]
+    counts = import_json(src, dst) if action == "import" else export_json(src, dst)
+    print(f"{src} -> {dst}: " + ", ".join(f"{m}={n}" for m, n in counts.items()))
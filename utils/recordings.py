@@ -0,0 +1,342 @@
+import os
+import json
+import mmap
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from utils.waveform import MIN_SPAN_MV, PAD_MV, _build_view
+
+
+# ----------------------------------------------------
+# REGISTROS LARGOS (tipo Holter) EN .npy MAPEADOS EN MEMORIA
+# ----------------------------------------------------
+# Ejercicios de ritmo sobre minutos u horas de trazo (p. ej. encontrar la pausa
+# en 24 h). En db.json, en lugar de "image" o "waveform":
+#   "recording": "holter_1", "window_s": 10
+# y las zonas (valid_zone / valid_zone_pairs) en ms desde el inicio del registro.
+#
+# En assets/recordings/:
+#   <nombre>.npy          int16 (N,): µV a `fs` Hz (±32 mV)
+#   <nombre>.pyramid.npy  int16 (M, 2): mínimo y máximo por bloque; nivel 0 =
+#                         bloques de BASE_FACTOR muestras, cada nivel siguiente
+#                         junta LEVEL_FACTOR bloques del anterior, hasta quedar
+#                         en menos de MIN_LEVEL bloques
+#   recordings.json       fs, N, niveles (factor, offset, largo) y rango en mV
+#
+# En ejecución los dos .npy se abren con mmap_mode="r": cada rerun lee solo la
+# ventana visible (window_view) y, para la vista general (overview_image), el
+# nivel de la pirámide más grueso que todavía tiene un bloque por columna.
+# Después de copiar la ventana sus páginas se sueltan del proceso
+# (MADV_DONTNEED): siguen en la caché del sistema operativo, compartidas entre
+# sesiones, pero la memoria residente no crece con cada ventana visitada y
+# queda constante sin importar la duración del registro.
+#
+# Paso de build (por bloques, también con memoria constante):
+#   python -m utils.recordings import <origen.npy> <nombre> --fs 250
+#   python -m utils.recordings synthetic <nombre> --hours 24 [--pause 3600:2400]
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "recordings")
+MANIFEST_PATH = os.path.join(RECORDINGS_DIR, "recordings.json")
+
+BASE_FACTOR = 16
+LEVEL_FACTOR = 4
+MIN_LEVEL = 512
+CHUNK = BASE_FACTOR * 65536     # muestras por bloque de lectura en el build
+WINDOW_S = 10
+RELEASE_ALIGN = 2 * 1024 * 1024
+CACHE_SIZE = 32
+
+
+class Recording:
+    """Un registro abierto: muestras y pirámide como memmaps de solo lectura."""
+
+    __slots__ = ("name", "fs", "n", "samples", "pyramid", "levels", "span_mv")
+
+    def __init__(self, name, fs, samples, pyramid, levels, span_mv):
+        self.name = name
+        self.fs = fs
+        self.n = len(samples)
+        self.samples = samples          # memmap int16 (N,) en µV
+        self.pyramid = pyramid          # memmap int16 (M, 2)
+        self.levels = levels            # ((factor, offset, largo), ...) de fino a grueso
+        self.span_mv = span_mv          # (abajo, arriba) de la cuadrícula de las ventanas
+
+    @property
+    def duration_ms(self):
+        return self.n * 1000.0 / self.fs
+
+    def __repr__(self):
+        return f"Recording({self.name!r}, {self.duration_ms / 3600000:.2f} h a {self.fs:g} Hz)"
+
+    def _index(self, ms):
+        return int(np.clip(round(ms * self.fs / 1000.0), 0, self.n))
+
+    def window(self, start_ms, duration_ms):
+        """mV (float32) entre start_ms y start_ms + duration_ms; copia solo esa porción."""
+        i0 = self._index(start_ms)
+        i1 = self._index(start_ms + duration_ms)
+        out = self.samples[i0:i1].astype(np.float32) / 1000.0
+        _release(self.samples, i0, i1)
+        return out
+
+    def envelope(self, columns, start_ms=0, end_ms=None):
+        """(mínimos, máximos) en mV de `columns` columnas entre start_ms y end_ms."""
+        i0 = self._index(start_ms)
+        i1 = self._index(self.duration_ms if end_ms is None else end_ms)
+        # El nivel más grueso con al menos un bloque por columna
+        factor, lo, hi = 1, self.samples, self.samples
+        for f, offset, length in self.levels:
+            if (i1 - i0) // f < columns:
+                break
+            level = self.pyramid[offset:offset + length]
+            factor, lo, hi = f, level[:, 0], level[:, 1]
+        j0, j1 = i0 // factor, max(-(-i1 // factor), i0 // factor + 1)
+        edges = np.linspace(0, j1 - j0, columns + 1).astype(np.int64)[:-1]
+        edges = np.minimum(edges, j1 - j0 - 1)
+        lo = np.minimum.reduceat(np.asarray(lo[j0:j1]), edges)
+        hi = np.maximum.reduceat(np.asarray(hi[j0:j1]), edges)
+        return lo / 1000.0, hi / 1000.0
+
+
+def _release(array, start, stop):
+    """Quita del proceso las páginas del memmap entre los elementos start y stop."""
+    mm = getattr(array, "_mmap", None)
+    if mm is None or not hasattr(mmap, "MADV_DONTNEED") or stop <= start:
+        return
+    # El mmap empieza en el múltiplo de ALLOCATIONGRANULARITY anterior al offset
+    # del array; se suelta en bloques de RELEASE_ALIGN porque Linux mapea de una
+    # vez las páginas vecinas de cada fallo (fault-around) o el folio entero de
+    # la caché de páginas, que puede llegar a 2 MB
+    base = array.offset % mmap.ALLOCATIONGRANULARITY
+    lo = (base + start * array.itemsize) // RELEASE_ALIGN * RELEASE_ALIGN
+    hi = min(-(-(base + stop * array.itemsize) // RELEASE_ALIGN) * RELEASE_ALIGN, len(mm))
+    mm.madvise(mmap.MADV_DONTNEED, lo, hi - lo)
+
+
+# ---------- BUILD ----------
+def _level_lengths(n):
+    lengths = [-(-n // BASE_FACTOR)]
+    while lengths[-1] > MIN_LEVEL:
+        lengths.append(-(-lengths[-1] // LEVEL_FACTOR))
+    return lengths
+
+
+def _minmax_blocks(lo, hi, factor):
+    """Mínimo y máximo de cada bloque de `factor` (el último puede quedar incompleto)."""
+    starts = np.arange(0, len(lo), factor)
+    return np.minimum.reduceat(lo, starts), np.maximum.reduceat(hi, starts)
+
+
+def build_pyramid(name, fs):
+    """Escribe <nombre>.pyramid.npy desde <nombre>.npy y agrega el registro a recordings.json."""
+    samples = np.load(os.path.join(RECORDINGS_DIR, f"{name}.npy"), mmap_mode="r")
+    n = len(samples)
+    lengths = _level_lengths(n)
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]].astype(int)
+    pyramid_file = f"{name}.pyramid.npy"
+    pyramid = np.lib.format.open_memmap(os.path.join(RECORDINGS_DIR, pyramid_file), mode="w+",
+                                        dtype=np.int16, shape=(int(sum(lengths)), 2))
+
+    # Nivel 0 desde las muestras, de a CHUNK (múltiplo de BASE_FACTOR)
+    for i in range(0, n, CHUNK):
+        chunk = np.asarray(samples[i:i + CHUNK])
+        lo, hi = _minmax_blocks(chunk, chunk, BASE_FACTOR)
+        j = i // BASE_FACTOR
+        pyramid[j:j + len(lo), 0] = lo
+        pyramid[j:j + len(lo), 1] = hi
+    # Cada nivel desde el anterior
+    step = CHUNK // BASE_FACTOR * LEVEL_FACTOR
+    for k in range(1, len(lengths)):
+        prev = pyramid[offsets[k - 1]:offsets[k - 1] + lengths[k - 1]]
+        for i in range(0, len(prev), step):
+            block = np.asarray(prev[i:i + step])
+            lo, hi = _minmax_blocks(block[:, 0], block[:, 1], LEVEL_FACTOR)
+            j = offsets[k] + i // LEVEL_FACTOR
+            pyramid[j:j + len(lo), 0] = lo
+            pyramid[j:j + len(lo), 1] = hi
+    pyramid.flush()
+
+    # Rango vertical de las ventanas: percentiles del nivel más grueso (sin artefactos aislados)
+    coarse = np.asarray(pyramid[offsets[-1]:offsets[-1] + lengths[-1]])
+    bottom_mv = min(float(np.percentile(coarse[:, 0], 1)) / 1000.0 - PAD_MV, MIN_SPAN_MV[0])
+    top_mv = max(float(np.percentile(coarse[:, 1], 99)) / 1000.0 + PAD_MV, MIN_SPAN_MV[1])
+    del pyramid
+
+    entry = {
+        "fs": fs,
+        "n": n,
+        "file": f"{name}.npy",
+        "pyramid": pyramid_file,
+        "levels": [[BASE_FACTOR * LEVEL_FACTOR ** k, int(o), int(length)]
+                   for k, (o, length) in enumerate(zip(offsets, lengths))],
+        "span_mv": [round(bottom_mv, 2), round(top_mv, 2)],
+    }
+    manifest = dict(_load_manifest())
+    manifest[name] = entry
+    tmp = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)
+    return entry
+
+
+def import_recording(src, name, fs, mv=True):
+    """Convierte un .npy 1-D (mV, o µV si mv=False) a int16 µV por bloques y arma la pirámide."""
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    data = np.load(src, mmap_mode="r")
+    out = np.lib.format.open_memmap(os.path.join(RECORDINGS_DIR, f"{name}.npy"), mode="w+",
+                                    dtype=np.int16, shape=(len(data),))
+    factor = 1000.0 if mv else 1.0
+    for i in range(0, len(data), CHUNK):
+        out[i:i + CHUNK] = np.clip(np.round(np.asarray(data[i:i + CHUNK], dtype=np.float64) * factor),
+                                   -32768, 32767)
+    out.flush()
+    del out
+    return build_pyramid(name, fs)
+
+
+def synthetic_recording(name, seconds, fs=250, bpm=70, pauses=(), seed=0):
+    """Registro sintético de ritmo sinusal con pausas [(segundo, R-R en ms), ...].
+
+    Se genera por bloques: sirve para armar registros de horas sin tenerlos
+    enteros en memoria.
+    """
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fs)
+    duration_ms = n * 1000.0 / fs
+
+    # Inicio de cada latido con una variabilidad de ±4 %
+    rr = 60000.0 / bpm
+    beats = np.cumsum(rr * (1 + 0.04 * rng.standard_normal(int(duration_ms / rr * 1.2) + 2)))
+    for at_s, pause_ms in sorted(pauses):
+        i = int(np.searchsorted(beats, at_s * 1000.0))
+        if i < len(beats):
+            beats[i:] += pause_ms - (beats[i] - beats[i - 1] if i else rr)
+    beats = np.r_[-rr, beats[beats < duration_ms]]
+
+    waves = ((0.15, 150, 25), (-0.1, 265, 8), (1.2, 285, 10), (-0.25, 305, 8), (0.3, 520, 45))
+    out = np.lib.format.open_memmap(os.path.join(RECORDINGS_DIR, f"{name}.npy"), mode="w+",
+                                    dtype=np.int16, shape=(n,))
+    for i in range(0, n, CHUNK):
+        t = np.arange(i, min(i + CHUNK, n)) * 1000.0 / fs
+        phase = t - beats[np.searchsorted(beats, t, side="right") - 1]
+        mv = sum(a * np.exp(-0.5 * ((phase - mu) / sd) ** 2) for a, mu, sd in waves)
+        mv += 0.05 * np.sin(2 * np.pi * t / 4000.0) + 0.01 * rng.standard_normal(len(t))
+        out[i:i + len(t)] = np.round(mv * 1000)
+    out.flush()
+    del out
+    return build_pyramid(name, fs)
+
+
+# ---------- RUNTIME ----------
+_manifest_cache = {}
+_recordings = {}
+_views = OrderedDict()
+_lock = threading.Lock()
+
+
+def _load_manifest():
+    """Lee recordings.json una vez por proceso (se relee si cambia en disco)."""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return {}
+
+    with _lock:
+        if _manifest_cache.get("mtime") != mtime:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                _manifest_cache["data"] = json.load(f)
+            _manifest_cache["mtime"] = mtime
+            _recordings.clear()
+        return _manifest_cache["data"]
+
+
+def open_recording(name):
+    """Recording de assets/recordings (un memmap por proceso), o None si no existe."""
+    info = _load_manifest().get(name)
+    if info is None:
+        return None
+    with _lock:
+        rec = _recordings.get(name)
+        if rec is None:
+            try:
+                samples = np.load(os.path.join(RECORDINGS_DIR, info["file"]), mmap_mode="r")
+                pyramid = np.load(os.path.join(RECORDINGS_DIR, info["pyramid"]), mmap_mode="r")
+            except OSError:
+                return None
+            rec = Recording(name, float(info["fs"]), samples, pyramid,
+                            tuple(tuple(level) for level in info["levels"]), tuple(info["span_mv"]))
+            _recordings[name] = rec
+        return rec
+
+
+def window_view(rec, start_ms, duration_ms, width):
+    """WaveformView de la ventana [start_ms, start_ms + duration_ms) (cacheada)."""
+    key = (rec.name, start_ms, duration_ms, width)
+    with _lock:
+        view = _views.get(key)
+        if view is not None:
+            _views.move_to_end(key)
+            return view
+
+    samples = rec.window(start_ms, duration_ms)
+    view = _build_view({"fs": rec.fs, "samples": samples}, width, rec.span_mv, start_ms)
+    with _lock:
+        _views[key] = view
+        while len(_views) > CACHE_SIZE:
+            _views.popitem(last=False)
+    return view
+
+
+_PAPER = np.array([255, 247, 247], dtype=np.uint8)
+_INK = np.array([40, 40, 40], dtype=np.uint8)
+_HIGHLIGHT = np.array([255, 214, 102], dtype=np.uint8)
+
+
+def overview_image(rec, width, height, window=None):
+    """Vista general del registro (RGB uint8) con la ventana (start_ms, end_ms) resaltada."""
+    lo, hi = rec.envelope(width)
+    bottom, top = rec.span_mv
+    scale = (height - 1) / (top - bottom)
+    y_hi = np.clip(np.round((top - hi) * scale), 0, height - 1).astype(np.int64)
+    y_lo = np.clip(np.round((top - lo) * scale), 0, height - 1).astype(np.int64)
+
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = _PAPER
+    if window is not None:
+        px_per_ms = width / rec.duration_ms
+        x0 = int(window[0] * px_per_ms)
+        x1 = max(int(np.ceil(window[1] * px_per_ms)), x0 + 1)
+        img[:, x0:x1] = _HIGHLIGHT
+    rows = np.arange(height)[:, None]
+    img[(rows >= y_hi) & (rows <= y_lo)] = _INK
+    return img
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registros largos de assets/recordings.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="convierte un .npy 1-D en mV")
+    p_import.add_argument("src")
+    p_import.add_argument("name")
+    p_import.add_argument("--fs", type=float, required=True)
+    p_synth = sub.add_parser("synthetic", help="genera un ritmo sinusal con pausas")
+    p_synth.add_argument("name")
+    p_synth.add_argument("--hours", type=float, default=0)
+    p_synth.add_argument("--minutes", type=float, default=0)
+    p_synth.add_argument("--fs", type=float, default=250)
+    p_synth.add_argument("--pause", action="append", default=[],
+                         help="segundo:R-R en ms de una pausa (se puede repetir)")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        entry = import_recording(args.src, args.name, args.fs)
+    else:
+        pauses = [tuple(float(v) for v in p.split(":")) for p in args.pause]
+        entry = synthetic_recording(args.name, args.hours * 3600 + args.minutes * 60, args.fs, pauses=pauses)
+    size = sum(os.path.getsize(os.path.join(RECORDINGS_DIR, entry[k])) for k in ("file", "pyramid"))
+    print(f"{args.name}: {entry['n']} muestras a {entry['fs']:g} Hz, {len(entry['levels'])} niveles, "
+          f"{size / 1024 / 1024:.1f} MB")
@@ -0,0 +1,196 @@
+import os
+import json
+import threading
+from utils.image_cache import get_cached_image, image_path
+
+
+# ----------------------------------------------------
+# VERSIONES REDIMENSIONADAS (RENDITIONS) DE LAS IMÁGENES
+# ----------------------------------------------------
+# Paso de build:   python -m utils.renditions
+# Genera, para cada `image` y `corrected_image` de data/db.json, copias a
+# anchos de pantalla fijos en WebP y PNG dentro de assets/renditions/, más un
+# manifest.json con las dimensiones de cada una.
+#
+# En runtime, resolve_rendition() elige la versión más pequeña que cubre el
+# ancho pedido. Si no hay manifest (build no ejecutado) se usa el original.
+#
+# Las coordenadas de db.json (ms_per_pixel, valid_zone_pairs) están en
+# píxeles del ORIGINAL; scale_calibration() las lleva a la rendition.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RENDITIONS_DIR = os.path.join(PROJECT_ROOT, "assets", "renditions")
+MANIFEST_PATH = os.path.join(RENDITIONS_DIR, "manifest.json")
+DB_PATH = os.path.join(PROJECT_ROOT, "data", "db.json")
+
+BREAKPOINTS = (480, 768, 1024, 1280)
+FORMATS = ("webp", "png")
+
+# Anchos objetivo de cada lugar donde se muestra una imagen
+CANVAS_WIDTH = 1024
+DISPLAY_WIDTH = 1024
+
+
+class Rendition:
+    """Una versión concreta de una imagen: archivo, tamaño y factor respecto al original."""
+
+    __slots__ = ("path", "width", "height", "format", "scale")
+
+    def __init__(self, path, width, height, format, scale):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.format = format
+        self.scale = scale  # ancho_rendition / ancho_original
+
+    def __repr__(self):
+        return f"Rendition({os.path.basename(self.path)}, {self.width}x{self.height}, scale={self.scale:.4f})"
+
+
+# ---------- BUILD ----------
+def _referenced_images(db_path=DB_PATH):
+    with open(db_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    names = set()
+    for items in data.values():
+        for q in items:
+            for key in ("image", "corrected_image"):
+                if q.get(key):
+                    names.add(q[key])
+    return sorted(names)
+
+
+def build_renditions(db_path=DB_PATH, breakpoints=BREAKPOINTS, formats=FORMATS):
+    """Genera las renditions de todas las imágenes referenciadas en db.json."""
+    from PIL import Image
+
+    os.makedirs(RENDITIONS_DIR, exist_ok=True)
+    manifest = {}
+
+    for name in _referenced_images(db_path):
+        src = image_path(name)
+        if not os.path.exists(src):
+            print(f"⚠️ No existe {src}, se omite")
+            continue
+
+        with Image.open(src) as img:
+            img.load()
+            source_w, source_h = img.size
+            if img.mode not in ("RGB", "RGBA", "L"):
+                img = img.convert("RGBA")
+
+            stem = os.path.splitext(name)[0].replace(" ", "_")
+            variants = []
+            # Solo reducimos; el original ya cubre anchos mayores
+            widths = [w for w in breakpoints if w < source_w]
+            for w in widths:
+                h = max(1, round(source_h * w / source_w))
+                resized = img.resize((w, h), Image.LANCZOS)
+                for fmt in formats:
+                    filename = f"{stem}.{w}.{fmt}"
+                    if fmt == "webp":
+                        resized.save(os.path.join(RENDITIONS_DIR, filename), "WEBP", quality=85, method=6)
+                    else:
+                        resized.save(os.path.join(RENDITIONS_DIR, filename), "PNG", optimize=True)
+                    variants.append({"file": filename, "width": w, "height": h, "format": fmt})
+
+        manifest[name] = {
+            "width": source_w,
+            "height": source_h,
+            "sha256": get_cached_image(name).digest,
+            "variants": variants,
+        }
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    _manifest_cache.clear()
+    return manifest
+
+
+# ---------- RUNTIME ----------
+_manifest_cache = {}
+_lock = threading.Lock()
+
+
+def _load_manifest():
+    """Lee manifest.json una vez por proceso (se relee si cambia en disco)."""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return {}
+
+    with _lock:
+        if _manifest_cache.get("mtime") != mtime:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                _manifest_cache["data"] = json.load(f)
+            _manifest_cache["mtime"] = mtime
+        return _manifest_cache["data"]
+
+
+def _original(image_name, info=None):
+    if info is None:
+        entry = get_cached_image(image_name)
+        if entry is None:
+            return None
+        info = {"width": entry.width, "height": entry.height}
+    return Rendition(image_path(image_name), info["width"], info["height"], "original", 1.0)
+
+
+def resolve_rendition(image_name, target_width, formats=FORMATS):
+    """Devuelve la rendition más pequeña cuyo ancho cubre target_width.
+
+    Si ninguna lo cubre, o el original cambió después del build (hash distinto),
+    se usa el original.
+    """
+    if not image_name:
+        return None
+
+    info = _load_manifest().get(image_name)
+    entry = get_cached_image(image_name)
+    if entry is None:
+        return None
+    if info is None or info.get("sha256") != entry.digest:
+        return _original(image_name)
+
+    best = None
+    for fmt in formats:
+        candidates = [v for v in info["variants"] if v["format"] == fmt and v["width"] >= target_width]
+        if candidates:
+            best = min(candidates, key=lambda v: v["width"])
+            break
+
+    if best is None:
+        return _original(image_name, info)
+
+    path = os.path.join(RENDITIONS_DIR, best["file"])
+    if not os.path.exists(path):
+        return _original(image_name, info)
+    return Rendition(path, best["width"], best["height"], best["format"], best["width"] / info["width"])
+
+
+def scale_calibration(q, rendition):
+    """Copia de la calibración de la pregunta expresada en píxeles de la rendition.
+
+    ms_per_pixel crece en la misma proporción en que se reduce la imagen, de
+    modo que (x2 - x1) * ms_per_pixel da los mismos ms en cualquier versión.
+    """
+    scale = rendition.scale if rendition is not None else 1.0
+    out = {}
+    if "ms_per_pixel" in q:
+        out["ms_per_pixel"] = q["ms_per_pixel"] / scale
+    if "valid_zone_pairs" in q:
+        out["valid_zone_pairs"] = [
+            {"x_min": z["x_min"] * scale, "x_max": z["x_max"] * scale} for z in q["valid_zone_pairs"]
+        ]
+    if "valid_zone" in q:
+        z = q["valid_zone"]
+        out["valid_zone"] = {"x_min": z["x_min"] * scale, "x_max": z["x_max"] * scale}
+    return out
+
+
+if __name__ == "__main__":
+    built = build_renditions()
+    for name, info in built.items():
+        sizes = ", ".join(f"{v['width']}{v['format'][0]}" for v in info["variants"]) or "solo original"
+        print(f"{name} ({info['width']}x{info['height']}): {sizes}")
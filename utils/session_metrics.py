@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import logging
+import threading
+
+
+# ----------------------------------------------------
+# MEMORIA POR SESIÓN (PYMPLER) Y RSS DEL PROCESO
+# ----------------------------------------------------
+# Un hilo de fondo toma cada EKG_SESSION_METRICS_S segundos (60 por defecto,
+# 0 lo desactiva) una muestra de todas las sesiones vivas:
+#   - tamaño de cada clave de st.session_state con pympler.asizeof,
+#   - bytes de media (st.image / st.audio ...) que el media manager guarda
+#     para la sesión,
+#   - RSS del proceso.
+# La última muestra se escribe en data/session_metrics.json (la lee la página
+# de administración, admin.py) y un resumen por muestra se agrega a
+# data/session_metrics.jsonl. Cuando ese historial pasa de
+# EKG_SESSION_METRICS_HISTORY_MB (5 por defecto) se rota a
+# session_metrics.jsonl.1, así que en disco quedan como mucho dos archivos.
+#
+# asizeof recorre objetos en Python puro y retiene el GIL, así que cada ronda
+# tiene un presupuesto (EKG_SESSION_METRICS_BUDGET_MS, 50 ms por defecto): se
+# miden primero las sesiones con la medición más vieja y el resto conserva su
+# última medición hasta la ronda siguiente.
+#
+# Usa APIs internas del runtime de Streamlit (lista de sesiones y media
+# manager); si cambian, la muestra sale vacía en lugar de fallar.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_PATH = os.path.join(PROJECT_ROOT, "data", "session_metrics.json")
+HISTORY_PATH = os.path.join(PROJECT_ROOT, "data", "session_metrics.jsonl")
+DEFAULT_INTERVAL = float(os.environ.get("EKG_SESSION_METRICS_S", 60))
+DEFAULT_TOP_N = int(os.environ.get("EKG_SESSION_METRICS_TOP", 10))
+DEFAULT_BUDGET_MS = float(os.environ.get("EKG_SESSION_METRICS_BUDGET_MS", 50))
+HISTORY_MAX_BYTES = int(float(os.environ.get("EKG_SESSION_METRICS_HISTORY_MB", 5)) * 1024 * 1024)
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss_bytes():
+    """RSS actual (Linux); en otros sistemas, el pico que reporta resource."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def _live_sessions():
+    """[(session_id, {clave: valor})] de las sesiones activas del runtime."""
+    try:
+        from streamlit.runtime import Runtime
+        if not Runtime.exists():
+            return []
+        infos = Runtime.instance()._session_mgr.list_active_sessions()
+    except Exception:
+        return []
+    sessions = []
+    for info in infos:
+        try:
+            sessions.append((info.session.id, info.session.session_state.filtered_state))
+        except Exception:
+            continue
+    return sessions
+
+
+def _media_bytes_by_session():
+    """{session_id: bytes} de archivos de media en memoria referenciados por cada sesión."""
+    try:
+        from streamlit.runtime import Runtime
+        mgr = Runtime.instance().media_file_mgr
+        with mgr._lock:
+            refs = {sid: set(coords.values()) for sid, coords in mgr._files_by_session_and_coord.items()}
+        files = dict(getattr(mgr._storage, "_files_by_id", {}))
+    except Exception:
+        return {}
+    return {
+        sid: sum(len(files[fid].content) for fid in ids if fid in files)
+        for sid, ids in refs.items()
+    }
+
+
+def measure_state(state, top_n=DEFAULT_TOP_N):
+    """(bytes totales, [(clave, bytes)] de las top_n claves más pesadas)."""
+    from pympler import asizeof
+
+    sizes = []
+    for key, value in state.items():
+        try:
+            sizes.append((str(key), asizeof.asizeof(value)))
+        except Exception:
+            continue
+    sizes.sort(key=lambda kv: -kv[1])
+    return sum(n for _, n in sizes), sizes[:top_n]
+
+
+def _measure_session(sid, state, media, top_n):
+    total, top = measure_state(state, top_n)
+    return {
+        "session": sid,
+        "state_bytes": total,
+        "media_bytes": media.get(sid, 0),
+        "keys": len(state),
+        "top_keys": top,
+        "measured_at": time.time(),
+    }
+
+
+def _snapshot(rows, top_n, elapsed):
+    rows = sorted(rows, key=lambda r: -(r["state_bytes"] + r["media_bytes"]))
+    return {
+        "ts": time.time(),
+        "rss_bytes": process_rss_bytes(),
+        "sessions": len(rows),
+        "state_bytes": sum(r["state_bytes"] for r in rows),
+        "media_bytes": sum(r["media_bytes"] for r in rows),
+        "sample_ms": round(elapsed * 1000, 2),
+        "by_session": rows[:top_n],
+    }
+
+
+def sample(top_n=DEFAULT_TOP_N, sessions=None, media=None):
+    """Muestra completa (todas las sesiones), ordenada de más a menos pesada."""
+    t0 = time.perf_counter()
+    sessions = _live_sessions() if sessions is None else sessions
+    media = _media_bytes_by_session() if media is None else media
+    rows = [_measure_session(sid, state, media, top_n) for sid, state in sessions]
+    return _snapshot(rows, top_n, time.perf_counter() - t0)
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_PATH, history_path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    if history_path:
+        summary = {k: v for k, v in snapshot.items() if k != "by_session"}
+        try:
+            if os.path.getsize(history_path) >= HISTORY_MAX_BYTES:
+                os.replace(history_path, history_path + ".1")
+        except OSError:
+            pass
+        with open(history_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary) + "\n")
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SessionMetricsSampler:
+    def __init__(self, interval=DEFAULT_INTERVAL, top_n=DEFAULT_TOP_N, path=SNAPSHOT_PATH,
+                 budget_ms=DEFAULT_BUDGET_MS):
+        self.interval = interval
+        self.top_n = top_n
+        self.path = path
+        self.budget = budget_ms / 1000
+        self.last = None
+        self._rows = {}  # session_id -> última medición
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self, sessions=None, media=None):
+        """Una ronda con presupuesto: mide las sesiones más atrasadas y arma la muestra."""
+        t0 = time.perf_counter()
+        sessions = dict(_live_sessions() if sessions is None else sessions)
+        media = _media_bytes_by_session() if media is None else media
+
+        # Las sesiones cerradas salen; las nunca medidas van primero
+        self._rows = {sid: row for sid, row in self._rows.items() if sid in sessions}
+        pending = sorted(sessions, key=lambda sid: self._rows[sid]["measured_at"] if sid in self._rows else 0)
+        for sid in pending:
+            if time.perf_counter() - t0 > self.budget:
+                break
+            self._rows[sid] = _measure_session(sid, sessions[sid], media, self.top_n)
+            time.sleep(0)  # cede el GIL entre sesiones
+        for sid, row in self._rows.items():
+            row["media_bytes"] = media.get(sid, 0)
+
+        self.last = _snapshot(list(self._rows.values()), self.top_n, time.perf_counter() - t0)
+        return self.last
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="session-metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                write_snapshot(self.tick(), self.path)
+            except Exception as e:
+                logger.warning("No se pudo muestrear la memoria de las sesiones: %s", e)
@@ -0,0 +1,124 @@
+import re
+import time
+import threading
+from datetime import datetime, timedelta
+
+
+# ----------------------------------------------------
+# HOJA FALSA EN MEMORIA (pruebas y benchmarks sin red)
+# ----------------------------------------------------
+
+class FakeWorksheet:
+    """Imita la parte de gspread.Worksheet que usamos: append_row(s), col_values y get.
+
+    - latency: segundos que tarda cada llamada de escritura.
+    - fail_next: cuántas escrituras seguidas fallan ANTES de escribir.
+    - fail_after_write: cuántas escrituras seguidas escriben y LUEGO fallan
+      (resultado desconocido para el cliente, el caso que exige idempotencia).
+    """
+
+    def __init__(self, latency=0.0, fail_next=0, fail_after_write=0):
+        self.rows = []
+        self.latency = latency
+        self.fail_next = fail_next
+        self.fail_after_write = fail_after_write
+        self.calls = 0
+        self.cells_read = 0   # celdas leídas al comprobar duplicados
+        self._lock = threading.Lock()
+
+    def append_rows(self, values, value_input_option="RAW", **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.latency:
+                time.sleep(self.latency)
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise ConnectionError("Fake: Sheets no disponible")
+            start = len(self.rows) + 1
+            self.rows.extend(list(r) for r in values)
+            if self.fail_after_write > 0:
+                self.fail_after_write -= 1
+                raise TimeoutError("Fake: timeout después de escribir")
+            return {"updates": {"updatedRange": f"Fake!{start}:{len(self.rows)}"}}
+
+    def append_row(self, values, value_input_option="RAW", **kwargs):
+        self.append_rows([values], value_input_option)
+
+    def col_values(self, col):
+        with self._lock:
+            self.cells_read += len(self.rows)
+            return [r[col - 1] if len(r) >= col else "" for r in self.rows]
+
+    def get(self, range_name):
+        """Solo rangos de una columna abiertos por abajo ("O121:O")."""
+        letter, first = re.match(r"([A-Z]+)(\d+):", range_name).groups()
+        col = sum((ord(c) - 64) * 26 ** i for i, c in enumerate(reversed(letter)))
+        with self._lock:
+            tail = self.rows[int(first) - 1:]
+            self.cells_read += len(tail)
+            return [[r[col - 1]] if len(r) >= col else [] for r in tail]
+
+
+class FakeCredentials:
+    def __init__(self, lifetime=timedelta(hours=1)):
+        self.lifetime = lifetime
+        self.expiry = None
+        self.token = None
+
+
+class AuthExpired(Exception):
+    pass
+
+
+class StubTransport:
+    """Transporte para SheetsClientPool sin red: cada hoja es una FakeWorksheet.
+
+    expire_next fuerza que la próxima llamada a una hoja falle con error de auth,
+    para ejercitar la reconexión transparente.
+    """
+
+    def __init__(self, lifetime=timedelta(hours=1)):
+        self.lifetime = lifetime
+        self.sheets = {}
+        self.loads = 0
+        self.refreshes = 0
+        self.authorizes = 0
+        self.opens = 0
+        self.expire_next = False
+
+    def load_credentials(self):
+        self.loads += 1
+        return FakeCredentials(self.lifetime)
+
+    def refresh(self, creds):
+        self.refreshes += 1
+        creds.token = f"token-{self.refreshes}"
+        creds.expiry = datetime.utcnow() + creds.lifetime
+
+    def authorize(self, creds):
+        self.authorizes += 1
+        return {"creds": creds}
+
+    def open_worksheet(self, client, sheet_name):
+        self.opens += 1
+        ws = self.sheets.setdefault(sheet_name, FakeWorksheet())
+        return _ExpiringWorksheet(self, ws)
+
+    def is_auth_error(self, exc):
+        return isinstance(exc, AuthExpired)
+
+
+class _ExpiringWorksheet:
+    def __init__(self, transport, ws):
+        self._transport = transport
+        self._ws = ws
+
+    def __getattr__(self, name):
+        target = getattr(self._ws, name)
+
+        def call(*args, **kwargs):
+            if self._transport.expire_next:
+                self._transport.expire_next = False
+                raise AuthExpired("Fake: 401 token inválido")
+            return target(*args, **kwargs)
+        return call
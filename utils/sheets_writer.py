@@ -0,0 +1,263 @@
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import threading
+from collections import deque
+
+
+# ----------------------------------------------------
+# ESCRITURA DIFERIDA (WRITE-BEHIND) A GOOGLE SHEETS
+# ----------------------------------------------------
+# ResultSpool.put() guarda la fila en una cola SQLite local y retorna al instante.
+# Un hilo en segundo plano la envía por lotes con append_rows, reintentando
+# con backoff exponencial si Sheets falla.
+#
+# Idempotencia: cada fila lleva su clave como última columna. La clave es
+# UNIQUE en la cola (encolar dos veces no duplica) y, antes de reenviar un
+# lote cuyo resultado es desconocido (falló a mitad), se leen las claves que
+# ya están en la hoja y se descartan las filas que sí llegaron.
+#
+# OJO: esa columna de claves es visible en la hoja, a la derecha de los datos
+# (en Registro_EKG, la columna O). No hay que borrarla ni reordenarla.
+#
+# La comprobación no descarga la columna entera: la cola guarda por hoja la
+# última fila que confirmó append_rows (updatedRange de la respuesta). Cuando
+# un lote falla por primera vez se anota esa fila en sus filas pendientes
+# (check_from) y, como la hoja solo crece por abajo, lo que haya llegado de
+# ese intento está más abajo: al reintentar se leen las claves desde ahí. Solo
+# si no se conocía la fila al fallar se lee la columna completa.
+#
+# Las claves enviadas se recuerdan SENT_TTL segundos (para que encolar de
+# nuevo la misma clave no la reenvíe) y después se borran de la cola.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SPOOL_PATH = os.path.join(PROJECT_ROOT, "data", "results_spool.sqlite3")
+
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 2.0      # segundos entre revisiones de la cola
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 300.0
+SENT_TTL = 7 * 24 * 3600  # horizonte de deduplicación de put()
+
+_RANGE_END_ROW = re.compile(r"(\d+)$")
+
+
+def _column_letter(n):
+    """1 -> A, 27 -> AA (notación A1)."""
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _appended_last_row(response):
+    """Última fila escrita según la respuesta de append_rows, o None."""
+    try:
+        match = _RANGE_END_ROW.search(response["updates"]["updatedRange"])
+    except (TypeError, KeyError):
+        return None
+    return int(match.group(1)) if match else None
+
+
+class ResultSpool:
+    """Cola durable en SQLite. Una conexión por operación para poder usarla desde cualquier hilo."""
+
+    def __init__(self, path=DEFAULT_SPOOL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS pending (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    sheet TEXT NOT NULL,
+                    row TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_try REAL NOT NULL DEFAULT 0
+                )
+            """)
+            con.execute("CREATE TABLE IF NOT EXISTS sent (key TEXT PRIMARY KEY, sent_at REAL NOT NULL)")
+            con.execute("CREATE INDEX IF NOT EXISTS sent_at ON sent (sent_at)")
+            con.execute("CREATE TABLE IF NOT EXISTS tail (sheet TEXT PRIMARY KEY, last_row INTEGER NOT NULL)")
+            # Colas creadas antes de check_from
+            if "check_from" not in {c[1] for c in con.execute("PRAGMA table_info(pending)")}:
+                con.execute("ALTER TABLE pending ADD COLUMN check_from INTEGER")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def put(self, sheet, key, row):
+        """Encola la fila. Devuelve False si la clave ya estaba encolada o enviada."""
+        with self._connect() as con:
+            if con.execute("SELECT 1 FROM sent WHERE key = ?", (key,)).fetchone():
+                return False
+            cur = con.execute(
+                "INSERT OR IGNORE INTO pending (key, sheet, row, created) VALUES (?, ?, ?, ?)",
+                (key, sheet, json.dumps(row, ensure_ascii=False, default=str), time.time()),
+            )
+            return cur.rowcount == 1
+
+    def due_batch(self, limit=BATCH_SIZE, now=None):
+        """Siguiente lote listo para enviar, todo de la misma hoja."""
+        now = time.time() if now is None else now
+        with self._connect() as con:
+            first = con.execute(
+                "SELECT sheet FROM pending WHERE next_try <= ? ORDER BY id LIMIT 1", (now,)
+            ).fetchone()
+            if first is None:
+                return None, []
+            rows = con.execute(
+                "SELECT id, key, row, attempts FROM pending WHERE sheet = ? AND next_try <= ? ORDER BY id LIMIT ?",
+                (first[0], now, limit),
+            ).fetchall()
+        return first[0], [(i, k, json.loads(r), a) for i, k, r, a in rows]
+
+    def mark_sent(self, keys, sheet=None, last_row=None):
+        now = time.time()
+        with self._connect() as con:
+            con.executemany("INSERT OR IGNORE INTO sent (key, sent_at) VALUES (?, ?)", [(k, now) for k in keys])
+            con.executemany("DELETE FROM pending WHERE key = ?", [(k,) for k in keys])
+            con.execute("DELETE FROM sent WHERE sent_at < ?", (now - SENT_TTL,))
+            if sheet is not None and last_row is not None:
+                con.execute(
+                    "INSERT INTO tail (sheet, last_row) VALUES (?, ?) "
+                    "ON CONFLICT(sheet) DO UPDATE SET last_row = MAX(last_row, excluded.last_row)",
+                    (sheet, last_row),
+                )
+
+    def last_row(self, sheet):
+        """Última fila de `sheet` confirmada por append_rows, o None si no se conoce."""
+        with self._connect() as con:
+            row = con.execute("SELECT last_row FROM tail WHERE sheet = ?", (sheet,)).fetchone()
+        return row[0] if row else None
+
+    def mark_failed(self, ids, delay, last_row=None):
+        """Programa el reintento; en el primer fallo anota `last_row`, la última fila conocida antes del envío."""
+        with self._connect() as con:
+            con.executemany(
+                "UPDATE pending SET attempts = attempts + 1, next_try = ?, "
+                "check_from = CASE WHEN attempts = 0 THEN ? ELSE check_from END WHERE id = ?",
+                [(time.time() + delay, last_row, i) for i in ids],
+            )
+
+    def check_from(self, ids):
+        """Fila de la hoja desde la que buscar duplicados de estas filas, o None si hay que leerla entera."""
+        with self._connect() as con:
+            marks = con.execute(
+                f"SELECT check_from FROM pending WHERE id IN ({','.join('?' * len(ids))})", list(ids)
+            ).fetchall()
+        if not marks or any(m[0] is None for m in marks):
+            return None
+        return min(m[0] for m in marks)
+
+    def depth(self):
+        with self._connect() as con:
+            return con.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+
+class SheetsWriter:
+    """Hilo que vacía la ResultSpool hacia Google Sheets por lotes."""
+
+    def __init__(self, spool, worksheet_factory, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL):
+        self.spool = spool
+        self.worksheet_factory = worksheet_factory  # sheet_name -> objeto con append_rows / col_values
+        self.batch_size = batch_size
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._latencies = deque(maxlen=200)
+        self.sent_rows = 0
+        self.failed_batches = 0
+        self.skipped_duplicates = 0
+        self.last_error = None
+
+    # ---------- CICLO DE VIDA ----------
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sheets-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            while self.flush_once():
+                pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ---------- ENVÍO ----------
+    def flush_once(self):
+        """Envía un lote. Devuelve True si envió algo (para seguir vaciando)."""
+        sheet, batch = self.spool.due_batch(self.batch_size)
+        if not batch:
+            return False
+
+        t0 = time.perf_counter()
+        tail = self.spool.last_row(sheet)
+        try:
+            ws = self.worksheet_factory(sheet)
+
+            # Si algún intento anterior pudo haber llegado, consultamos las claves ya escritas
+            retried = [i for i, _, _, attempts in batch if attempts > 0]
+            if retried:
+                present = self._keys_after(ws, len(batch[0][2]) + 1, self.spool.check_from(retried))
+                already = [k for _, k, _, _ in batch if k in present]
+                if already:
+                    self.spool.mark_sent(already)
+                    self.skipped_duplicates += len(already)
+                    batch = [b for b in batch if b[1] not in present]
+                if not batch:
+                    return True
+
+            # RAW: Sheets no reinterpreta DNIs (ceros a la izquierda), fechas ni textos que empiezan con "="
+            response = ws.append_rows([row + [key] for _, key, row, _ in batch], value_input_option="RAW")
+        except Exception as e:
+            self.failed_batches += 1
+            self.last_error = str(e)
+            attempts = max(a for _, _, _, a in batch)
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempts)) * random.uniform(0.5, 1.0)
+            self.spool.mark_failed([i for i, _, _, _ in batch], delay, tail)
+            return False
+
+        self._latencies.append(time.perf_counter() - t0)
+        self.spool.mark_sent([k for _, k, _, _ in batch], sheet, _appended_last_row(response))
+        self.sent_rows += len(batch)
+        return True
+
+    def _keys_after(self, ws, col, last_row):
+        """Claves de la columna `col` escritas después de `last_row` (toda la columna si es None)."""
+        if last_row is None:
+            return set(ws.col_values(col))
+        letter = _column_letter(col)
+        values = ws.get(f"{letter}{last_row + 1}:{letter}")
+        return {row[0] for row in values if row}
+
+    # ---------- MÉTRICAS ----------
+    def metrics(self):
+        lat = sorted(self._latencies)
+        return {
+            "queue_depth": self.spool.depth(),
+            "sent_rows": self.sent_rows,
+            "failed_batches": self.failed_batches,
+            "skipped_duplicates": self.skipped_duplicates,
+            "flush_latency_last_ms": round(self._latencies[-1] * 1000, 1) if lat else None,
+            "flush_latency_p50_ms": round(lat[len(lat) // 2] * 1000, 1) if lat else None,
+            "flush_latency_p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 1) if lat else None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,148 @@
+import os
+import threading
+import streamlit as st
+from utils.image_cache import IMAGES_DIR, get_cached_file, image_path
+
+
+# ----------------------------------------------------
+# PUBLICACIÓN DE IMÁGENES POR URL (static serving de Streamlit)
+# ----------------------------------------------------
+# Cada imagen se copia una sola vez a static/ekg/ con el hash del contenido en
+# el nombre. Streamlit la sirve en app/static/ekg/<nombre> y, al añadir ?v=<hash>,
+# Tornado responde con Cache-Control de largo plazo. El navegador la descarga
+# una vez y el websocket deja de transportar bytes de imagen en cada rerun.
+#
+# Las URLs son absolutas desde la raíz del servidor (/app/static/..., con
+# server.baseUrlPath delante si está definido): el canvas de marcas es un
+# componente cuyo iframe se sirve desde /component/<nombre>/index.html, y una
+# URL relativa se resolvería contra esa ruta (404) en lugar de la de la página.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(PROJECT_ROOT, "static", "ekg")
+STATIC_URL = "app/static/ekg"
+
+_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp", "image/gif": ".gif"}
+
+_published = {}  # digest -> url
+_lock = threading.Lock()
+
+
+def static_serving_enabled():
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def _url_prefix():
+    """/<server.baseUrlPath>/app/static/ekg, o /app/static/ekg sin baseUrlPath."""
+    try:
+        base = (st.get_option("server.baseUrlPath") or "").strip("/")
+    except Exception:
+        base = ""
+    return f"/{base}/{STATIC_URL}" if base else f"/{STATIC_URL}"
+
+
+def _publish(entry, source_path):
+    """Copia la imagen a static/ekg/ (si aún no está) y devuelve su URL versionada."""
+    url = _published.get(entry.digest)
+    if url is not None:
+        return url
+
+    with _lock:
+        url = _published.get(entry.digest)
+        if url is not None:
+            return url
+
+        stem = os.path.splitext(os.path.basename(source_path))[0].replace(" ", "_")
+        short = entry.digest[:12]
+        filename = f"{stem}.{short}{_EXTENSIONS.get(entry.mime, '.png')}"
+        target = os.path.join(STATIC_DIR, filename)
+
+        if not os.path.exists(target):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(entry.data)
+            os.replace(tmp, target)
+
+        url = f"{_url_prefix()}/{filename}?v={short}"
+        _published[entry.digest] = url
+        return url
+
+
+def file_url(path):
+    """URL estática de un archivo cualquiera, o None si no se puede servir por URL."""
+    if not static_serving_enabled():
+        return None
+    entry = get_cached_file(path)
+    if entry is None:
+        return None
+    try:
+        return _publish(entry, path)
+    except OSError:
+        return None
+
+
+def image_url(image_name):
+    """URL estática de una imagen de assets/images, o None si no se puede servir por URL."""
+    if not image_name:
+        return None
+    return file_url(image_path(image_name))
+
+
+def file_src(path):
+    """Valor para el atributo src: URL estática si existe, data URI como respaldo."""
+    url = file_url(path)
+    if url is not None:
+        return url
+    entry = get_cached_file(path)
+    if entry is None:
+        return None
+    return f"data:{entry.mime};base64,{entry.base64}"
+
+
+def image_src(image_name):
+    return file_src(image_path(image_name))
+
+
+def show_image(path, caption=None, width=None):
+    """Reemplazo de st.image que referencia la URL estática en vez de subir los bytes.
+
+    Si el static serving no está activo se usa st.image como antes.
+    """
+    url = file_url(path)
+    if url is None:
+        if width is None:
+            st.image(path, caption=caption, use_container_width=True)
+        else:
+            st.image(path, caption=caption, width=width)
+        return
+
+    size = f"width:{width}px; max-width:100%;" if width else "width:100%;"
+    caption_html = (
+        f"<p style='text-align:center; color:#586067; font-size:0.85rem; margin-top:0.3rem;'>{caption}</p>"
+        if caption else ""
+    )
+    st.markdown(f"""
+    <div style='margin-bottom: 1rem;'>
+        <img src="{url}" style="{size} height:auto; display:block;">
+        {caption_html}
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def publish_all():
+    """Publica por adelantado todas las imágenes de assets/images (útil en el deploy)."""
+    urls = {}
+    for name in sorted(os.listdir(IMAGES_DIR)):
+        path = image_path(name)
+        entry = get_cached_file(path)
+        if entry is not None:
+            urls[name] = _publish(entry, path)
+    return urls
+
+
+if __name__ == "__main__":
+    for name, url in publish_all().items():
+        print(f"{name} -> {url}")
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ----------------------------------------------------
+# EJERCICIOS CON TRAZO VECTORIAL (muestras + frecuencia de muestreo)
+# ----------------------------------------------------
+# Alternativa a la imagen PNG de los ejercicios visuales. En db.json:
+#   "waveform": {"fs": 250, "samples": [mV, mV, ...]}
+# en lugar de "image". El canvas (utils/canvas_component) dibuja la cuadrícula
+# (25 mm/s, 10 mm/mV) y el trazo en el navegador, así que el zoom no necesita
+# una imagen más grande.
+#
+#   - lttb() reduce las muestras al ancho mostrado con Largest-Triangle-Three-
+#     Buckets: 2 puntos por píxel, y los picos del QRS se conservan,
+#   - waveform_view() devuelve una WaveformView con el tamaño en pantalla, los
+#     px por ms y el payload compacto para el componente (índices de muestra y
+#     µV enteros); se cachea por pregunta y ancho,
+#   - las zonas (valid_zone / valid_zone_pairs) de estos ejercicios están en ms
+#     desde el inicio del trazo: para mark_grading.calibration() el trazo es
+#     una imagen de 1 ms por píxel y WaveformView.scale son los px por ms, igual
+#     que Rendition.scale con las imágenes.
+
+MM_PER_S = 25
+MM_PER_MV = 10
+POINTS_PER_PX = 2
+PAD_MV = 0.5              # margen arriba y abajo del trazo
+MIN_SPAN_MV = (-1.0, 1.0)  # la cuadrícula cubre al menos este rango
+CACHE_SIZE = 32
+
+
+class WaveformView:
+    """Un trazo preparado para un ancho de pantalla (se usa como una Rendition)."""
+
+    __slots__ = ("width", "height", "scale", "duration_ms", "payload", "start_ms")
+
+    path = None
+    format = "waveform"
+
+    def __init__(self, width, height, scale, duration_ms, payload, start_ms=0):
+        self.width = width
+        self.height = height
+        self.scale = scale              # px por ms
+        self.duration_ms = duration_ms
+        self.payload = payload          # argumentos "waveform" del componente
+        self.start_ms = start_ms        # inicio de la ventana en un registro largo
+
+    def __repr__(self):
+        return f"WaveformView({self.width}x{self.height}, {len(self.payload['x'])} puntos)"
+
+
+def lttb(y, n_out):
+    """Índices de las muestras que elige LTTB (incluye la primera y la última).
+
+    Por cada bucket se queda con el punto que forma el triángulo más grande con
+    el punto elegido en el bucket anterior y el promedio del siguiente.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Promedio de cada bucket (el "siguiente" del último es la última muestra)
+    starts = np.r_[edges[:-1], n - 1]
+    sizes = np.diff(np.r_[starts, n])
+    means_y = np.add.reduceat(y, starts) / sizes
+    means_x = starts + (sizes - 1) / 2
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = means_x[i + 1], means_y[i + 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - cx) * (y[lo:hi] - y[a]) - (a - xs) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+_views = OrderedDict()
+_lock = threading.Lock()
+
+
+def _build_view(waveform, width, span_mv=None, start_ms=0):
+    """WaveformView de las muestras; `span_mv` fija el rango vertical (ventanas de un registro)."""
+    y = np.asarray(waveform["samples"], dtype=float)
+    fs = float(waveform["fs"])
+    duration_ms = len(y) * 1000.0 / fs
+    scale = width / duration_ms
+    px_per_mm = scale * 1000.0 / MM_PER_S
+    if span_mv is not None:
+        bottom, top = span_mv
+    else:
+        top = max(float(y.max()) + PAD_MV, MIN_SPAN_MV[1])
+        bottom = min(float(y.min()) - PAD_MV, MIN_SPAN_MV[0])
+    height = int(round((top - bottom) * MM_PER_MV * px_per_mm))
+
+    idx = lttb(y, POINTS_PER_PX * width)
+    uv = np.round(y[idx] * 1000).astype(np.int64)
+    digest = hashlib.sha1(f"{fs}:{width}".encode() + y.tobytes()).hexdigest()[:12]
+    payload = {
+        "key": digest,
+        "fs": fs,
+        "n": len(y),
+        "top_mv": round(top, 3),
+        "mm_per_s": MM_PER_S,
+        "mm_per_mv": MM_PER_MV,
+        "x": idx.tolist(),
+        "y": uv.tolist(),
+    }
+    return WaveformView(width, height, scale, duration_ms, payload, start_ms)
+
+
+def waveform_view(q, width):
+    """WaveformView del trazo de `q` para `width` px (cacheada por pregunta y ancho)."""
+    waveform = q["waveform"]
+    key = (q["id"], width)
+    with _lock:
+        entry = _views.get(key)
+        if entry is not None and entry[0] is waveform:
+            _views.move_to_end(key)
+            return entry[1]
+
+    view = _build_view(waveform, width)
+    with _lock:
+        _views[key] = (waveform, view)
+        while len(_views) > CACHE_SIZE:
+            _views.popitem(last=False)
+    return view